@@ -9,6 +9,7 @@ class DeviceManager:
         self.devices = {}  # port -> device instance
         self.device_classes = {}  # device_name -> device class
         self.ports_config = self.load_ports_config()
+        self.interrupts = None  # контроллер прерываний, подключает Machine
         
     def load_ports_config(self):
         """Загружает конфигурацию портов"""
@@ -53,6 +54,8 @@ class DeviceManager:
         
         # Подключаем к порту
         self.devices[port] = device
+        if self.interrupts is not None:
+            self.interrupts.attach(port, device)
         self.ports_config[str(port)] = device_name
         self.save_ports_config()
         
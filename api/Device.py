@@ -3,7 +3,14 @@ import json
 import os
 from abc import ABC, abstractmethod
 
+# Значение "нет команды" для _last_command в снимке состояния
+NO_COMMAND = 0xFFFF
+
 class Device(ABC):
+    # Линия прерывания (см. cpu/InterruptController.py), ее подключает менеджер устройств
+    irq_line = None
+    irq_controller = None
+    
     def __init__(self, canvas, device_name):
         self.canvas = canvas
         self.device_name = device_name
@@ -113,6 +120,33 @@ class Device(ABC):
         """Переопределяется в наследниках для обработки отпускания клавиши"""
         pass
     
+    # Прерывания
+    def raise_irq(self):
+        """Поднимает линию прерывания устройства (если оно к ней подключено)"""
+        if self.irq_controller is not None:
+            self.irq_controller.raise_line(self.irq_line)
+    
+    def clear_irq(self):
+        """Снимает еще не принятый процессором запрос прерывания"""
+        if self.irq_controller is not None:
+            self.irq_controller.clear_line(self.irq_line)
+    
+    # Снимок состояния (см. machine/Snapshot.py)
+    def save_state(self):
+        """Возвращает состояние устройства в виде bytes (по умолчанию состояния нет)"""
+        return b""
+    
+    def load_state(self, data):
+        """Восстанавливает состояние, сохраненное save_state()"""
+        pass
+    
+    def _command_word(self):
+        command = getattr(self, '_last_command', None)
+        return NO_COMMAND if command is None else command
+    
+    def _set_command_word(self, word):
+        self._last_command = None if word == NO_COMMAND else word
+    
     @abstractmethod
     def device_in(self, value):
         """Получает данные от процессора (out инструкция)"""
@@ -122,3 +156,11 @@ class Device(ABC):
     def device_out(self):
         """Отправляет данные процессору (in инструкция)"""
         pass
+    
+    def poll_stable(self):
+        """True, если повторный in вернет то же самое до следующего update() или события хоста
+        
+        По нему IdleDetector понимает, что процессор крутится в цикле опроса
+        впустую. По умолчанию устройство считается изменчивым.
+        """
+        return False
@@ -1,5 +1,6 @@
 import os
 import json
+import zlib
 import time
 from datetime import datetime
 from Parser import Instruction, Label, Directive, DataBytes
@@ -142,6 +143,29 @@ class Compiler:
             'dec': 0x18,
             'stm': 0x19,
             'stm_pair': 0x1A,
+            'ei': 0x1B,
+            'di': 0x1C,
+            'iret': 0x1D,
+            'movb': 0x1E,
+            'outs': 0x1F,
+            'ins': 0x20,
+            'jc': 0x21,
+            'jnc': 0x22,
+            'jb': 0x21,    # jb/jae - то же, что jc/jnc (беззнаковое сравнение)
+            'jae': 0x22,
+            'calle': 0x23,
+            'callne': 0x24,
+            'callc': 0x25,
+            'callnc': 0x26,
+            'rete': 0x27,
+            'retne': 0x28,
+            'retc': 0x29,
+            'retnc': 0x2A,
+            'adc': 0x2B,
+            'sbb': 0x2C,
+            'mul': 0x2D,
+            'div': 0x2E,
+            'mod': 0x2F,
             'hlt': 0xFF
         }
         
@@ -149,6 +173,7 @@ class Compiler:
         self.binary_data = []
         self.current_address = 0
         self.org_address = 0
+        self.org_given = False  # был ли #org (адрес 0 - тоже явный адрес)
         self.physical_address = 0
     
     def first_pass(self, statements):
@@ -160,6 +185,7 @@ class Compiler:
                 if statement.name == 'org':
                     logical_address = statement.value
                     self.org_address = statement.value
+                    self.org_given = True
             elif isinstance(statement, Label):
                 self.labels[statement.name] = logical_address
             elif isinstance(statement, Instruction):
@@ -174,14 +200,19 @@ class Compiler:
     def get_instruction_size(self, instruction):
         opcode = instruction.opcode
         
-        if opcode == 'nop' or opcode == 'ret' or opcode == 'hlt':
+        if opcode in ['nop', 'ret', 'hlt', 'ei', 'di', 'iret', 'rete', 'retne', 'retc', 'retnc']:
             return 1
         elif opcode in ['shl', 'shr', 'push', 'pop', 'inc', 'dec']:
             return 2
-        elif opcode in ['add', 'sub', 'xor', 'or', 'and', 'not', 'jmp', 'je', 'jne', 'call', 'in', 'out']:
+        elif opcode in ['add', 'sub', 'xor', 'or', 'and', 'not', 'jmp', 'je', 'jne', 'call', 'in', 'out',
+                        'jc', 'jnc', 'jb', 'jae', 'calle', 'callne', 'callc', 'callnc', 'adc', 'sbb', 'mul']:
             return 3
-        elif opcode in ['mov', 'ld', 'cmp', 'ldm', 'stm', 'stm_pair']:
+        elif opcode in ['mov', 'ld', 'cmp', 'ldm', 'stm', 'stm_pair', 'div', 'mod']:
             return 4
+        elif opcode in ['outs', 'ins']:
+            return 5
+        elif opcode == 'movb':
+            return 6
         else:
             return 1
     
@@ -285,6 +316,28 @@ class Compiler:
             else:
                 raise ValueError(f"STM_PAIR требует три регистра: {high_reg[0]}, {low_reg[0]}, {data_reg[0]}")
         
+        # Блочные инструкции: movb [dh, dl], [sh, sl], count; outs/ins port, [h, l], count
+        elif opcode == 'movb':
+            if (len(operands) == 3 and operands[0][0] == 'memory_pair' and operands[1][0] == 'memory_pair'
+                    and operands[2][0] == 'register'):
+                dest, src, count = operands
+                return [self.opcodes['movb'], dest[1], dest[2], src[1], src[2], count[1]]
+            raise ValueError("MOVB требует операнды [reg, reg], [reg, reg], reg")
+        
+        elif opcode in ('outs', 'ins'):
+            if (len(operands) == 3 and operands[0][0] == 'register' and operands[1][0] == 'memory_pair'
+                    and operands[2][0] == 'register'):
+                port, pair, count = operands
+                return [self.opcodes[opcode], port[1], pair[1], pair[2], count[1]]
+            raise ValueError(f"{opcode.upper()} требует операнды reg, [reg, reg], reg")
+        
+        # Арифметика с 16-битным результатом в паре: mul high, low; div/mod high, low, divisor
+        elif opcode in ('adc', 'sbb', 'mul', 'div', 'mod'):
+            count = 3 if opcode in ('div', 'mod') else 2
+            if len(operands) == count and all(operand[0] == 'register' for operand in operands):
+                return [self.opcodes[opcode]] + [operand[1] for operand in operands]
+            raise ValueError(f"{opcode.upper()} требует {count} регистра")
+        
         result = [self.opcodes[opcode]]
         
         for operand in operands:
@@ -338,23 +391,34 @@ class Compiler:
         return tape_data
     
     def save_to_files(self, binary_data, output_dir="boot"):
-        """Сохраняет бинарные данные в файлы (для загрузки в ОЗУ)"""
+        """Сохраняет бинарные данные в boot-образ (для загрузки в ОЗУ)
+
+        Программа пишется целиком в 0.bin, рядом - манифест boot.json с адресом
+        загрузки (из #org, иначе 0x00FF), длиной и контрольной суммой.
+        """
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
-        if len(binary_data) <= 256:
-            with open(os.path.join(output_dir, "0.bin"), "wb") as f:
-                f.write(bytes(binary_data))
-            print(f"Создан файл 0.bin размером {len(binary_data)} байт")
-        elif len(binary_data) <= 512:
-            with open(os.path.join(output_dir, "0.bin"), "wb") as f:
-                f.write(bytes(binary_data[:256]))
-            with open(os.path.join(output_dir, "1.bin"), "wb") as f:
-                f.write(bytes(binary_data[256:]))
-            print(f"Создан файл 0.bin размером 256 байт")
-            print(f"Создан файл 1.bin размером {len(binary_data) - 256} байт")
-        else:
-            raise ValueError("Программа слишком большая (больше 512 байт)")
+        data = bytes(binary_data)
+        address = self.org_address if self.org_given else 0x00FF
+        if address + len(data) > 0x10000:
+            raise ValueError(f"Программа не помещается в память ({len(data)} байт с адреса 0x{address:04X})")
+        
+        with open(os.path.join(output_dir, "0.bin"), "wb") as f:
+            f.write(data)
+        
+        manifest = {
+            "entry": address,
+            "segments": [{
+                "file": "0.bin",
+                "address": address,
+                "length": len(data),
+                "crc32": zlib.crc32(data)
+            }]
+        }
+        with open(os.path.join(output_dir, "boot.json"), "w") as f:
+            json.dump(manifest, f, indent=4)
+        print(f"Создан файл 0.bin размером {len(data)} байт (адрес 0x{address:04X})")
     
     def get_load_address(self):
         return self.org_address
@@ -1,65 +1,127 @@
+from array import array
+from cpu.RegisterFile import FLAG_C
+
+# Таблицы ALU. Элемент таблицы - результат операции в младшем байте и
+# упакованные флаги в старшем (бит 8 - Z, бит 9 - C), так что операция
+# вместе с обновлением флагов сводится к одной выборке по индексу.
+# Двухместные таблицы индексируются (a << 8) | b, одноместные - a.
+# Таблицы с переносом на входе (adc, sbb) - (c << 16) | (a << 8) | b,
+# где c - флаг C; индекс собирается как ((flags & FLAG_C) << 15) | ...
+
+def _entry(result, carry):
+    result &= 0xFF
+    return result | (((result == 0x00) | (carry << 1)) << 8)
+
+def _binary_table(operation):
+    return array('H', [operation(a, b) for a in range(256) for b in range(256)])
+
+def _unary_table(operation):
+    return array('H', [operation(a) for a in range(256)])
+
+ADD_TABLE = _binary_table(lambda a, b: _entry(a + b, a + b > 0xFF))
+SUB_TABLE = _binary_table(lambda a, b: _entry(a - b, a < b))  # Заем при вычитании
+XOR_TABLE = _binary_table(lambda a, b: _entry(a ^ b, False))  # логика не влияет на carry
+OR_TABLE = _binary_table(lambda a, b: _entry(a | b, False))
+AND_TABLE = _binary_table(lambda a, b: _entry(a & b, False))
+NOT_TABLE = _unary_table(lambda a: _entry(~a, False))
+SHL_TABLE = _unary_table(lambda a: _entry(a << 1, (a & 0x80) != 0))  # carry - старший бит
+SHR_TABLE = _unary_table(lambda a: _entry(a >> 1, (a & 0x01) != 0))  # carry - младший бит
+INC_TABLE = _unary_table(lambda a: _entry(a + 1, a == 0xFF))
+DEC_TABLE = _unary_table(lambda a: _entry(a - 1, a == 0x00))
+# Без переноса adc/sbb совпадают с add/sub, считаем только вторую половину
+ADC_TABLE = ADD_TABLE + _binary_table(lambda a, b: _entry(a + b + 1, a + b + 1 > 0xFF))
+SBB_TABLE = SUB_TABLE + _binary_table(lambda a, b: _entry(a - b - 1, a < b + 1))
+
+# mul, div и mod дают 16-битный результат (в паре регистров), таблиц для них нет.
+# Z - результат равен нулю, C - у mul старший байт не нулевой, у div/mod - деление
+# на ноль (делимое тогда остается как было)
+
 class Alu:
+    """8-битное ALU на таблицах. Операнды берутся по модулю 256."""
     def __init__(self, cpu):
         self.cpu = cpu
     
     def _update_flags(self, result, carry=False):
         """Обновляет флаги процессора на основе результата операции"""
-        # Обновляем флаг Zero (Z)
-        self.cpu.flags[0x01].write(0x01 if result == 0x00 else 0x00)
-        
-        # Обновляем флаг Carry (C)
-        self.cpu.flags[0x02].write(0x01 if carry else 0x00)
+        # Флаги упакованы в один байт: бит 0 - Zero (Z), бит 1 - Carry (C)
+        self.cpu.flag_reg[0] = (result == 0x00) | (carry << 1)
+    
+    def _binary(self, table, a, b):
+        entry = table[((a & 0xFF) << 8) | (b & 0xFF)]
+        self.cpu.flag_reg[0] = entry >> 8
+        return entry & 0xFF
+    
+    def _unary(self, table, a):
+        entry = table[a & 0xFF]
+        self.cpu.flag_reg[0] = entry >> 8
+        return entry & 0xFF
     
     def add(self, a, b):
-        result = a + b
-        carry = result > 0xFF
-        result = result & 0xFF
-        self._update_flags(result, carry)
-        return result
+        return self._binary(ADD_TABLE, a, b)
     
     def sub(self, a, b):
-        result = a - b
-        carry = a < b  # Заем при вычитании
-        result = result & 0xFF
-        self._update_flags(result, carry)
-        return result
+        return self._binary(SUB_TABLE, a, b)
     
     def xor(self, a, b):
-        result = (a ^ b) & 0xFF
-        self._update_flags(result, False)  # XOR не влияет на carry
-        return result
+        return self._binary(XOR_TABLE, a, b)
     
     def or_op(self, a, b):
-        result = (a | b) & 0xFF
-        self._update_flags(result, False)  # OR не влияет на carry
-        return result
+        return self._binary(OR_TABLE, a, b)
     
     def and_op(self, a, b):
-        result = (a & b) & 0xFF
-        self._update_flags(result, False)  # AND не влияет на carry
-        return result
+        return self._binary(AND_TABLE, a, b)
     
     def not_op(self, a):
-        result = (~a) & 0xFF
-        self._update_flags(result, False)  # NOT не влияет на carry
-        return result
+        return self._unary(NOT_TABLE, a)
     
     def shl(self, a):
-        carry = (a & 0x80) != 0  # Проверяем старший бит
-        result = (a << 1) & 0xFF
-        self._update_flags(result, carry)
-        return result
+        return self._unary(SHL_TABLE, a)
     
     def shr(self, a):
-        carry = (a & 0x01) != 0  # Проверяем младший бит
-        result = (a >> 1) & 0xFF
-        self._update_flags(result, carry)
+        return self._unary(SHR_TABLE, a)
+    
+    def inc(self, a):
+        return self._unary(INC_TABLE, a)
+    
+    def dec(self, a):
+        return self._unary(DEC_TABLE, a)
+    
+    def adc(self, a, b):
+        carry = (self.cpu.flag_reg[0] & FLAG_C) << 15
+        entry = ADC_TABLE[carry | ((a & 0xFF) << 8) | (b & 0xFF)]
+        self.cpu.flag_reg[0] = entry >> 8
+        return entry & 0xFF
+    
+    def sbb(self, a, b):
+        carry = (self.cpu.flag_reg[0] & FLAG_C) << 15
+        entry = SBB_TABLE[carry | ((a & 0xFF) << 8) | (b & 0xFF)]
+        self.cpu.flag_reg[0] = entry >> 8
+        return entry & 0xFF
+    
+    def mul(self, a, b):
+        """16-битное произведение двух байт"""
+        product = (a & 0xFF) * (b & 0xFF)
+        self._update_flags(product, product > 0xFF)
+        return product
+    
+    def div(self, dividend, divisor):
+        """16-битное частное от деления 16-битного делимого на байт"""
+        return self._divide(dividend, divisor, 0)
+    
+    def mod(self, dividend, divisor):
+        """Остаток от деления 16-битного делимого на байт"""
+        return self._divide(dividend, divisor, 1)
+    
+    def _divide(self, dividend, divisor, part):
+        dividend &= 0xFFFF
+        if not divisor & 0xFF:
+            self.cpu.flag_reg[0] = FLAG_C
+            return dividend
+        result = divmod(dividend, divisor & 0xFF)[part]
+        self._update_flags(result)
         return result
     
     def cmp(self, a, b):
         """Сравнение двух значений (как SUB, но без записи результата)"""
-        result = a - b
-        carry = a < b
-        result = result & 0xFF
-        self._update_flags(result, carry)
+        self.cpu.flag_reg[0] = SUB_TABLE[((a & 0xFF) << 8) | (b & 0xFF)] >> 8
         # CMP не возвращает результат, только устанавливает флаги
@@ -0,0 +1,270 @@
+from cpu.Alu import (ADD_TABLE, SUB_TABLE, XOR_TABLE, OR_TABLE, AND_TABLE,
+                     NOT_TABLE, SHL_TABLE, SHR_TABLE, INC_TABLE, DEC_TABLE,
+                     ADC_TABLE, SBB_TABLE)
+
+class BlockTranslator:
+    """Транслятор базовых блоков a8008 в функции Python.
+
+    Базовый блок - линейный участок кода от адреса start до первой инструкции
+    перехода (jmp/je/jne/jc/jnc, call/ret и их условные варианты, iret/hlt)
+    включительно. Для блока генерируется
+    исходный код одной функции, в которой ALU-операции и обновление флагов
+    встроены как выборки из таблиц ALU, затем он компилируется через compile(). Функция блока
+    выполняет все его инструкции, выставляет IP, добавляет такты к cpu.cycles
+    и возвращает их число.
+
+    Блок, который переходит сам на себя и является циклом опроса, после
+    перехода вызывает проверку простоя (IdleDetector.check).
+
+    Блоки кэшируются по адресу начала и сбрасываются при записи в их страницы
+    (через подписку на DecodeCache). Если блок сам пишет в свой код, он
+    завершается сразу после записи.
+
+    Исключения точные, как у интерпретатора: тело блока обернуто в try, и при
+    исключении (неподключенная память, обработчик MMIO, точка наблюдения)
+    IP ставится за сбойную инструкцию, а такты засчитываются только за
+    предыдущие. Строка блока, где случилось исключение, берется из traceback,
+    так что без исключений это ничего не стоит.
+    """
+    MAX_BLOCK_INSTRUCTIONS = 64
+
+    # Инструкции, которыми заканчивается блок (после ei ждущее прерывание должно войти сразу)
+    TERMINATORS = {"jmp_addr", "je_addr", "jne_addr", "jc_addr", "jnc_addr",
+                   "call_addr", "calle_addr", "callne_addr", "callc_addr", "callnc_addr",
+                   "ret", "rete", "retne", "retc", "retnc", "iret", "ei", "hlt", "illegal"}
+
+    # Условия встраиваемых переходов
+    CONDITIONS = {"je_addr": "flags[0] & 1", "jne_addr": "not flags[0] & 1",
+                  "jc_addr": "flags[0] & 2", "jnc_addr": "not flags[0] & 2"}
+
+    # Инструкции, пишущие в память: после них проверяем, жив ли еще блок
+    # (out тоже - он может переключить банк памяти под блоком)
+    MEMORY_WRITERS = {"stm_addr", "stm_pair", "push_r", "out_r", "movb", "outs", "ins"}
+
+    # Позиции регистров-приемников среди операндов (запись в IP - это переход)
+    DEST_OPERANDS = {
+        "mov_r": (0,), "ld_r": (0,), "add_r": (0,), "sub_r": (0,), "xor_r": (0,), "or_r": (0,),
+        "and_r": (0,), "not_r": (0,), "shl_r": (0,), "shr_r": (0,), "inc_r": (0,), "dec_r": (0,),
+        "ldm_r": (0,), "ldm_r_pair": (0,), "pop_r": (0,), "in_r": (1,),
+        "movb": (0, 1, 2, 3, 4), "outs": (1, 2, 3), "ins": (1, 2, 3),
+        "adc_r": (0,), "sbb_r": (0,), "mul_r": (0, 1), "div_r": (0, 1), "mod_r": (0, 1)
+    }
+
+    # Инструкции, встраиваемые как выборка из таблицы ALU
+    BINARY_TABLES = {"add_r": "ADD", "sub_r": "SUB", "xor_r": "XOR", "or_r": "OR", "and_r": "AND"}
+    UNARY_TABLES = {"not_r": "NOT", "shl_r": "SHL", "shr_r": "SHR", "inc_r": "INC", "dec_r": "DEC"}
+    CARRY_TABLES = {"adc_r": "ADC", "sbb_r": "SBB"}
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.blocks = {}       # адрес начала -> (функция блока, ячейка валидности)
+        self.page_blocks = {}  # страница -> множество адресов начала блоков
+        self.decode_cache = cpu.decode_cache
+        self.decode_cache.add_listener(self)
+
+    def translate(self, start):
+        """Транслирует блок, начинающийся с start, и возвращает его функцию"""
+        valid = [True]
+        namespace = {
+            "cpu": self.cpu,
+            "regs": self.cpu.regs,
+            "flags": self.cpu.flag_reg,
+            "read": self.cpu.ram.read,
+            "write": self.cpu.ram.write,
+            "valid": valid,
+            "ADD": ADD_TABLE, "SUB": SUB_TABLE, "XOR": XOR_TABLE, "OR": OR_TABLE,
+            "AND": AND_TABLE, "NOT": NOT_TABLE, "SHL": SHL_TABLE, "SHR": SHR_TABLE,
+            "INC": INC_TABLE, "DEC": DEC_TABLE, "ADC": ADC_TABLE, "SBB": SBB_TABLE,
+        }
+
+        instructions = []
+        address = start
+        while len(instructions) < self.MAX_BLOCK_INSTRUCTIONS:
+            try:
+                handler, operands, length, cycles = self.cpu.control_unit.decode_at(address)
+                body = self._body(address, handler, operands, length, namespace, not instructions)
+            except Exception:
+                if not instructions:
+                    raise
+                # Инструкция не декодируется или не встраивается: блок кончается
+                # перед ней, а ошибка возникнет, когда до нее дойдет выполнение
+                # (как в интерпретаторе)
+                break
+            instructions.append((address, handler, operands, length, cycles, body))
+            address = (address + length) & 0xFFFF
+            if handler.__name__ in self.TERMINATORS:
+                break
+
+        # Цикл опроса целиком в одном блоке: проверяем простой после перехода
+        detector = self.cpu.idle_detector
+        last_address, last_handler, last_operands = instructions[-1][:3]
+        idle_loop = (detector is not None
+                     and last_handler.__name__ in detector.JUMPS
+                     and last_operands[0] == start
+                     and detector.loop_ports(start, last_address) is not None)
+        if idle_loop:
+            namespace["idle_check"] = detector.check
+        source = self._generate(start, instructions, namespace, idle_loop)
+        code = compile(source, f"<block 0x{start:04X}>", "exec")
+        exec(code, namespace)
+        block = namespace[f"block_{start:04X}"]
+
+        self.blocks[start] = (block, valid)
+        end = address if address > start else 0x10000
+        code_pages = self.decode_cache.code_pages
+        for page in range(start >> 8, ((end - 1) >> 8) + 1):
+            self.page_blocks.setdefault(page, set()).add(start)
+            code_pages[page] = 1
+        return block
+
+    def _generate(self, start, instructions, namespace, idle_loop=False):
+        lines = [f"def block_{start:04X}():", "    try:"]
+        # Номер строки - 1 -> (IP, такты до инструкции) для исключения в этой строке
+        faults = []
+
+        def mark(state):
+            faults.extend([state] * (len(lines) - len(faults)))
+
+        def finish():
+            mark(None)
+            lines.extend(["    except BaseException as e:",
+                          "        fault(e.__traceback__.tb_lineno)",
+                          "        raise"])
+            namespace["fault"] = self._fault_handler(faults)
+            return "\n".join(lines) + "\n"
+
+        indent = "        "
+        total = 0
+        for address, handler, operands, length, cycles, body in instructions:
+            total += cycles
+            exit_lines = [f"cpu.cycles += {total}", f"return {total}"]
+            next_ip = (address + length) & 0xFFFF
+            name = handler.__name__
+            mark(None)
+            if 0x05 in operands and name not in self.TERMINATORS:
+                # Инструкция может читать IP: он должен указывать на следующую инструкцию
+                lines.append(f"{indent}regs[5] = {next_ip}")
+            lines.extend(indent + line for line in body)
+            mark((next_ip, total - cycles))
+            if name in self.MEMORY_WRITERS:
+                lines.append(f"{indent}if not valid[0]:")
+                lines.append(f"{indent}    regs[5] = {next_ip}")
+                lines.extend(f"{indent}    " + line for line in exit_lines)
+            if name in self.TERMINATORS:
+                if idle_loop:
+                    # Такты блока уже засчитаны, проверка простоя идет перед возвратом
+                    exit_lines.insert(1, f"if regs[5] == {start}: idle_check({start})")
+                lines.extend(indent + line for line in exit_lines)
+                return finish()
+            dests = self.DEST_OPERANDS.get(name, ())
+            if any(operands[dest] == 0x05 for dest in dests):
+                # Запись в IP меняет поток управления: блок заканчивается здесь
+                lines.extend(indent + line for line in exit_lines)
+                return finish()
+        lines.append(f"{indent}regs[5] = {next_ip}")
+        lines.extend(indent + line for line in exit_lines)
+        return finish()
+
+    def _body(self, address, handler, operands, length, namespace, first):
+        """Строки кода инструкции: встроенный вариант или вызов обработчика ControlUnit
+
+        Если встроить не удалось (недопустимые операнды), для первой инструкции
+        блока вызывается обработчик - ошибка возникнет при выполнении, как в
+        интерпретаторе; для остальных исключение уходит в translate().
+        """
+        name = handler.__name__
+        next_ip = (address + length) & 0xFFFF
+        body = None
+        # Подмененные обработчики (трассировка, профилирование) не встраиваем
+        if handler == getattr(self.cpu.control_unit, name):
+            try:
+                body = self._emit(name, operands, next_ip)
+            except Exception:
+                if not first:
+                    raise
+        if body is None:
+            # Нет встроенного варианта: вызываем обработчик ControlUnit
+            handler_name = f"h_{address:04X}"
+            namespace[handler_name] = handler
+            args = ", ".join(str(operand) for operand in operands)
+            body = [f"regs[5] = {next_ip}", f"{handler_name}({args})"]
+        return body
+
+    def _fault_handler(self, faults):
+        """Функция, выставляющая IP и такты, как у интерпретатора, по строке блока с исключением"""
+        cpu = self.cpu
+        regs = cpu.regs
+
+        def fault(line):
+            state = faults[line - 1] if 0 < line <= len(faults) else None
+            if state is not None:
+                regs[5] = state[0]
+                cpu.cycles += state[1]
+        return fault
+
+    def _emit(self, name, ops, next_ip):
+        """Возвращает строки кода для инструкции или None, если встраивания нет"""
+        if name == "nop":
+            return []
+        if name == "mov_r":
+            dest, src, bias = ops
+            mask = self.cpu.register_file.masks[dest]
+            return [f"regs[{dest}] = (regs[{src}] + {bias}) & {mask}"]
+        if name == "ld_r":
+            return [f"regs[{ops[0]}] = {ops[1]}"]
+        if name in self.BINARY_TABLES:
+            a, b = ops
+            return [f"e = {self.BINARY_TABLES[name]}[((regs[{a}] & 0xFF) << 8) | (regs[{b}] & 0xFF)]",
+                    f"regs[{a}] = e & 0xFF",
+                    "flags[0] = e >> 8"]
+        if name in self.CARRY_TABLES:
+            a, b = ops
+            return [f"e = {self.CARRY_TABLES[name]}[((flags[0] & 2) << 15) | ((regs[{a}] & 0xFF) << 8) | (regs[{b}] & 0xFF)]",
+                    f"regs[{a}] = e & 0xFF",
+                    "flags[0] = e >> 8"]
+        if name == "mul_r":
+            high, low = ops
+            return [f"e = (regs[{high}] & 0xFF) * (regs[{low}] & 0xFF)",
+                    f"regs[{high}] = e >> 8",
+                    f"regs[{low}] = e & 0xFF",
+                    "flags[0] = (e == 0) | ((e > 0xFF) << 1)"]
+        if name in self.UNARY_TABLES:
+            reg = ops[0]
+            return [f"e = {self.UNARY_TABLES[name]}[regs[{reg}] & 0xFF]",
+                    f"regs[{reg}] = e & 0xFF",
+                    "flags[0] = e >> 8"]
+        if name == "cmp_r":
+            a, b, mode = ops
+            if mode not in (0x00, 0x01, 0x02, 0x03):
+                return None
+            high = f"((regs[{a}] & 0xFF) << 8)" if mode in (0x00, 0x01) else str((a & 0xFF) << 8)
+            low = f"(regs[{b}] & 0xFF)" if mode in (0x00, 0x02) else str(b & 0xFF)
+            return [f"flags[0] = SUB[{high} | {low}] >> 8"]
+        if name == "ldm_r":
+            reg, addr = ops
+            return [f"regs[{reg}] = read({addr})"]
+        if name == "ldm_r_pair":
+            reg, high_reg, low_reg = ops
+            return [f"regs[{reg}] = read((regs[{high_reg}] << 8) | regs[{low_reg}])"]
+        if name == "stm_addr":
+            addr, reg = ops
+            return [f"write({addr}, regs[{reg}])"]
+        if name == "jmp_addr":
+            return [f"regs[5] = {ops[0]}"]
+        if name in self.CONDITIONS:
+            return [f"regs[5] = {ops[0]} if {self.CONDITIONS[name]} else {next_ip}"]
+        if name == "hlt":
+            return ["cpu.running = False", f"regs[5] = {next_ip}"]
+        return None
+
+    def invalidate_page(self, page):
+        for start in self.page_blocks.pop(page, ()):
+            entry = self.blocks.pop(start, None)
+            if entry is not None:
+                entry[1][0] = False
+
+    def invalidate_all(self):
+        for block, valid in self.blocks.values():
+            valid[0] = False
+        self.blocks.clear()
+        self.page_blocks.clear()
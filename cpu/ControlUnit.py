@@ -1,334 +1,561 @@
+from cpu.RegisterFile import FLAG_Z, FLAG_C, FIRST_REGISTER, LAST_REGISTER
+from cpu.Alu import (ADD_TABLE, SUB_TABLE, XOR_TABLE, OR_TABLE, AND_TABLE,
+                     NOT_TABLE, SHL_TABLE, SHR_TABLE, INC_TABLE, DEC_TABLE,
+                     ADC_TABLE, SBB_TABLE)
+
 class ControlUnit:
     def __init__(self, cpu):
         self.cpu = cpu
+        self.masks = cpu.register_file.masks
+        # опкод -> (имя обработчика, длина инструкции в байтах, такты)
         self.opcodes = {
-            0x00: ("nop", 1),
-            0x01: ("mov_r", 3),
-            0x02: ("ld_r", 3),
-            0x03: ("add_r", 2),
-            0x04: ("sub_r", 2),
-            0x05: ("xor_r", 2),
-            0x06: ("or_r", 2),
-            0x07: ("and_r", 2),
-            0x08: ("not_r", 2),
-            0x09: ("cmp_r", 3),
-            0x0A: ("jmp_addr", 2),
-            0x0B: ("je_addr", 2),
-            0x0C: ("jne_addr", 2),
-            0x0D: ("shl_r", 1),
-            0x0E: ("shr_r", 1),
-            0x0F: ("call_addr", 2),
-            0x10: ("ret", 1),
-            0x11: ("in_r", 1),
-            0x12: ("out_r", 1),
-            0x13: ("ldm_r", 3),
-            0x14: ("ldm_r_pair", 3),
-            0x15: ("push_r", 2),
-            0x16: ("pop_r", 2),
-            0x17: ("inc_r", 2),
-            0x18: ("dec_r", 2),
-            0x19: ("stm_addr", 3),
-            0x1A: ("stm_pair", 3),
-            0xff: ("hlt", 1)
+            0x00: ("nop", 1, 4),
+            0x01: ("mov_r", 4, 7),
+            0x02: ("ld_r", 4, 7),
+            0x03: ("add_r", 3, 5),
+            0x04: ("sub_r", 3, 5),
+            0x05: ("xor_r", 3, 5),
+            0x06: ("or_r", 3, 5),
+            0x07: ("and_r", 3, 5),
+            0x08: ("not_r", 3, 5),
+            0x09: ("cmp_r", 4, 7),
+            0x0A: ("jmp_addr", 3, 10),
+            0x0B: ("je_addr", 3, 10),
+            0x0C: ("jne_addr", 3, 10),
+            0x0D: ("shl_r", 2, 4),
+            0x0E: ("shr_r", 2, 4),
+            0x0F: ("call_addr", 3, 17),
+            0x10: ("ret", 1, 10),
+            0x11: ("in_r", 3, 10),
+            0x12: ("out_r", 3, 10),
+            0x13: ("ldm_r", 4, 13),
+            0x14: ("ldm_r_pair", 4, 10),
+            0x15: ("push_r", 2, 11),
+            0x16: ("pop_r", 2, 10),
+            0x17: ("inc_r", 2, 5),
+            0x18: ("dec_r", 2, 5),
+            0x19: ("stm_addr", 4, 13),
+            0x1A: ("stm_pair", 4, 10),
+            0x1B: ("ei", 1, 4),
+            0x1C: ("di", 1, 4),
+            0x1D: ("iret", 1, 14),
+            0x1E: ("movb", 6, 10),
+            0x1F: ("outs", 5, 10),
+            0x20: ("ins", 5, 10),
+            0x21: ("jc_addr", 3, 10),
+            0x22: ("jnc_addr", 3, 10),
+            0x23: ("calle_addr", 3, 11),
+            0x24: ("callne_addr", 3, 11),
+            0x25: ("callc_addr", 3, 11),
+            0x26: ("callnc_addr", 3, 11),
+            0x27: ("rete", 1, 5),
+            0x28: ("retne", 1, 5),
+            0x29: ("retc", 1, 5),
+            0x2A: ("retnc", 1, 5),
+            0x2B: ("adc_r", 3, 5),
+            0x2C: ("sbb_r", 3, 5),
+            0x2D: ("mul_r", 3, 12),
+            0x2E: ("div_r", 4, 20),
+            0x2F: ("mod_r", 4, 20),
+            0xff: ("hlt", 1, 4)
         }
+        
+        # Таблица диспетчеризации: байт опкода -> связанный обработчик.
+        # Неизвестные опкоды попадают в illegal()
+        self.dispatch = [self.illegal] * 256
+        self.by_name = {"illegal": self.illegal, "bad_register": self.bad_register}
+        for opcode, (name, _, _) in self.opcodes.items():
+            handler = getattr(self, name)
+            self.dispatch[opcode] = handler
+            self.by_name[name] = handler
+        
+        # Такты недопустимой инструкции (как у nop)
+        self.illegal_cycles = 4
+        
+        # Блочные инструкции (movb, outs, ins) добавляют такты за каждый байт
+        self.block_cycles = 4
+        
+        # Условные call/ret в таблице стоят как невыполненные, при выполнении
+        # добавляется разница до такта безусловных call (17) и ret (10)
+        self.call_taken_cycles = 6
+        self.ret_taken_cycles = 5
+        
+        # Инструкции с двухбайтовым адресом: имя -> позиция старшего байта среди операндов
+        self.address_operands = {
+            "jmp_addr": 0,
+            "je_addr": 0,
+            "jne_addr": 0,
+            "jc_addr": 0,
+            "jnc_addr": 0,
+            "call_addr": 0,
+            "calle_addr": 0,
+            "callne_addr": 0,
+            "callc_addr": 0,
+            "callnc_addr": 0,
+            "ldm_r": 1,
+            "stm_addr": 0
+        }
+        
+        # Позиции операндов-регистров (после сборки адреса). Код вне
+        # FIRST_REGISTER..LAST_REGISTER декодируется в bad_register. Второй
+        # операнд not не используется (ассемблер пишет туда 0)
+        self.register_operands = {
+            "mov_r": (0, 1), "ld_r": (0,), "add_r": (0, 1), "sub_r": (0, 1),
+            "xor_r": (0, 1), "or_r": (0, 1), "and_r": (0, 1), "not_r": (0,),
+            "shl_r": (0,), "shr_r": (0,), "ldm_r": (0,), "ldm_r_pair": (0, 1, 2),
+            "in_r": (0, 1), "out_r": (0, 1), "push_r": (0,), "pop_r": (0,),
+            "inc_r": (0,), "dec_r": (0,), "stm_addr": (1,), "stm_pair": (0, 1, 2),
+            "movb": (0, 1, 2, 3, 4), "outs": (0, 1, 2, 3), "ins": (0, 1, 2, 3),
+            "adc_r": (0, 1), "sbb_r": (0, 1), "mul_r": (0, 1),
+            "div_r": (0, 1, 2), "mod_r": (0, 1, 2)
+        }
+        # У cmp регистры зависят от режима (третий операнд)
+        self.cmp_register_operands = {0x00: (0, 1), 0x01: (0,), 0x02: (1,), 0x03: ()}
     
     def decode(self):
-        opcode = (self.cpu.registers[0x06].read()) & 0xFF
+        opcode = self.cpu.regs[0x06] & 0xFF
         if opcode in self.opcodes:
-            return self.opcodes[opcode]
+            name, length, _ = self.opcodes[opcode]
+            return name, length
         return None, 0
-
-    def execute(self, opcode_name):
+    
+    def decode_at(self, address):
+        """Декодирует инструкцию по адресу: (обработчик, операнды, длина, такты)"""
+        read = self.cpu.ram.read
+        opcode = read(address)
+        if opcode not in self.opcodes:
+            return self.by_name["illegal"], (opcode,), 1, self.illegal_cycles
         
-        print(f"{opcode_name} : {hex(self.cpu.registers[0x05].read()-1)} | {self.cpu.registers}")
+        name, length, cycles = self.opcodes[opcode]
+        operands = [read((address + offset) & 0xFFFF) for offset in range(1, length)]
         
-        if opcode_name == "nop":
-            pass
+        # Двухбайтовый адрес (high, low) собираем в одно число заранее
+        position = self.address_operands.get(name)
+        if position is not None:
+            operands[position:position + 2] = [(operands[position] << 8) | operands[position + 1]]
         
-        elif opcode_name == "mov_r":
-            self.cpu.fetch()
-            dest = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            src = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            bias = self.cpu.registers[0x06].read()
-            
-            value = self.cpu.registers[src].read() + bias
-            self.cpu.registers[dest].write(value)
-            
-        elif opcode_name == "ld_r":
-            self.cpu.fetch()
-            src = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            value = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            bias = self.cpu.registers[0x06].read()
-            
-            self.cpu.registers[src].write(value)
-            
-        elif opcode_name == "add_r":
-            self.cpu.fetch()
-            a = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            b = self.cpu.registers[0x06].read()
-            
-            value = self.cpu.alu.add(self.cpu.registers[a].read(), self.cpu.registers[b].read())
-            self.cpu.registers[a].write(value)
-            
-        elif opcode_name == "sub_r":
-            self.cpu.fetch()
-            a = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            b = self.cpu.registers[0x06].read()
-            
-            value = self.cpu.alu.sub(self.cpu.registers[a].read(), self.cpu.registers[b].read())
-            self.cpu.registers[a].write(value)
-            
-        elif opcode_name == "xor_r":
-            self.cpu.fetch()
-            a = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            b = self.cpu.registers[0x06].read()
-            
-            value = self.cpu.alu.xor(self.cpu.registers[a].read(), self.cpu.registers[b].read())
-            self.cpu.registers[a].write(value)
-            
-        elif opcode_name == "or_r":
-            self.cpu.fetch()
-            a = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            b = self.cpu.registers[0x06].read()
-            
-            value = self.cpu.alu.or_op(self.cpu.registers[a].read(), self.cpu.registers[b].read())
-            self.cpu.registers[a].write(value)
-            
-        elif opcode_name == "and_r":
-            self.cpu.fetch()
-            a = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            b = self.cpu.registers[0x06].read()
-            
-            value = self.cpu.alu.and_op(self.cpu.registers[a].read(), self.cpu.registers[b].read())
-            self.cpu.registers[a].write(value)
-            
-        elif opcode_name == "not_r":
-            self.cpu.fetch()
-            a = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            b = self.cpu.registers[0x06].read()
-            
-            value = self.cpu.alu.not_op(self.cpu.registers[a].read(), self.cpu.registers[b].read())
-            self.cpu.registers[a].write(value)
-            
-        elif opcode_name == "shl_r":
-            self.cpu.fetch()
-            src = self.cpu.registers[0x06].read()
-            value = self.cpu.registers[src].read()
-            value = self.cpu.alu.shl(value)
-            self.cpu.registers[src].write(value)
-            
-        elif opcode_name == "shr_r":
-            self.cpu.fetch()
-            src = self.cpu.registers[0x06].read()
-            value = self.cpu.registers[src].read()
-            value = self.cpu.alu.shr(value)
-            self.cpu.registers[src].write(value)
-            
-        elif opcode_name == "cmp_r":
-            self.cpu.fetch()
-            a = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            b = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            mode = self.cpu.registers[0x06].read()
-            
-            # Получаем значения в зависимости от режима
-            if mode == 0x00:  # R-R (регистр-регистр)
-                val_a = self.cpu.registers[a].read()
-                val_b = self.cpu.registers[b].read()
-            elif mode == 0x01:  # R-V (регистр-значение)
-                val_a = self.cpu.registers[a].read()
-                val_b = b  # b уже содержит непосредственное значение
-            elif mode == 0x02:  # V-R (значение-регистр)
-                val_a = a  # a уже содержит непосредственное значение
-                val_b = self.cpu.registers[b].read()
-            elif mode == 0x03:  # V-V (значение-значение)
-                val_a = a  # a уже содержит непосредственное значение
-                val_b = b  # b уже содержит непосредственное значение
-            else:
-                raise ValueError(f"Неизвестный режим CMP: {mode}")
-            
-            # Выполняем сравнение
-            self.cpu.alu.cmp(val_a, val_b)
-            
-        elif opcode_name == "jmp_addr":
-            self.cpu.fetch()
-            high = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            low = self.cpu.registers[0x06].read()
-            
-            addr = (high << 8) | low
-            
-            print("JMP: ", hex(addr), hex(low), hex(high))
-            
-            self.cpu.registers[0x05].write(addr)
-            
-        elif opcode_name == "je_addr":
-            self.cpu.fetch()
-            high = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            low = self.cpu.registers[0x06].read()
-            
-            if self.cpu.flags[0x01].read() == 0x01: # not 0
-                addr = (high << 8) | low
-                self.cpu.registers[0x05].write(addr)
-                
-        elif opcode_name == "jne_addr":
-            self.cpu.fetch()
-            high = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            low = self.cpu.registers[0x06].read()
-            
-            if self.cpu.flags[0x01].read() == 0x00: # is 0
-                addr = (high << 8) | low
-                self.cpu.registers[0x05].write(addr)
-                
-        elif opcode_name == "call_addr":
-            self.cpu.fetch()
-            high = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            low = self.cpu.registers[0x06].read()
-            self.cpu.push(self.cpu.registers[0x05].read_l())
-            self.cpu.push(self.cpu.registers[0x05].read_h())
-            addr = (high << 8) | low
-            self.cpu.registers[0x05].write(addr)
-            # Для меня завтрашнего: Доделать call и ret, попросить сделать ассемблер, начать делать девайсы. Для call юзай код тз jmp, только адресы записывай в порядке - push(ip->low); push(ip->high).
-            # Pop так-же, но в обратном порядке. Крч думаю ты понял, хд (пздц, пишу себе-же)
-            # -- STACK --
-            # ..
-            # high
-            # low
-            # ..
-            # -----------
-            
-        elif opcode_name == "ret":
-            high = self.cpu.pop()
-            low = self.cpu.pop()
-            addr = (high << 8) | low
-            self.cpu.registers[0x05].write(addr)
-            
-        elif opcode_name == "ldm_r":
-            self.cpu.fetch()
-            reg = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            high = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            low = self.cpu.registers[0x06].read()
-            
-            addr = (high << 8) | low
-            
-            value = self.cpu.ram.read(addr)
-            self.cpu.registers[reg].write(value)
-            
-        elif opcode_name == "ldm_r_pair":
-            self.cpu.fetch()
-            reg = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            high_reg = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            low_reg = self.cpu.registers[0x06].read()
-            
-            high = self.cpu.registers[high_reg].read()
-            low = self.cpu.registers[low_reg].read()
-            
-            addr = (high << 8) | low
-            
-            value = self.cpu.ram.read(addr)
-            self.cpu.registers[reg].write(value)
-            
-        elif opcode_name == "in_r":
-            self.cpu.fetch()
-            port_reg = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            save_reg = self.cpu.registers[0x06].read()
-            
-            port = self.cpu.registers[port_reg].read()
-            if hasattr(self.cpu, 'device_manager') and self.cpu.device_manager:
-                value = self.cpu.device_manager.device_out(port)
-                self.cpu.registers[save_reg].write(value)
+        registers = self.register_operands.get(name, ())
+        if name == "cmp_r":
+            registers = self.cmp_register_operands.get(operands[2], ())
+        for position in registers:
+            code = operands[position]
+            if not FIRST_REGISTER <= code <= LAST_REGISTER:
+                return self.by_name["bad_register"], (code,), length, cycles
+        
+        return self.dispatch[opcode], tuple(operands), length, cycles
+    
+    def replace_handler(self, name, handler):
+        """Подменяет обработчик инструкции name (трассировка, профилирование), возвращает старый
+        
+        Новый обработчик должен принимать те же операнды и иметь то же __name__.
+        Кэш декодирования сбрасывается, так как в нем лежат старые обработчики.
+        """
+        old = self.by_name[name]
+        self.by_name[name] = handler
+        for opcode, current in enumerate(self.dispatch):
+            if current == old:
+                self.dispatch[opcode] = handler
+        self.cpu.decode_cache.invalidate_all()
+        return old
+    
+    def nop(self):
+        pass
+    
+    def mov_r(self, dest, src, bias):
+        regs = self.cpu.regs
+        regs[dest] = (regs[src] + bias) & self.masks[dest]
+    
+    def ld_r(self, src, value, bias):
+        self.cpu.regs[src] = value
+    
+    def add_r(self, a, b):
+        regs = self.cpu.regs
+        entry = ADD_TABLE[((regs[a] & 0xFF) << 8) | (regs[b] & 0xFF)]
+        regs[a] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def sub_r(self, a, b):
+        regs = self.cpu.regs
+        entry = SUB_TABLE[((regs[a] & 0xFF) << 8) | (regs[b] & 0xFF)]
+        regs[a] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def xor_r(self, a, b):
+        regs = self.cpu.regs
+        entry = XOR_TABLE[((regs[a] & 0xFF) << 8) | (regs[b] & 0xFF)]
+        regs[a] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def or_r(self, a, b):
+        regs = self.cpu.regs
+        entry = OR_TABLE[((regs[a] & 0xFF) << 8) | (regs[b] & 0xFF)]
+        regs[a] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def and_r(self, a, b):
+        regs = self.cpu.regs
+        entry = AND_TABLE[((regs[a] & 0xFF) << 8) | (regs[b] & 0xFF)]
+        regs[a] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    # adc/sbb - сложение и вычитание с переносом/заемом из флага C (цепочки байт)
+    def adc_r(self, a, b):
+        regs = self.cpu.regs
+        flags = self.cpu.flag_reg
+        entry = ADC_TABLE[((flags[0] & FLAG_C) << 15) | ((regs[a] & 0xFF) << 8) | (regs[b] & 0xFF)]
+        regs[a] = entry & 0xFF
+        flags[0] = entry >> 8
+    
+    def sbb_r(self, a, b):
+        regs = self.cpu.regs
+        flags = self.cpu.flag_reg
+        entry = SBB_TABLE[((flags[0] & FLAG_C) << 15) | ((regs[a] & 0xFF) << 8) | (regs[b] & 0xFF)]
+        regs[a] = entry & 0xFF
+        flags[0] = entry >> 8
+    
+    # mul high, low: high:low = high * low (C - старший байт не нулевой)
+    def mul_r(self, high, low):
+        regs = self.cpu.regs
+        product = (regs[high] & 0xFF) * (regs[low] & 0xFF)
+        regs[high] = product >> 8
+        regs[low] = product & 0xFF
+        self.cpu.flag_reg[0] = (product == 0) | ((product > 0xFF) << 1)
+    
+    # div/mod high, low, divisor: high:low = high:low / divisor (% divisor).
+    # При делении на ноль пара не меняется и ставится C
+    def div_r(self, high, low, divisor):
+        self._divide(high, low, divisor, 0)
+    
+    def mod_r(self, high, low, divisor):
+        self._divide(high, low, divisor, 1)
+    
+    def _divide(self, high, low, divisor, part):
+        regs = self.cpu.regs
+        value = regs[divisor] & 0xFF
+        if not value:
+            self.cpu.flag_reg[0] = FLAG_C
+            return
+        result = divmod(((regs[high] & 0xFF) << 8) | (regs[low] & 0xFF), value)[part]
+        regs[high] = result >> 8
+        regs[low] = result & 0xFF
+        self.cpu.flag_reg[0] = result == 0
+    
+    def not_r(self, a, b):
+        regs = self.cpu.regs
+        entry = NOT_TABLE[regs[a] & 0xFF]
+        regs[a] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def shl_r(self, src):
+        regs = self.cpu.regs
+        entry = SHL_TABLE[regs[src] & 0xFF]
+        regs[src] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def shr_r(self, src):
+        regs = self.cpu.regs
+        entry = SHR_TABLE[regs[src] & 0xFF]
+        regs[src] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def cmp_r(self, a, b, mode):
+        regs = self.cpu.regs
+        
+        # Получаем значения в зависимости от режима
+        if mode == 0x00:  # R-R (регистр-регистр)
+            val_a = regs[a]
+            val_b = regs[b]
+        elif mode == 0x01:  # R-V (регистр-значение)
+            val_a = regs[a]
+            val_b = b  # b уже содержит непосредственное значение
+        elif mode == 0x02:  # V-R (значение-регистр)
+            val_a = a  # a уже содержит непосредственное значение
+            val_b = regs[b]
+        elif mode == 0x03:  # V-V (значение-значение)
+            val_a = a  # a уже содержит непосредственное значение
+            val_b = b  # b уже содержит непосредственное значение
+        else:
+            raise ValueError(f"Неизвестный режим CMP: {mode}")
+        
+        # Выполняем сравнение: флаги как у SUB, результат не сохраняется
+        self.cpu.flag_reg[0] = SUB_TABLE[((val_a & 0xFF) << 8) | (val_b & 0xFF)] >> 8
+    
+    def jmp_addr(self, addr):
+        self.cpu.regs[0x05] = addr
+    
+    def je_addr(self, addr):
+        if self.cpu.flag_reg[0] & FLAG_Z: # not 0
+            self.cpu.regs[0x05] = addr
+    
+    def jne_addr(self, addr):
+        if not self.cpu.flag_reg[0] & FLAG_Z: # is 0
+            self.cpu.regs[0x05] = addr
+    
+    # C - заем после sub/cmp: jc (jb) - "меньше" для беззнаковых, jnc (jae) - "больше или равно"
+    def jc_addr(self, addr):
+        if self.cpu.flag_reg[0] & FLAG_C:
+            self.cpu.regs[0x05] = addr
+    
+    def jnc_addr(self, addr):
+        if not self.cpu.flag_reg[0] & FLAG_C:
+            self.cpu.regs[0x05] = addr
+    
+    def call_addr(self, addr):
+        cpu = self.cpu
+        ip = cpu.regs[0x05]
+        cpu.push(ip & 0xFF)
+        cpu.push(ip >> 8)
+        cpu.regs[0x05] = addr
+        # Для меня завтрашнего: Доделать call и ret, попросить сделать ассемблер, начать делать девайсы. Для call юзай код тз jmp, только адресы записывай в порядке - push(ip->low); push(ip->high).
+        # Pop так-же, но в обратном порядке. Крч думаю ты понял, хд (пздц, пишу себе-же)
+        # -- STACK --
+        # ..
+        # high
+        # low
+        # ..
+        # -----------
+    
+    def ret(self):
+        high = self.cpu.pop()
+        low = self.cpu.pop()
+        self.cpu.regs[0x05] = (high << 8) | low
+    
+    # Условные call/ret выполняются через обработчики call_addr/ret из by_name,
+    # так что их подмена (профилировщик вызовов) видит и условные переходы
+    def _call_taken(self, addr):
+        self.by_name["call_addr"](addr)
+        self.cpu.cycles += self.call_taken_cycles
+    
+    def _ret_taken(self):
+        self.by_name["ret"]()
+        self.cpu.cycles += self.ret_taken_cycles
+    
+    def calle_addr(self, addr):
+        if self.cpu.flag_reg[0] & FLAG_Z:
+            self._call_taken(addr)
+    
+    def callne_addr(self, addr):
+        if not self.cpu.flag_reg[0] & FLAG_Z:
+            self._call_taken(addr)
+    
+    def callc_addr(self, addr):
+        if self.cpu.flag_reg[0] & FLAG_C:
+            self._call_taken(addr)
+    
+    def callnc_addr(self, addr):
+        if not self.cpu.flag_reg[0] & FLAG_C:
+            self._call_taken(addr)
+    
+    def rete(self):
+        if self.cpu.flag_reg[0] & FLAG_Z:
+            self._ret_taken()
+    
+    def retne(self):
+        if not self.cpu.flag_reg[0] & FLAG_Z:
+            self._ret_taken()
+    
+    def retc(self):
+        if self.cpu.flag_reg[0] & FLAG_C:
+            self._ret_taken()
+    
+    def retnc(self):
+        if not self.cpu.flag_reg[0] & FLAG_C:
+            self._ret_taken()
+    
+    def ldm_r(self, reg, addr):
+        self.cpu.regs[reg] = self.cpu.ram.read(addr)
+    
+    def ldm_r_pair(self, reg, high_reg, low_reg):
+        regs = self.cpu.regs
+        addr = (regs[high_reg] << 8) | regs[low_reg]
+        
+        regs[reg] = self.cpu.ram.read(addr)
+    
+    def in_r(self, port_reg, save_reg):
+        regs = self.cpu.regs
+        port = regs[port_reg]
+        if hasattr(self.cpu, 'device_manager') and self.cpu.device_manager:
+            value = self.port_in(port)
+            regs[save_reg] = value & self.masks[save_reg]
+        else:
+            print(f"Нет менеджера устройств для порта {port}")
+    
+    def out_r(self, port_reg, value_reg):
+        regs = self.cpu.regs
+        port = regs[port_reg]
+        value = regs[value_reg]
+        
+        if hasattr(self.cpu, 'device_manager') and self.cpu.device_manager:
+            self.port_out(port, value)
+        else:
+            print(f"Нет менеджера устройств для порта {port}")
+    
+    # Весь обмен с портами (in/out и блочные ins/outs) идет по байту через
+    # port_in/port_out - их оборачивают отладчики (точки наблюдения за
+    # портами, профилировщик, трассировка). Пока обертки нет, ins/outs
+    # отдают блок устройству целиком через read_block/write_block.
+    
+    def port_in(self, port):
+        """Байт от устройства на порту port"""
+        return self.cpu.device_manager.device_out(port)
+    
+    def port_out(self, port, value):
+        """Байт устройству на порту port"""
+        self.cpu.device_manager.device_in(port, value)
+    
+    def push_r(self, reg):
+        self.cpu.push(self.cpu.regs[reg])
+    
+    def pop_r(self, reg):
+        self.cpu.regs[reg] = self.cpu.pop()
+    
+    def inc_r(self, reg):
+        regs = self.cpu.regs
+        entry = INC_TABLE[regs[reg] & 0xFF]
+        regs[reg] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def dec_r(self, reg):
+        regs = self.cpu.regs
+        entry = DEC_TABLE[regs[reg] & 0xFF]
+        regs[reg] = entry & 0xFF
+        self.cpu.flag_reg[0] = entry >> 8
+    
+    def stm_addr(self, addr, reg):
+        self.cpu.ram.write(addr, self.cpu.regs[reg])
+    
+    def stm_pair(self, high_reg, low_reg, reg):
+        regs = self.cpu.regs
+        addr = (regs[high_reg] << 8) | regs[low_reg]
+        
+        self.cpu.ram.write(addr, regs[reg])
+    
+    def ei(self):
+        self.cpu.set_interrupt_enabled(True)
+    
+    def di(self):
+        self.cpu.set_interrupt_enabled(False)
+    
+    def iret(self):
+        # Стек при входе в прерывание: флаги, младший и старший байт адреса возврата
+        cpu = self.cpu
+        high = cpu.pop()
+        low = cpu.pop()
+        cpu.regs[0x05] = (high << 8) | low
+        cpu.flag_reg[0] = cpu.pop()
+        cpu.set_interrupt_enabled(True)
+    
+    # -- Блочные инструкции --
+    # Адрес - пара регистров (старший, младший), число байт - в регистре count.
+    # После инструкции пары указывают за конец блока, count = 0.
+    
+    def movb(self, dest_high, dest_low, src_high, src_low, count_reg):
+        regs = self.cpu.regs
+        count = regs[count_reg]
+        src = (regs[src_high] << 8) | regs[src_low]
+        dest = (regs[dest_high] << 8) | regs[dest_low]
+        if count:
+            if 0 < ((dest - src) & 0xFFFF) < count:
+                # Приемник внутри источника: копируем по байту вперед, как цикл
+                # (так movb заполняет область повтором первых байтов)
+                read = self.cpu.ram.read
+                write = self.cpu.ram.write
+                for offset in range(count):
+                    write((dest + offset) & 0xFFFF, read((src + offset) & 0xFFFF))
             else:
-                print(f"Нет менеджера устройств для порта {port}")
-
-        elif opcode_name == "out_r":
-            self.cpu.fetch()
-            port_reg = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            value_reg = self.cpu.registers[0x06].read()
-            
-            port = self.cpu.registers[port_reg].read()
-            value = self.cpu.registers[value_reg].read()
-            
-            if hasattr(self.cpu, 'device_manager') and self.cpu.device_manager:
-                self.cpu.device_manager.device_in(port, value)
+                self._write_block(dest, self._read_block(src, count))
+        self._set_pair(src_high, src_low, src + count)
+        self._set_pair(dest_high, dest_low, dest + count)
+        regs[count_reg] = 0
+        self.cpu.cycles += count * self.block_cycles
+    
+    def outs(self, port_reg, high_reg, low_reg, count_reg):
+        regs = self.cpu.regs
+        count = regs[count_reg]
+        port = regs[port_reg]
+        address = (regs[high_reg] << 8) | regs[low_reg]
+        device_manager = getattr(self.cpu, 'device_manager', None)
+        if count and device_manager:
+            data = self._read_block(address, count)
+            # write_block дает тот же итог, что out по байту (байты команд
+            # устройства остаются командами)
+            device = None if 'port_out' in self.__dict__ else device_manager.get_device(port)
+            if device is not None and hasattr(device, 'write_block'):
+                device.write_block(data)
             else:
-                print(f"Нет менеджера устройств для порта {port}")
-                
-        elif opcode_name == "push_r":
-            self.cpu.fetch()
-            reg = self.cpu.registers[0x06].read()
-            value = self.cpu.registers[reg].read()
-            self.cpu.push(value)
-            
-        elif opcode_name == "pop_r":
-            self.cpu.fetch()
-            reg = self.cpu.registers[0x06].read()
-            value = self.cpu.pop()
-            
-            self.cpu.registers[reg].write(value)
-            
-        elif opcode_name == "inc_r":
-            self.cpu.fetch()
-            reg = self.cpu.registers[0x06].read()
-            value = self.cpu.registers[reg].read()
-            value = self.cpu.alu.add(value, 1)
-            self.cpu.registers[reg].write(value)
-            
-        elif opcode_name == "dec_r":
-            self.cpu.fetch()
-            reg = self.cpu.registers[0x06].read()
-            value = self.cpu.registers[reg].read()
-            value = self.cpu.alu.sub(value, 1)
-            self.cpu.registers[reg].write(value)
-        
-        elif opcode_name == "stm_addr":
-            self.cpu.fetch()
-            high = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            low = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            reg = self.cpu.registers[0x06].read()
-            
-            addr = (high << 8) | low
-            
-            self.cpu.ram.write(addr, self.cpu.registers[reg].read())
-            
-        elif opcode_name == "stm_pair":
-            self.cpu.fetch()
-            high_reg = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            low_reg = self.cpu.registers[0x06].read()
-            self.cpu.fetch()
-            reg = self.cpu.registers[0x06].read()
-            
-            print(high_reg, low_reg, reg)
-            
-            high = self.cpu.registers[high_reg].read()
-            low = self.cpu.registers[low_reg].read()
-            
-            addr = (high << 8) | low
-            
-            self.cpu.ram.write(addr, self.cpu.registers[reg].read())
-            
-        elif opcode_name == "hlt":
-            self.cpu.running = False
-            
\ No newline at end of file
+                port_out = self.port_out
+                for value in data:
+                    port_out(port, value)
+        elif count:
+            print(f"Нет менеджера устройств для порта {port}")
+        self._set_pair(high_reg, low_reg, address + count)
+        regs[count_reg] = 0
+        self.cpu.cycles += count * self.block_cycles
+    
+    def ins(self, port_reg, high_reg, low_reg, count_reg):
+        regs = self.cpu.regs
+        count = regs[count_reg]
+        port = regs[port_reg]
+        address = (regs[high_reg] << 8) | regs[low_reg]
+        device_manager = getattr(self.cpu, 'device_manager', None)
+        if count and device_manager:
+            data = b""
+            device = None if 'port_in' in self.__dict__ else device_manager.get_device(port)
+            if device is not None and hasattr(device, 'read_block'):
+                data = bytes(device.read_block(count))
+            # Поток кончился раньше: остальное - как у in (значение по умолчанию)
+            rest = count - len(data)
+            if rest:
+                port_in = self.port_in
+                data += bytes(port_in(port) & 0xFF for _ in range(rest))
+            self._write_block(address, data)
+        elif count:
+            print(f"Нет менеджера устройств для порта {port}")
+        self._set_pair(high_reg, low_reg, address + count)
+        regs[count_reg] = 0
+        self.cpu.cycles += count * self.block_cycles
+    
+    def _set_pair(self, high_reg, low_reg, address):
+        regs = self.cpu.regs
+        regs[high_reg] = (address >> 8) & 0xFF & self.masks[high_reg]
+        regs[low_reg] = address & 0xFF & self.masks[low_reg]
+    
+    def _sliced_ram(self):
+        """Шина, если блок можно переслать срезом: у памяти есть view, а read/write не подменены отладчиком"""
+        ram = self.cpu.ram
+        if hasattr(ram, 'view') and 'read' not in ram.__dict__ and 'write' not in ram.__dict__:
+            return ram
+        return None
+    
+    def _read_block(self, address, count):
+        ram = self._sliced_ram()
+        if ram is not None and address + count <= 0x10000:
+            try:
+                return bytes(ram.view(address, count))
+            except ValueError:
+                pass  # окна устройств или неподключенные страницы - по байту
+        read = self.cpu.ram.read
+        return bytes(read((address + offset) & 0xFFFF) for offset in range(count))
+    
+    def _write_block(self, address, data):
+        ram = self._sliced_ram()
+        if ram is not None and address + len(data) <= 0x10000 and ram.is_ram(address, len(data)):
+            ram.load(address, data)
+            return
+        write = self.cpu.ram.write
+        for offset, value in enumerate(data):
+            write((address + offset) & 0xFFFF, value)
+    
+    def hlt(self):
+        self.cpu.running = False
+    
+    def bad_register(self, code):
+        """Операнд с кодом несуществующего регистра: ошибка при выполнении, IP уже за инструкцией"""
+        raise KeyError(code)
+    
+    def illegal(self, opcode):
+        """Недопустимый опкод: останавливаем процессор"""
+        address = (self.cpu.regs[0x05] - 1) & 0xFFFF
+        print(f"Недопустимая инструкция 0x{opcode:02X} по адресу {hex(address)}")
+        self.cpu.fault = opcode
+        self.cpu.running = False
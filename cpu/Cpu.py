@@ -1,94 +1,256 @@
 from cpu.Alu import Alu
-from cpu.Reg8 import Reg8
-from cpu.Reg16 import Reg16
+from cpu.RegisterFile import RegisterFile
 from cpu.ControlUnit import ControlUnit
+from cpu.DecodeCache import DecodeCache
+from cpu.BlockTranslator import BlockTranslator
+from cpu.IdleDetector import IdleDetector
 
 import time
 
 class Cpu:
+    # Движки исполнения: пошаговый интерпретатор или транслятор базовых блоков
+    ENGINES = ("interpreter", "translator")
+    
     def __init__(self):
         self.name = "a8008 - 8bit cpu"
-        self.registers = {
-            0x01: Reg8(),   # A
-            0x02: Reg8(),   # B
-            0x03: Reg8(),   # C
-            0x04: Reg8(),   # D
-            0x05: Reg16(),  # IP (Instruction Pointer)
-            0x06: Reg8(),   # IR (Instruction Register)
-            0x07: Reg8(),   # SP (Stack Pointer)
-            0x08: Reg8(),   # BP (Base Pointer)
-            0x09: Reg8(),   # SS (Stack Segment)
-        }
-        self.flags = {
-            0x01: Reg8(),  # Z (Zero)
-            0x02: Reg8()   # C (Carry)
-        }
+        # Регистры: 0x01 A, 0x02 B, 0x03 C, 0x04 D, 0x05 IP (16 бит),
+        # 0x06 IR, 0x07 SP, 0x08 BP, 0x09 SS
+        self.register_file = RegisterFile()
+        self.regs = self.register_file.regs        # быстрый доступ: regs[код]
+        self.flag_reg = self.register_file.flags   # флаги: бит 0 - Z, бит 1 - C
+        
+        # Совместимые представления: registers[0x05].read(), flags[0x01].read()
+        self.registers = self.register_file.views()
+        self.flags = self.register_file.flag_views()
         self.alu = Alu(self)
         self.control_unit = ControlUnit(self)
+        self.decode_cache = DecodeCache(self.control_unit)
+        self.translator = None
+        self.engine = "interpreter"
         self.ram = None
         self.running = False
+        self.fault = None  # опкод, на котором процессор остановился с ошибкой
+        self.paused = False  # остановлен отладчиком (точка останова), а не hlt
+        self.cycles = 0    # счетчик тактов (см. таблицу тактов в ControlUnit.opcodes)
+        # Хуки hook(ip, entry), вызываемые перед каждой инструкцией (трассировка, отладка)
+        self.exec_hooks = []
+        # Прерывания (см. InterruptController): флаг разрешения (ei/di) и запрос контроллера
+        self.interrupts = None
+        self.interrupt_enabled = False
+        self.irq_request = False
+        # Простой в цикле опроса (см. IdleDetector): idle выставляется, когда остаток
+        # порции run_for до slice_end засчитан без выполнения (None - вне run_for)
+        self.idle_detector = None
+        self.idle = False
+        self.slice_end = None
     
     def set_ram(self, ram):
         self.ram = ram
+        # Память сообщает кэшу декодирования о записи в страницы с кодом
+        if hasattr(ram, 'attach_code_cache'):
+            ram.attach_code_cache(self.decode_cache)
+        self.decode_cache.invalidate_all()
+    
+    def set_engine(self, engine):
+        """Выбирает движок исполнения: "interpreter" или "translator"
+        
+        Движок подменяет метод step(): в режиме транслятора один шаг
+        выполняет целый базовый блок. В обоих режимах step() возвращает
+        число выполненных тактов.
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Неизвестный движок исполнения: {engine}")
+        
+        if engine == "translator" and self.translator is None:
+            self.translator = BlockTranslator(self)
+        self.engine = engine
+        self._select_step()
+    
+    def _select_step(self):
+        # Хуки требуют пошагового выполнения, без них цикл выполнения не платит за проверки.
+        # Запрос прерывания подменяет шаг на один раз (step_interrupt)
+        if self.irq_request:
+            self.step = self.step_interrupt
+        elif self.exec_hooks:
+            self.step = self.step_hooked
+        elif self.engine == "translator":
+            self.step = self.step_block
+        else:
+            self.__dict__.pop("step", None)
+    
+    def add_exec_hook(self, hook, first=False):
+        """Подключает hook(ip, entry), вызываемый перед каждой инструкцией
+        
+        entry - запись кэша декодирования (обработчик, операнды, длина, такты).
+        Хук может остановить процессор (running = False), тогда инструкция
+        не выполняется, а следующие хуки не вызываются; такие хуки (точки
+        останова) подключаются с first=True. Пока подключен хоть один хук,
+        транслятор блоков не используется.
+        """
+        if first:
+            self.exec_hooks.insert(0, hook)
+        else:
+            self.exec_hooks.append(hook)
+        self._select_step()
+    
+    def remove_exec_hook(self, hook):
+        if hook in self.exec_hooks:
+            self.exec_hooks.remove(hook)
+        self._select_step()
+    
+    def set_idle_detection(self, enabled):
+        """Включает или выключает пропуск циклов опроса устройств (IdleDetector)"""
+        if enabled and self.idle_detector is None:
+            self.idle_detector = IdleDetector(self)
+            self.decode_cache.add_listener(self.idle_detector)
+        elif not enabled and self.idle_detector is not None:
+            self.decode_cache.listeners.remove(self.idle_detector)
+            self.idle_detector = None
+        self.decode_cache.idle_detector = self.idle_detector
+        self.idle = False
+        # Записи кэша и блоки собраны с проверкой простоя или без нее
+        self.decode_cache.invalidate_all()
+    
+    def set_interrupt_enabled(self, enabled):
+        """Разрешает (ei) или запрещает (di) прием прерываний"""
+        self.interrupt_enabled = enabled
+        if self.interrupts is not None:
+            self.interrupts.update()
+        elif self.irq_request:
+            self.irq_request = False
+            self._select_step()
     
     def set_device_manager(self, device_manager):
         self.device_manager = device_manager
         
     def _calculate_stack_address(self):
-        ss = self.registers[0x09].read()  # Stack Segment
-        sp = self.registers[0x07].read()  # Stack Pointer
         # 1 единица в SS = 256 байт (0x100)
-        stack_base = ss * 0x100
-        return stack_base + sp
+        return (self.regs[0x09] << 8) + self.regs[0x07]
     
     def fetch(self):
-        ip = self.registers[0x05].read()
-        instruction = self.ram.read(ip)
-        self.registers[0x06].write(instruction)
-        self.registers[0x05].write(ip + 1)
+        """Читает байт по IP в IR, сдвигает IP и возвращает прочитанный байт"""
+        regs = self.regs
+        ip = regs[0x05]
+        instruction = regs[0x06] = self.ram.read(ip)
+        regs[0x05] = (ip + 1) & 0xFFFF
+        return instruction
         
     def push(self, data):
         data = data & 0xFF
         
         # Сначала уменьшаем SP, затем записываем данные
-        sp = self.registers[0x07].read()
-        sp = (sp - 1) & 0xFF  # Уменьшаем SP с учетом 8-битного переполнения
-        self.registers[0x07].write(sp)
+        self.regs[0x07] = (self.regs[0x07] - 1) & 0xFF  # Уменьшаем SP с учетом 8-битного переполнения
         
         # Вычисляем физический адрес стека
         stack_address = self._calculate_stack_address()
-        print("Stack Addr Push: ", stack_address)
         self.ram.write(stack_address, data)
         
         
     def pop(self):
         # Сначала читаем данные, затем увеличиваем SP
         stack_address = self._calculate_stack_address()
-        print("Stack Addr Pop: ", stack_address)
         data = self.ram.read(stack_address)
         
-        sp = self.registers[0x07].read()
-        sp = (sp + 1) & 0xFF  # Увеличиваем SP с учетом 8-битного переполнения
-        self.registers[0x07].write(sp)
+        self.regs[0x07] = (self.regs[0x07] + 1) & 0xFF  # Увеличиваем SP с учетом 8-битного переполнения
         
         return data
     
     def execute(self):
-        opcode_name, _ = self.control_unit.decode()
-        self.control_unit.execute(opcode_name)
+        """Выполняет инструкцию, опкод которой уже прочитан через fetch()"""
+        regs = self.regs
+        ip = (regs[0x05] - 1) & 0xFFFF
+        handler, operands, length, cycles = self.control_unit.decode_at(ip)
+        regs[0x05] = (ip + length) & 0xFFFF
+        self.cycles += cycles
+        handler(*operands)
     
     def run(self, start=0):
-        self.registers[0x05].write(start)
-        self.registers[0x09].write(0x00)  # SS = 0 (первый сегмент)
-        self.registers[0x07].write(0xFF)  # SP = 0xFF (верх сегмента)
+        self.regs[0x05] = start & 0xFFFF
+        self.regs[0x09] = 0x00  # SS = 0 (первый сегмент)
+        self.regs[0x07] = 0xFF  # SP = 0xFF (верх сегмента)
         self.running = True
-        print(self.ram.memory[0x0107])
+        self.fault = None
+        self.paused = False
+        self.set_interrupt_enabled(False)
+        # Память могла быть перезаписана в обход RAM.write (загрузка boot-файлов)
+        self.decode_cache.invalidate_all()
         
     def step(self):
         if self.running:
-            self.fetch()
-            self.execute()
-            #time.sleep(1/740)
-            
-        # print(self.registers)
-        # print(f"Flags - Z: {hex(self.flags[0x01].read())}, C: {hex(self.flags[0x02].read())}")
+            regs = self.regs
+            ip = regs[0x05]
+            entry = self.decode_cache.entries[ip]
+            if entry is None:
+                entry = self.decode_cache.fill(ip)
+            handler, operands, length, cycles = entry
+            regs[0x05] = (ip + length) & 0xFFFF
+            handler(*operands)
+            self.cycles += cycles
+            return cycles
+        return 0
+    
+    def step_hooked(self):
+        """step() с вызовом exec_hooks перед инструкцией"""
+        if self.running:
+            regs = self.regs
+            ip = regs[0x05]
+            entry = self.decode_cache.entries[ip]
+            if entry is None:
+                entry = self.decode_cache.fill(ip)
+            for hook in self.exec_hooks:
+                hook(ip, entry)
+                if not self.running:
+                    return 0
+            handler, operands, length, cycles = entry
+            regs[0x05] = (ip + length) & 0xFFFF
+            handler(*operands)
+            self.cycles += cycles
+            return cycles
+        return 0
+    
+    def step_interrupt(self):
+        """Шаг, на котором процессор входит в обработчик прерывания вместо очередной инструкции"""
+        self.irq_request = False
+        self._select_step()
+        if self.running:
+            return self.interrupts.enter()
+        return 0
+    
+    def run_for(self, cycles):
+        """Выполняет не меньше cycles тактов (или до остановки), возвращает их число
+        
+        Если процессор застрял в цикле опроса (IdleDetector), остаток порции
+        засчитывается без выполнения и выставляется idle.
+        """
+        start = self.cycles
+        end = self.slice_end = start + cycles
+        self.idle = False
+        try:
+            # self.step читается на каждом шаге: прерывание может подменить его посреди порции
+            while self.cycles < end and self.running:
+                self.step()
+        finally:
+            # Одиночные step() вне порции простой не засчитывают (IdleDetector.check)
+            self.slice_end = None
+        return self.cycles - start
+    
+    def run_until(self, deadline, slice_size=1000):
+        """Выполняет порции по slice_size тактов до момента deadline (по time.perf_counter())"""
+        executed = 0
+        while self.running and time.perf_counter() < deadline:
+            executed += self.run_for(slice_size)
+            if self.idle:
+                # До конца кадра устройства не изменятся: отдаем время хосту
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+                break
+        return executed
+    
+    def step_block(self):
+        """Выполняет один базовый блок через транслятор, возвращает число тактов"""
+        if self.running:
+            ip = self.regs[0x05]
+            entry = self.translator.blocks.get(ip)
+            if entry is None:
+                return self.translator.translate(ip)()
+            return entry[0]()
+        return 0
@@ -0,0 +1,51 @@
+class DecodeCache:
+    """Кэш декодированных инструкций по адресу.
+
+    Для каждого адреса хранится кортеж (обработчик, операнды, длина, такты).
+    Память делится на страницы по 256 байт; страницы, из которых уже
+    декодировался код, отмечаются в code_pages. Запись в такую страницу
+    сбрасывает ее записи, поэтому самомодифицирующийся код остается корректным.
+    Другие кэши кода (транслятор блоков) подписываются через add_listener().
+    Если подключен idle_detector, он может обернуть запись обратного перехода
+    цикла опроса (см. IdleDetector.watch).
+    """
+    PAGE_SHIFT = 8
+    PAGE_SIZE = 1 << PAGE_SHIFT
+    MAX_INSTRUCTION_LENGTH = 6
+
+    def __init__(self, control_unit):
+        self.control_unit = control_unit
+        self.entries = [None] * 0x10000
+        self.code_pages = bytearray(0x10000 >> self.PAGE_SHIFT)
+        self.listeners = []
+        self.idle_detector = None
+
+    def add_listener(self, listener):
+        """Подписывает объект с invalidate_page(page) и invalidate_all() на сброс кэша"""
+        self.listeners.append(listener)
+
+    def fill(self, address):
+        """Декодирует инструкцию, кладет ее в кэш и возвращает запись"""
+        entry = self.control_unit.decode_at(address)
+        if self.idle_detector is not None:
+            entry = self.idle_detector.watch(address, entry)
+        self.entries[address] = entry
+        self.code_pages[address >> self.PAGE_SHIFT] = 1
+        self.code_pages[((address + entry[2] - 1) & 0xFFFF) >> self.PAGE_SHIFT] = 1
+        return entry
+
+    def invalidate_page(self, page):
+        """Сбрасывает инструкции страницы, включая начатые на предыдущей странице"""
+        start = page << self.PAGE_SHIFT
+        first = max(0, start - (self.MAX_INSTRUCTION_LENGTH - 1))
+        end = start + self.PAGE_SIZE
+        self.entries[first:end] = [None] * (end - first)
+        self.code_pages[page] = 0
+        for listener in self.listeners:
+            listener.invalidate_page(page)
+
+    def invalidate_all(self):
+        self.entries[:] = [None] * 0x10000
+        self.code_pages[:] = bytes(len(self.code_pages))
+        for listener in self.listeners:
+            listener.invalidate_all()
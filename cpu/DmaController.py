@@ -0,0 +1,236 @@
+import struct
+from collections import deque
+
+NO_PORT = 0xFFFF
+
+class DmaController:
+    """Контроллер прямого доступа к памяти, подключается к порту как устройство.
+
+    Пересылает блок length байт одним срезом: память -> память, поток
+    устройства -> память или память -> устройство. Процессор задает
+    параметры через out на порт контроллера (команда, затем ее байты,
+    адреса и длина - старший байт первым):
+
+        0x01 hi lo - источник: адрес в памяти
+        0x02 hi lo - приемник: адрес в памяти
+        0x03 hi lo - длина
+        0x04 port  - источник: устройство на порту port
+        0x05 port  - приемник: устройство на порту port
+        0x06       - начать пересылку
+        0x07       - следующие два in вернут число пересланных байт (hi, lo)
+        0x08       - сброс параметров
+
+    in возвращает статус: бит 0 - пересылка завершена, бит 1 - ошибка.
+    По завершении поднимается линия прерывания контроллера, чтение статуса
+    ее снимает. Поток устройства может закончиться раньше длины (конец
+    кассеты, пустой буфер клавиатуры) - тогда пересылается сколько есть.
+    Устройства с read_block(count)/write_block(data) отдают и принимают блок
+    целиком - с тем же итогом, что device_out/device_in по байту (байты
+    команд в блоке остаются командами), с остальными контроллер работает
+    через device_out/device_in.
+    На время пересылки процессор стоит: по CYCLES_PER_BYTE тактов на байт.
+    """
+    CYCLES_PER_BYTE = 1
+
+    DONE = 0x01
+    ERROR = 0x02
+
+    # Число байт аргументов у команд
+    ARGUMENTS = {0x01: 2, 0x02: 2, 0x03: 2, 0x04: 1, 0x05: 1}
+
+    STATE = struct.Struct("<HHHHHBHB")
+
+    irq_line = None
+    irq_controller = None
+
+    def __init__(self, bus, device_manager, cpu=None, device_name="Dma"):
+        self.bus = bus
+        self.device_manager = device_manager
+        self.cpu = cpu
+        self.device_name = device_name
+        # Для менеджера устройств окна: контроллер ничего не рисует и не ловит ввод
+        self.visible = False
+        self.accepts_keyboard_input = False
+        self.reset()
+
+    def reset(self):
+        self.source = 0
+        self.dest = 0
+        self.length = 0
+        self.source_port = None  # None - источник в памяти
+        self.dest_port = None    # None - приемник в памяти
+        self.status = 0
+        self.count = 0           # байт переслано последней пересылкой
+        self.command = None      # команда, ждущая байты аргументов
+        self.arguments = []
+        self.readout = deque()   # байты для следующих in (команда 0x07)
+
+    # -- Порт --
+
+    def device_in(self, value):
+        value &= 0xFF
+        if self.command is not None:
+            self.arguments.append(value)
+            if len(self.arguments) == self.ARGUMENTS[self.command]:
+                self._set_register(self.command, self.arguments)
+                self.command = None
+                self.arguments = []
+            return
+
+        if value in self.ARGUMENTS:
+            self.command = value
+        elif value == 0x06:
+            self.start()
+        elif value == 0x07:
+            self.readout = deque((self.count >> 8, self.count & 0xFF))
+        elif value == 0x08:
+            self.reset()
+            self._clear_irq()
+        else:
+            print(f"Dma: неизвестная команда 0x{value:02X}")
+
+    def device_out(self):
+        if self.readout:
+            return self.readout.popleft()
+        self._clear_irq()
+        return self.status
+
+    def poll_stable(self):
+        # Статус меняется только по командам процессора
+        return not self.readout
+
+    def _set_register(self, command, arguments):
+        if command == 0x01:
+            self.source = (arguments[0] << 8) | arguments[1]
+            self.source_port = None
+        elif command == 0x02:
+            self.dest = (arguments[0] << 8) | arguments[1]
+            self.dest_port = None
+        elif command == 0x03:
+            self.length = (arguments[0] << 8) | arguments[1]
+        elif command == 0x04:
+            self.source_port = arguments[0]
+        elif command == 0x05:
+            self.dest_port = arguments[0]
+
+    # -- Пересылка --
+
+    def start(self):
+        """Выполняет пересылку по текущим параметрам, возвращает число байт"""
+        self._clear_irq()
+        data = b""
+        try:
+            # Сначала проверяем обе стороны: поток устройства нельзя прочитать впустую
+            if self.source_port is None:
+                self._check_range(self.source, self.length)
+            else:
+                self._device(self.source_port)
+            if self.dest_port is None:
+                self._check_range(self.dest, self.length)
+            else:
+                self._device(self.dest_port)
+            if self.source_port is None:
+                data = self._read_memory(self.source, self.length)
+            else:
+                data = self._read_device(self.source_port, self.length)
+            if self.dest_port is None:
+                self._write_memory(self.dest, data)
+            else:
+                self._write_device(self.dest_port, data)
+        except ValueError as e:
+            print(f"Dma: ошибка пересылки: {e}")
+            self.status = self.DONE | self.ERROR
+            data = b""
+        else:
+            self.status = self.DONE
+        self.count = len(data)
+        if self.cpu is not None:
+            self.cpu.cycles += self.count * self.CYCLES_PER_BYTE
+        if self.irq_controller is not None:
+            self.irq_controller.raise_line(self.irq_line)
+        return self.count
+
+    def _check_range(self, address, length):
+        if address + length > self.bus.size:
+            raise ValueError(f"Блок {hex(address)}+{hex(length)} выходит за 64К")
+        for page in range(address >> 8, ((address + max(length, 1) - 1) >> 8) + 1):
+            if self.bus.region_at(page << 8) is None:
+                raise ValueError(f"Адрес {hex(max(address, page << 8))} вне диапазона памяти")
+
+    def _read_memory(self, address, length):
+        # Поверх bus.read стоят обертки отладчика (точки наблюдения): срезом их не обойти
+        if "read" not in self.bus.__dict__:
+            try:
+                return bytes(self.bus.view(address, length))
+            except ValueError:
+                pass
+        # Окна устройств или обертки: читаем по байту через bus.read
+        read = self.bus.read
+        return bytes(read(address + offset) for offset in range(length))
+
+    def _write_memory(self, address, data):
+        # Журнал, трассировка и точки наблюдения оборачивают bus.write -
+        # пока обертка стоит, пересылка должна пройти через нее
+        if "write" not in self.bus.__dict__ and self.bus.is_ram(address, len(data)):
+            self.bus.load(address, data)
+        else:
+            # ПЗУ, окна устройств и обертки: пишем по байту, каждая страница решает сама
+            write = self.bus.write
+            for offset, value in enumerate(data):
+                write(address + offset, value)
+
+    def _device(self, port):
+        device = self.device_manager.get_device(port)
+        if device is None or device is self:
+            raise ValueError(f"Нет устройства на порту {port}")
+        return device
+
+    def _read_device(self, port, length):
+        device = self._device(port)
+        if hasattr(device, "read_block"):
+            return bytes(device.read_block(length))
+        return bytes((device.device_out() or 0) & 0xFF for _ in range(length))
+
+    def _write_device(self, port, data):
+        device = self._device(port)
+        if hasattr(device, "write_block"):
+            device.write_block(data)
+        else:
+            for value in data:
+                device.device_in(value)
+
+    def _clear_irq(self):
+        if self.irq_controller is not None:
+            self.irq_controller.clear_line(self.irq_line)
+
+    # -- Для менеджера устройств окна --
+
+    def update(self):
+        pass
+
+    def render_to_canvas(self):
+        pass
+
+    def on_click(self, mouse_pos):
+        pass
+
+    # -- Снимок (machine/Snapshot.py) --
+
+    def save_state(self):
+        def port(value):
+            return NO_PORT if value is None else value
+        command = 0xFF if self.command is None else self.command
+        return (self.STATE.pack(self.source, self.dest, self.length, port(self.source_port),
+                                port(self.dest_port), self.status, self.count, command)
+                + bytes((len(self.arguments),)) + bytes(self.arguments) + bytes(self.readout))
+
+    def load_state(self, data):
+        (self.source, self.dest, self.length, source_port, dest_port,
+         self.status, self.count, command) = self.STATE.unpack_from(data)
+        self.source_port = None if source_port == NO_PORT else source_port
+        self.dest_port = None if dest_port == NO_PORT else dest_port
+        self.command = None if command == 0xFF else command
+        offset = self.STATE.size
+        count = data[offset]
+        self.arguments = list(data[offset + 1:offset + 1 + count])
+        self.readout = deque(data[offset + 1 + count:])
@@ -0,0 +1,162 @@
+FLAGS = "F"  # флаги в множествах читаемых/записываемых "регистров"
+
+class IdleDetector:
+    """Распознает циклы опроса устройств и пропускает их до конца кванта.
+
+    Цикл - участок от head до обратного перехода на head. Он считается
+    опросом, если в нем только in, cmp, ALU, загрузки регистров и переходы
+    наружу, и ни один регистр, который цикл читает из прошлой итерации,
+    внутри цикла не меняется. Тогда итерация зависит только от того, что
+    вернул in. Если все опрашиваемые устройства говорят, что повторное
+    чтение ничего не изменит (poll_stable()), и так было уже на прошлом
+    возврате на head ровно одну итерацию назад, то каждая следующая итерация
+    повторит последнюю: процессор простаивает. Оставшиеся такты кванта
+    засчитываются без выполнения, и cpu.idle становится True (Pacer и
+    run_until спят до конца кадра, когда приходят события хоста).
+
+    В интерпретаторе подменяется только запись кэша декодирования для
+    перехода в конце цикла, транслятор встраивает проверку в блок, который
+    переходит сам на себя. Остальные инструкции ничего не платят.
+    """
+    JUMPS = {"jmp_addr", "je_addr", "jne_addr", "jc_addr", "jnc_addr"}
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.loops = {}   # head -> (конец, регистры портов in или None, такты итерации)
+        self.states = {}  # head -> cpu.cycles на прошлом возврате со стабильными устройствами
+        self.skipped = 0  # такты, засчитанные без выполнения
+
+    # -- Разбор цикла --
+
+    def _effects(self, name, ops):
+        """(читает, пишет) регистры инструкции или None, если у нее есть побочные эффекты"""
+        if name == "nop" or name == "jmp_addr":
+            return (), ()
+        if name in ("je_addr", "jne_addr", "jc_addr", "jnc_addr"):
+            return (FLAGS,), ()
+        if name == "ld_r":
+            return (), (ops[0],)
+        if name == "mov_r":
+            return (ops[1],), (ops[0],)
+        if name in ("add_r", "sub_r", "xor_r", "or_r", "and_r"):
+            return (ops[0], ops[1]), (ops[0], FLAGS)
+        if name in ("adc_r", "sbb_r"):
+            return (ops[0], ops[1], FLAGS), (ops[0], FLAGS)
+        if name == "mul_r":
+            return (ops[0], ops[1]), (ops[0], ops[1], FLAGS)
+        if name in ("div_r", "mod_r"):
+            return (ops[0], ops[1], ops[2]), (ops[0], ops[1], FLAGS)
+        if name in ("not_r", "shl_r", "shr_r", "inc_r", "dec_r"):
+            return (ops[0],), (ops[0], FLAGS)
+        if name == "cmp_r":
+            a, b, mode = ops
+            reads = {0x00: (a, b), 0x01: (a,), 0x02: (b,), 0x03: ()}.get(mode)
+            return None if reads is None else (reads, (FLAGS,))
+        if name == "in_r":
+            return (ops[0],), (ops[1],)
+        return None
+
+    def analyze(self, head, end):
+        """(регистры портов in, такты итерации) цикла [head, end] или None, если это не опрос"""
+        decode_at = self.cpu.control_unit.decode_at
+        live_in, written, ports = set(), set(), []
+        total = 0
+        address = head
+        while True:
+            handler, ops, length, cycles = decode_at(address)
+            total += cycles
+            name = handler.__name__
+            effects = self._effects(name, ops)
+            if effects is None:
+                return None
+            reads, writes = effects
+            if any(reg != FLAGS and not 0 <= reg < 16 or reg == 0x05 for reg in reads + writes):
+                return None
+            if name in self.JUMPS and address != end and head <= ops[0] <= end:
+                # Переход внутри цикла: разбираем только прямые участки
+                return None
+            live_in.update(reg for reg in reads if reg not in written)
+            if name == "in_r":
+                ports.append(ops[0])
+            # Регистр порта in должен дожить до конца итерации неизменным
+            if any(reg in writes for reg in ports):
+                return None
+            written.update(writes)
+            if address == end:
+                break
+            address += length
+            if address > end:
+                return None
+        if live_in & written:
+            return None
+        return tuple(ports), total
+
+    def loop_ports(self, head, end):
+        """Регистры портов in цикла опроса [head, end] или None (результат разбора кэшируется)"""
+        loop = self.loops.get(head)
+        if loop is None or loop[0] != end:
+            result = self.analyze(head, end)
+            loop = self.loops[head] = (end,) + (result or (None, 0))
+        return loop[1]
+
+    # -- Подключение к движкам --
+
+    def watch(self, address, entry):
+        """Обертка записи кэша декодирования для обратного перехода в конце цикла опроса"""
+        handler, operands, length, cycles = entry
+        name = handler.__name__
+        if name not in self.JUMPS or operands[0] > address:
+            return entry
+        head = operands[0]
+        if self.loop_ports(head, address) is None:
+            return entry
+        regs = self.cpu.regs
+        check = self.check
+
+        def jump(addr):
+            handler(addr)
+            if regs[0x05] == head:
+                # Такты самого перехода step() добавит после обработчика
+                check(head, cycles)
+        jump.__name__ = name
+        return jump, operands, length, cycles
+
+    # Код мог измениться: разбор циклов устарел (подписка на DecodeCache)
+    def invalidate_page(self, page):
+        self.invalidate_all()
+
+    def invalidate_all(self):
+        self.loops.clear()
+        self.states.clear()
+
+    # -- Проверка --
+
+    def check(self, head, pending=0):
+        """Вызывается при возврате на head; засчитывает простой, если цикл повторяется
+
+        pending - такты, которые еще будут добавлены к cpu.cycles за текущую инструкцию.
+        """
+        cpu = self.cpu
+        if cpu.slice_end is None:
+            # Вне run_for пропускать нечего: одиночный step() выполняет ровно шаг
+            return
+        loop = self.loops.get(head)
+        if loop is None or loop[1] is None or cpu.exec_hooks or cpu.irq_request:
+            return
+        device_manager = getattr(cpu, "device_manager", None)
+        for port_reg in loop[1]:
+            device = device_manager.get_device(cpu.regs[port_reg]) if device_manager else None
+            if device is not None and not (hasattr(device, "poll_stable") and device.poll_stable()):
+                self.states.pop(head, None)
+                return
+        # Прошлый стабильный возврат должен быть ровно одну итерацию назад
+        # (без выхода из цикла, прерываний и т.п. между ними)
+        now = cpu.cycles + pending
+        if self.states.get(head) != now - loop[2]:
+            self.states[head] = now
+            return
+        skip = cpu.slice_end - now
+        if skip > 0:
+            cpu.cycles += skip
+            self.skipped += skip
+        cpu.idle = True
@@ -0,0 +1,91 @@
+class InterruptController:
+    """Контроллер прерываний: 16 линий IRQ и таблица векторов в памяти.
+
+    Линия прерывания устройства совпадает с номером его порта (0-15).
+    Устройство поднимает линию через Device.raise_irq(), запрос остается
+    в pending, пока процессор его не примет или устройство его не снимет
+    (clear_irq). Таблица векторов лежит в памяти с адреса vector_base:
+    по два байта (старший, младший) на линию, нулевой вектор - линия не
+    обслуживается.
+
+    Процессор принимает прерывание между инструкциями, если они разрешены
+    (ei). Пока запросов нет, цикл выполнения ничего не проверяет: при
+    появлении запроса контроллер подменяет cpu.step на step_interrupt на
+    один шаг. При входе в стек кладутся флаги и адрес возврата (как у call),
+    прерывания запрещаются; iret все это восстанавливает. Из нескольких
+    запросов первой обслуживается линия с меньшим номером.
+    """
+    LINES = 16
+    ENTRY_CYCLES = 17  # как у call
+
+    def __init__(self, cpu, vector_base=0x0FE0):
+        self.cpu = cpu
+        self.vector_base = vector_base
+        self.pending = 0    # биты поднятых линий
+        self.mask = 0xFFFF  # биты линий, которым разрешено прерывать
+        self.serviced = [0] * self.LINES  # сколько раз принята каждая линия
+        cpu.interrupts = self
+
+    def attach(self, port, device):
+        """Подключает линию устройства на порту port (если для нее есть линия)"""
+        if 0 <= port < self.LINES:
+            device.irq_line = port
+            device.irq_controller = self
+
+    def raise_line(self, line):
+        self.pending |= 1 << line
+        self.update()
+
+    def clear_line(self, line):
+        self.pending &= ~(1 << line)
+        self.update()
+
+    def set_mask(self, mask):
+        self.mask = mask & 0xFFFF
+        self.update()
+
+    def reset(self):
+        self.pending = 0
+        self.mask = 0xFFFF
+        self.update()
+
+    def update(self):
+        """Выставляет или снимает запрос к процессору"""
+        cpu = self.cpu
+        request = bool(self.pending & self.mask) and cpu.interrupt_enabled
+        if request != cpu.irq_request:
+            cpu.irq_request = request
+            cpu._select_step()
+
+    def enter(self):
+        """Принимает запрос с наивысшим приоритетом, возвращает такты входа"""
+        cpu = self.cpu
+        active = self.pending & self.mask
+        if not active or not cpu.interrupt_enabled:
+            return 0
+        line = (active & -active).bit_length() - 1
+        self.pending &= ~(1 << line)
+
+        # Вектор берем прямо из memory: вход в прерывание - не чтение
+        # программы, точки наблюдения на ram.read на нем срабатывать не должны
+        memory = cpu.ram.memory
+        address = self.vector_base + line * 2
+        vector = 0
+        if address + 1 < len(memory):
+            vector = (memory[address] << 8) | memory[address + 1]
+        if not vector:
+            # Линия без обработчика: запрос сбрасываем
+            self.update()
+            return 0
+
+        self.serviced[line] += 1
+        regs = cpu.regs
+        ip = regs[0x05]
+        cpu.push(cpu.flag_reg[0])
+        cpu.push(ip & 0xFF)
+        cpu.push(ip >> 8)
+        regs[0x05] = vector
+        cpu.interrupt_enabled = False
+        self.update()
+        cpu.cycles += self.ENTRY_CYCLES
+        return self.ENTRY_CYCLES
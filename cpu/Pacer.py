@@ -0,0 +1,82 @@
+import time
+
+class Pacer:
+    """Привязка счетчика тактов процессора к реальному времени.
+
+    Pacer помнит момент старта и значение cpu.cycles в этот момент и по ним
+    считает, сколько тактов процессор должен был выполнить к текущему времени
+    на частоте frequency. Недобор (или перебор) переходит на следующий вызов,
+    поэтому средняя частота не уплывает. Если отставание больше max_lag
+    секунд (окно перетаскивали, отладчик и т.п.), точка отсчета сдвигается,
+    чтобы процессор не пытался догнать упущенное одним рывком.
+    """
+
+    def __init__(self, cpu, frequency, max_lag=0.25):
+        self.cpu = cpu
+        self.frequency = frequency
+        self.max_lag = max_lag
+        self.achieved_hz = 0.0
+        self.reset()
+
+    def reset(self):
+        now = time.perf_counter()
+        self.start_time = now
+        self.start_cycles = self.cpu.cycles
+        self._measure_time = now
+        self._measure_cycles = self.cpu.cycles
+
+    def set_frequency(self, frequency):
+        self.frequency = frequency
+        self.reset()
+
+    def due_cycles(self, at_time=None):
+        """Сколько тактов нужно выполнить, чтобы догнать время at_time"""
+        if at_time is None:
+            at_time = time.perf_counter()
+        target = self.start_cycles + (at_time - self.start_time) * self.frequency
+        due = target - self.cpu.cycles
+        if due > self.max_lag * self.frequency:
+            # Слишком сильно отстали: начинаем отсчет заново с текущего момента
+            self.start_time = at_time
+            self.start_cycles = self.cpu.cycles
+            return 0
+        return int(due)
+
+    def run(self, deadline, slice_size=1000):
+        """Выполняет процессор в темпе frequency до момента deadline, возвращает такты"""
+        executed = 0
+        cpu = self.cpu
+        while cpu.running:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            due = self.due_cycles(now)
+            if due < slice_size:
+                # Процессор опережает время: ждем, пока накопится целый квант,
+                # но не дольше дедлайна
+                time.sleep(min((slice_size - due) / self.frequency, deadline - now))
+                due = self.due_cycles()
+                if due <= 0:
+                    continue
+            executed += cpu.run_for(min(due, slice_size))
+            if cpu.idle:
+                # Процессор ждет устройство, а оно изменится не раньше следующего
+                # кадра: спим до дедлайна и засчитываем такты этого времени как простой
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+                skipped = max(0, self.due_cycles(deadline))
+                cpu.cycles += skipped
+                if cpu.idle_detector is not None:
+                    cpu.idle_detector.skipped += skipped
+                executed += skipped
+                break
+        return executed
+
+    def measure(self):
+        """Обновляет achieved_hz по тактам с прошлого замера и возвращает ее"""
+        now = time.perf_counter()
+        elapsed = now - self._measure_time
+        if elapsed > 0:
+            self.achieved_hz = (self.cpu.cycles - self._measure_cycles) / elapsed
+        self._measure_time = now
+        self._measure_cycles = self.cpu.cycles
+        return self.achieved_hz
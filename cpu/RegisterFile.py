@@ -0,0 +1,88 @@
+from array import array
+
+# Коды флагов совпадают с их битами в упакованном байте флагов
+FLAG_Z = 0x01
+FLAG_C = 0x02
+
+# Коды регистров A..SS; операнд с другим кодом - ошибка (ControlUnit.bad_register)
+FIRST_REGISTER = 0x01
+LAST_REGISTER = 0x09
+
+class RegisterFile:
+    """Плоский регистровый файл процессора.
+
+    Все регистры хранятся в одном массиве array('H') и индексируются
+    кодом регистра (0x01 - A ... 0x09 - SS). Флаги упакованы в один байт:
+    бит 0 - Z, бит 1 - C. Массив длиннее (SIZE), но коды вне 0x01-0x09
+    процессор не принимает: такие операнды декодируются в ошибку.
+
+    IR (0x06) пишет только fetch(): step() декодирует инструкции из кэша и
+    IR не обновляет, поэтому в представлениях регистров его нет.
+    """
+    SIZE = 16
+
+    def __init__(self):
+        self.regs = array('H', bytes(self.SIZE * 2))
+        self.flags = bytearray(1)
+        # Маска записи для каждого регистра: IP 16-битный, остальные 8-битные
+        self.masks = tuple(0xFFFF if index == 0x05 else 0xFF for index in range(self.SIZE))
+
+    def reset(self):
+        for index in range(self.SIZE):
+            self.regs[index] = 0
+        self.flags[0] = 0
+
+    def views(self):
+        """Словарь представлений регистров в старом формате {код: RegisterView}"""
+        return {index: RegisterView(self, index)
+                for index in range(FIRST_REGISTER, LAST_REGISTER + 1) if index != 0x06}
+
+    def flag_views(self):
+        """Словарь представлений флагов в старом формате {код: FlagView}"""
+        return {FLAG_Z: FlagView(self, FLAG_Z), FLAG_C: FlagView(self, FLAG_C)}
+
+class RegisterView:
+    """Совместимое с Reg8/Reg16 представление одного регистра"""
+    __slots__ = ("regs", "index", "mask")
+
+    def __init__(self, register_file, index):
+        self.regs = register_file.regs
+        self.index = index
+        self.mask = register_file.masks[index]
+
+    def read(self):
+        return self.regs[self.index]
+
+    def write(self, value):
+        self.regs[self.index] = value & self.mask
+
+    def read_h(self):
+        return (self.regs[self.index] >> 8) & 0xFF
+
+    def read_l(self):
+        return self.regs[self.index] & 0xFF
+
+    def __repr__(self):
+        if self.mask == 0xFFFF:
+            return f"{self.regs[self.index]:04X}"
+        return f"{self.regs[self.index]:02X}"
+
+class FlagView:
+    """Совместимое с Reg8 представление одного флага"""
+    __slots__ = ("flags", "bit")
+
+    def __init__(self, register_file, bit):
+        self.flags = register_file.flags
+        self.bit = bit
+
+    def read(self):
+        return 0x01 if self.flags[0] & self.bit else 0x00
+
+    def write(self, value):
+        if value & 0xFF:
+            self.flags[0] |= self.bit
+        else:
+            self.flags[0] &= ~self.bit & 0xFF
+
+    def __repr__(self):
+        return f"{self.read():02X}"
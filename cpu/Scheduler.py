@@ -0,0 +1,40 @@
+import time
+
+from cpu.Pacer import Pacer
+
+class Scheduler:
+    """Планировщик: выполняет процессор квантами между кадрами отрисовки.
+
+    Процессор идет в темпе clock_hz тактов в секунду: Pacer сверяет счетчик
+    тактов с реальным временем, так что частота не зависит от частоты кадров.
+    В режиме unthrottled процессор работает все время кадра без ограничения
+    частоты. Квант никогда не выходит за время кадра, чтобы окно оставалось отзывчивым.
+    """
+    SLICE_SIZE = 1000
+
+    def __init__(self, cpu, clock_hz=1000000, frame_rate=60, unthrottled=False):
+        self.cpu = cpu
+        self.frame_rate = frame_rate
+        self.unthrottled = unthrottled
+        self.pacer = Pacer(cpu, clock_hz)
+        self.set_clock(clock_hz)
+
+    def set_clock(self, clock_hz):
+        self.clock_hz = clock_hz
+        self.pacer.set_frequency(clock_hz)
+
+    @property
+    def achieved_hz(self):
+        """Реальная частота процессора по последнему замеру measure()"""
+        return self.pacer.achieved_hz
+
+    def measure(self):
+        return self.pacer.measure()
+
+    def run_frame(self):
+        """Выполняет процессор в течение одного кадра, возвращает число тактов"""
+        deadline = time.perf_counter() + 1.0 / self.frame_rate
+
+        if self.unthrottled:
+            return self.cpu.run_until(deadline, self.SLICE_SIZE)
+        return self.pacer.run(deadline, self.SLICE_SIZE)
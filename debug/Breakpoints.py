@@ -0,0 +1,195 @@
+from cpu.RegisterFile import FLAG_Z, FLAG_C
+from debug.Wrappers import wrap_attr, unwrap_attr
+
+# Биты в карте памяти
+WATCH_READ = 0x01
+WATCH_WRITE = 0x02
+
+# Биты в карте портов
+WATCH_IN = 0x01
+WATCH_OUT = 0x02
+
+# IR (0x06) процессор при step() не обновляет, поэтому в условиях его нет
+REGISTER_NAMES = {"A": 0x01, "B": 0x02, "C": 0x03, "D": 0x04, "IP": 0x05,
+                  "SP": 0x07, "BP": 0x08, "SS": 0x09}
+
+class Breakpoints:
+    """Точки останова по IP, точки наблюдения за памятью и портами.
+
+    Каждая проверка - одно обращение к битовой карте: bytearray на все
+    64К адресов (исполнение, чтение/запись памяти) и на 256 портов.
+    Хук шага процессора и обертки RAM.read/RAM.write и портов (port_in/port_out
+    у ControlUnit - через них идут in/out и блочные ins/outs) ставятся,
+    только пока есть хоть одна точка соответствующего вида, так что без
+    точек останова выполнение ничего не теряет.
+
+    Точка останова срабатывает до выполнения инструкции (IP указывает на
+    нее), точка наблюдения - после инструкции, которая обратилась к
+    памяти или порту. В обоих случаях процессор ставится на паузу
+    (running = False, paused = True), причина лежит в hit.
+    """
+
+    def __init__(self, cpu, on_hit=None):
+        self.cpu = cpu
+        self.on_hit = on_hit  # on_hit(вид, адрес, значение) при срабатывании
+        self.exec_map = bytearray(0x10000)
+        self.memory_map = bytearray(0x10000)
+        self.port_map = bytearray(256)
+        self.conditions = {}  # адрес -> [предикат(regs)]
+        self.hit = None       # (вид, адрес, значение) последнего срабатывания
+        self._skip = None     # адрес точки, через которую надо пройти при продолжении
+        self._armed = False   # идет выполнение инструкции (а не декодирование)
+        self._originals = {}
+        self._wrappers = {}  # имя -> обертка
+        self._hooked = False
+
+    # -- Установка точек --
+
+    def add_breakpoint(self, address, condition=None):
+        """Останов перед инструкцией по address; condition(regs) -> bool, regs - {"A": .., "ZF": ..}"""
+        self.exec_map[address & 0xFFFF] = 1
+        if condition is not None:
+            self.conditions.setdefault(address & 0xFFFF, []).append(condition)
+        self._update()
+
+    def remove_breakpoint(self, address):
+        self.exec_map[address & 0xFFFF] = 0
+        self.conditions.pop(address & 0xFFFF, None)
+        self._update()
+
+    def watch_memory(self, start, end=None, read=False, write=True):
+        """Наблюдение за памятью [start, end] (включительно)"""
+        if end is None:
+            end = start
+        mode = (WATCH_READ if read else 0) | (WATCH_WRITE if write else 0)
+        for address in range(start, end + 1):
+            self.memory_map[address & 0xFFFF] |= mode
+        self._update()
+
+    def unwatch_memory(self, start, end=None):
+        if end is None:
+            end = start
+        for address in range(start, end + 1):
+            self.memory_map[address & 0xFFFF] = 0
+        self._update()
+
+    def watch_port(self, port, on_in=True, on_out=True):
+        self.port_map[port & 0xFF] |= (WATCH_IN if on_in else 0) | (WATCH_OUT if on_out else 0)
+        self._update()
+
+    def unwatch_port(self, port):
+        self.port_map[port & 0xFF] = 0
+        self._update()
+
+    def clear(self):
+        self.exec_map[:] = bytes(0x10000)
+        self.memory_map[:] = bytes(0x10000)
+        self.port_map[:] = bytes(256)
+        self.conditions.clear()
+        self._update()
+
+    def resume(self):
+        """Снимает паузу; точка останова на текущем IP пропускается один раз"""
+        cpu = self.cpu
+        if self.hit and self.hit[0] == "exec":
+            self._skip = cpu.regs[0x05]
+        self.hit = None
+        cpu.paused = False
+        cpu.running = True
+
+    # -- Подключение оберток --
+
+    def _update(self):
+        cpu = self.cpu
+        any_exec = any(self.exec_map)
+        read_watch = any(value & WATCH_READ for value in self.memory_map)
+        write_watch = any(value & WATCH_WRITE for value in self.memory_map)
+        port_watch = any(self.port_map)
+
+        # Хук шага нужен всем видам: он же отделяет выполнение от декодирования
+        # и заставляет процессор идти по одной инструкции
+        need_hook = any_exec or read_watch or write_watch or port_watch
+        if need_hook and not self._hooked:
+            cpu.add_exec_hook(self._check_exec, first=True)
+            self._hooked = True
+        elif not need_hook and self._hooked:
+            cpu.remove_exec_hook(self._check_exec)
+            self._hooked = False
+
+        # Обертки ставятся поверх чужих (трассировка, журнал) и снимаются из любого места цепочки
+        self._wrap_attr("read", cpu.ram, self._watch_read, read_watch)
+        self._wrap_attr("write", cpu.ram, self._watch_write, write_watch)
+        self._wrap_attr("fill", cpu.decode_cache, self._decode_fill, read_watch)
+        self._wrap_attr("port_in", cpu.control_unit, self._watch_in, port_watch)
+        self._wrap_attr("port_out", cpu.control_unit, self._watch_out, port_watch)
+
+    def _wrap_attr(self, name, target, wrapper, enabled):
+        if enabled and name not in self._wrappers:
+            wrap_attr(target, name, wrapper, self._originals)
+            self._wrappers[name] = wrapper
+            # Транслятор захватывает ram.read/ram.write при трансляции блока
+            self.cpu.decode_cache.invalidate_all()
+        elif not enabled and name in self._wrappers:
+            unwrap_attr(target, name, self._wrappers.pop(name), self._originals)
+            self.cpu.decode_cache.invalidate_all()
+
+    # -- Проверки --
+
+    def _pause(self, kind, address, value):
+        self.hit = (kind, address, value)
+        self.cpu.running = False
+        self.cpu.paused = True
+        if self.on_hit:
+            self.on_hit(kind, address, value)
+
+    def registers(self):
+        """Регистры и флаги по именам для условий точек останова"""
+        regs = self.cpu.regs
+        values = {name: regs[code] for name, code in REGISTER_NAMES.items()}
+        values["ZF"] = 1 if self.cpu.flag_reg[0] & FLAG_Z else 0
+        values["CF"] = 1 if self.cpu.flag_reg[0] & FLAG_C else 0
+        return values
+
+    def _check_exec(self, ip, entry):
+        # Хук стоит первым, поэтому остальные хуки шага идут уже "вооруженными":
+        # им нельзя читать память через ram.read (трассировка и профилировщик
+        # читают опкод прямо из ram.memory), иначе сработает точка наблюдения
+        self._armed = True
+        if not self.exec_map[ip]:
+            return
+        if self._skip == ip:
+            self._skip = None
+            return
+        conditions = self.conditions.get(ip)
+        if conditions:
+            regs = self.registers()
+            if not any(condition(regs) for condition in conditions):
+                return
+        self._pause("exec", ip, None)
+
+    def _decode_fill(self, address):
+        # Чтение байтов инструкции при декодировании - не обращение к данным
+        self._armed = False
+        return self._originals["fill"](address)
+
+    def _watch_read(self, address):
+        value = self._originals["read"](address)
+        if self._armed and self.memory_map[address & 0xFFFF] & WATCH_READ:
+            self._pause("read", address, value)
+        return value
+
+    def _watch_write(self, address, value):
+        self._originals["write"](address, value)
+        if self.memory_map[address & 0xFFFF] & WATCH_WRITE:
+            self._pause("write", address, value & 0xFF)
+
+    def _watch_in(self, port):
+        value = self._originals["port_in"](port)
+        if self.port_map[port & 0xFF] & WATCH_IN:
+            self._pause("in", port & 0xFF, value & 0xFF)
+        return value
+
+    def _watch_out(self, port, value):
+        self._originals["port_out"](port, value)
+        if self.port_map[port & 0xFF] & WATCH_OUT:
+            self._pause("out", port & 0xFF, value)
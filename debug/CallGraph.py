@@ -0,0 +1,148 @@
+from debug.Wrappers import wrap_handler, unwrap_handler
+
+class CallGraphProfiler:
+    """Профилировщик по графу вызовов: теневой стек по call_addr/ret.
+
+    На каждый call в теневой стек кладется (адрес подпрограммы, адрес
+    возврата), на ret - снимается. Условные call/ret (calle, retc, ...)
+    выполняются через эти же обработчики, так что тоже попадают в стек.
+    Инструкции и такты считаются по текущему
+    пути вызовов (кортеж адресов подпрограмм), из этих счетчиков строятся
+    исключительные и включительные суммы и свернутые стеки для flame graph.
+
+    ret снимает со стека процессора что угодно, поэтому адрес, на который
+    он вернулся, сверяется с ожидаемым. При расхождении теневой стек
+    раскручивается до кадра с таким адресом возврата (если он есть), а
+    расхождение записывается в mismatches.
+    """
+    ROOT = "root"
+
+    def __init__(self, cpu, labels=None):
+        self.cpu = cpu
+        # labels - {метка: адрес}, например Compiler.labels
+        self.symbols = {}
+        if labels:
+            for name, address in labels.items():
+                self.symbols.setdefault(address, name)
+        self.stack = []          # [(адрес подпрограммы, адрес возврата)]
+        self.path = ()           # адреса подпрограмм от корня к текущей
+        self.path_counts = {}    # путь -> выполненных инструкций
+        self.path_cycles = {}    # путь -> тактов
+        self.mismatches = []     # [(адрес ret, ожидаемый адрес возврата, фактический)]
+        self.enabled = False
+        self._originals = {}
+        self._wrappers = {}
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.cpu.add_exec_hook(self._count)
+        self._replace("call_addr", self._call)
+        self._replace("ret", self._ret)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.cpu.remove_exec_hook(self._count)
+        # Поверх наших оберток могут стоять чужие: снимаем только свои
+        for name, wrapper in self._wrappers.items():
+            unwrap_handler(self.cpu.control_unit, name, wrapper, self._originals)
+        self._wrappers.clear()
+        self.enabled = False
+
+    def reset(self):
+        self.stack.clear()
+        self.path = ()
+        self.path_counts.clear()
+        self.path_cycles.clear()
+        self.mismatches.clear()
+
+    def _replace(self, name, method):
+        # Транслятор блоков узнает инструкцию по __name__ обработчика
+        def wrapper(*operands):
+            return method(*operands)
+        wrapper.__name__ = name
+        wrap_handler(self.cpu.control_unit, name, wrapper, self._originals)
+        self._wrappers[name] = wrapper
+
+    def _count(self, ip, entry):
+        path = self.path
+        self.path_counts[path] = self.path_counts.get(path, 0) + 1
+        self.path_cycles[path] = self.path_cycles.get(path, 0) + entry[3]
+
+    def _call(self, addr):
+        # IP уже указывает на следующую за call инструкцию - это адрес возврата
+        return_address = self.cpu.regs[0x05]
+        self._originals["call_addr"](addr)
+        self.stack.append((addr, return_address))
+        self.path = self.path + (addr,)
+
+    def _ret(self):
+        ret_address = (self.cpu.regs[0x05] - 1) & 0xFFFF
+        self._originals["ret"]()
+        target = self.cpu.regs[0x05]
+        stack = self.stack
+        if stack and stack[-1][1] == target:
+            stack.pop()
+            self.path = self.path[:-1]
+            return
+
+        expected = stack[-1][1] if stack else None
+        self.mismatches.append((ret_address, expected, target))
+        # Ищем кадр, в который на самом деле вернулись; если его нет - стек не трогаем
+        for depth in range(len(stack) - 1, -1, -1):
+            if stack[depth][1] == target:
+                del stack[depth:]
+                self.path = self.path[:depth]
+                break
+
+    # -- Отчеты --
+
+    def name(self, address):
+        return self.symbols.get(address, f"0x{address:04X}")
+
+    def routines(self):
+        """{адрес: [исключ. инструкций, включ. инструкций, исключ. тактов, включ. тактов]}
+
+        Корень (код вне подпрограмм) имеет адрес None.
+        """
+        result = {}
+        for path, count in self.path_counts.items():
+            cycles = self.path_cycles[path]
+            own = path[-1] if path else None
+            stats = result.setdefault(own, [0, 0, 0, 0])
+            stats[0] += count
+            stats[2] += cycles
+            # Рекурсивная подпрограмма входит в путь несколько раз, но считается один
+            for address in set(path) | {None}:
+                stats = result.setdefault(address, [0, 0, 0, 0])
+                stats[1] += count
+                stats[3] += cycles
+        return result
+
+    def report(self, limit=20):
+        lines = [f"{'подпрограмма':<20}{'исключ.':>10}{'включ.':>10}{'такты искл.':>13}{'такты вкл.':>13}"]
+        rows = sorted(self.routines().items(), key=lambda item: item[1][1], reverse=True)
+        for address, (own, total, own_cycles, total_cycles) in rows[:limit]:
+            name = self.ROOT if address is None else self.name(address)
+            lines.append(f"{name:<20}{own:>10}{total:>10}{own_cycles:>13}{total_cycles:>13}")
+        if self.mismatches:
+            lines += ["", f"Несбалансированные ret: {len(self.mismatches)}"]
+            for ret_address, expected, target in self.mismatches[:limit]:
+                expected_text = "пустой стек" if expected is None else f"0x{expected:04X}"
+                lines.append(f"  ret 0x{ret_address:04X}: ожидался {expected_text}, вернулся в 0x{target:04X}")
+        return "\n".join(lines)
+
+    def collapsed(self, weight="count"):
+        """Строки свернутых стеков "root;a;b N" для flamegraph.pl/speedscope"""
+        source = self.path_cycles if weight == "cycles" else self.path_counts
+        lines = []
+        for path, value in sorted(source.items()):
+            frames = [self.ROOT] + [self.name(address) for address in path]
+            lines.append(f"{';'.join(frames)} {value}")
+        return lines
+
+    def save_collapsed(self, path, weight="count"):
+        with open(path, "w") as f:
+            f.write("\n".join(self.collapsed(weight)) + "\n")
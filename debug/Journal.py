@@ -0,0 +1,224 @@
+from array import array
+from bisect import bisect_right
+from collections import deque
+
+from debug.Wrappers import wrap_attr, unwrap_attr
+
+# Записи mem_addr от BANK_SWITCH и выше - переключения банков, а не адреса
+BANK_SWITCH = 0x10000
+
+def _modules(ram):
+    """Микросхемы памяти процессора: подключенные к шине или сама ram без шины"""
+    if hasattr(ram, "modules"):
+        return [module for _, module in ram.modules()]
+    return [ram]
+
+class Segment:
+    """Участок журнала: полный снимок на начало и отменяющие записи по инструкциям"""
+    __slots__ = ("start", "regs", "flags", "memory", "cycles", "modules",
+                 "reg_log", "cycle_log", "mem_marks", "mem_addr", "mem_old", "switches")
+
+    def __init__(self, start, cpu):
+        self.start = start  # номер первой инструкции участка
+        self.regs = cpu.regs.tobytes()
+        self.flags = cpu.flag_reg[0]
+        self.memory = bytes(cpu.ram.memory)
+        self.cycles = cpu.cycles
+        # Состояние модулей памяти сверх memory (выбранный банк и остальные банки)
+        self.modules = [(module, module.save_state()) for module in _modules(cpu.ram)]
+        self.reg_log = bytearray()       # регистры и флаги до каждой инструкции
+        self.cycle_log = array('Q')      # такты до каждой инструкции
+        self.mem_marks = array('I')      # индекс первой записи памяти инструкции
+        self.mem_addr = array('I')       # адреса записей памяти
+        self.mem_old = bytearray()       # значения до записи
+        self.switches = []               # (модуль, прежний банк, originals) переключений
+
+class Journal:
+    """Журнал отмены для выполнения назад (time-travel отладка).
+
+    Перед каждой инструкцией в журнал пишутся регистры, флаги и такты, а при
+    записи в память - адрес и старое значение. Журнал делится на участки по
+    checkpoint_interval инструкций, каждый начинается с полного снимка
+    процессора и памяти. Хранится не больше max_checkpoints участков, самые
+    старые отбрасываются, так что память журнала ограничена.
+
+    step_back(n) откатывает n инструкций: целые участки - сразу из снимка,
+    остаток - по отменяющим записям. Переключения банков ОЗУ (select у
+    BankedRam) пишутся в тот же журнал, что и записи памяти, и отменяются
+    в обратном порядке вместе с ними. Состояние устройств не журналируется.
+    """
+    RECORD_SIZE = 33  # 16 регистров по 2 байта + байт флагов
+
+    def __init__(self, cpu, checkpoint_interval=10000, max_checkpoints=16):
+        self.cpu = cpu
+        self.checkpoint_interval = checkpoint_interval
+        self.segments = deque(maxlen=max_checkpoints)
+        self.position = 0  # номер следующей инструкции
+        self.enabled = False
+        self._originals = {}
+        self._selects = []  # [(модуль, обертка select, originals)]
+
+    def enable(self):
+        if self.enabled:
+            return
+        cpu = self.cpu
+        self.segments.clear()
+        self.segments.append(Segment(self.position, cpu))
+        wrap_attr(cpu.ram, "write", self._journal_write, self._originals)
+        for module in _modules(cpu.ram):
+            if hasattr(module, "select"):
+                self._wrap_select(module)
+        # Транслятор захватывает ram.write при трансляции блока
+        cpu.decode_cache.invalidate_all()
+        cpu.add_exec_hook(self._record)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        cpu = self.cpu
+        cpu.remove_exec_hook(self._record)
+        # Поверх журнала могут стоять чужие обертки (точки наблюдения): снимаем только свою
+        unwrap_attr(cpu.ram, "write", self._journal_write, self._originals)
+        for module, wrapper, originals in self._selects:
+            unwrap_attr(module, "select", wrapper, originals)
+        self._selects = []
+        cpu.decode_cache.invalidate_all()
+        self.segments.clear()
+        self.enabled = False
+
+    @property
+    def oldest(self):
+        """Номер самой ранней инструкции, до которой можно откатиться"""
+        return self.segments[0].start if self.segments else self.position
+
+    # -- Запись --
+
+    def _record(self, ip, entry):
+        segment = self.segments[-1]
+        if len(segment.cycle_log) >= self.checkpoint_interval:
+            segment = Segment(self.position, self.cpu)
+            self.segments.append(segment)
+        segment.reg_log += self.cpu.regs.tobytes()
+        segment.reg_log.append(self.cpu.flag_reg[0])
+        segment.cycle_log.append(self.cpu.cycles)
+        segment.mem_marks.append(len(segment.mem_addr))
+        self.position += 1
+
+    def _journal_write(self, address, value):
+        # Старое значение берем прямо из памяти, минуя обертки RAM.read (точки наблюдения)
+        memory = self.cpu.ram.memory
+        old = memory[address] if 0 <= address < len(memory) else 0
+        self._originals["write"](address, value)
+        segment = self.segments[-1]
+        segment.mem_addr.append(address)
+        segment.mem_old.append(old)
+
+    def _wrap_select(self, module):
+        originals = {}
+
+        def select(bank):
+            old = module.bank
+            originals["select"](bank)
+            if module.bank != old:
+                segment = self.segments[-1]
+                segment.mem_addr.append(BANK_SWITCH + len(segment.switches))
+                segment.mem_old.append(0)
+                segment.switches.append((module, old, originals))
+
+        wrap_attr(module, "select", select, originals)
+        self._selects.append((module, select, originals))
+
+    # -- Откат --
+
+    def _restore_memory(self, address, value):
+        ram = self.cpu.ram
+        ram.memory[address] = value
+        if ram.code_pages[address >> 8]:
+            ram.code_cache.invalidate_page(address >> 8)
+
+    def _restore_checkpoint(self, segment):
+        cpu = self.cpu
+        cpu.regs[:] = array('H', segment.regs)
+        cpu.flag_reg[0] = segment.flags
+        cpu.ram.memory[:] = segment.memory
+        for module, state in segment.modules:
+            module.load_state(state)
+        cpu.cycles = segment.cycles
+        cpu.decode_cache.invalidate_all()
+
+    def _undo_last(self, segment):
+        index = len(segment.cycle_log) - 1
+        mark = segment.mem_marks[index]
+        for j in range(len(segment.mem_addr) - 1, mark - 1, -1):
+            address = segment.mem_addr[j]
+            if address >= BANK_SWITCH:
+                # Возвращаем прежний банк в обход своей обертки: откат не журналируется
+                module, bank, originals = segment.switches.pop()
+                originals["select"](bank)
+            else:
+                self._restore_memory(address, segment.mem_old[j])
+        del segment.mem_addr[mark:]
+        del segment.mem_old[mark:]
+
+        base = index * self.RECORD_SIZE
+        self.cpu.regs[:] = array('H', segment.reg_log[base:base + self.RECORD_SIZE - 1])
+        self.cpu.flag_reg[0] = segment.reg_log[base + self.RECORD_SIZE - 1]
+        self.cpu.cycles = segment.cycle_log[index]
+        del segment.reg_log[base:]
+        del segment.cycle_log[index:]
+        del segment.mem_marks[index:]
+
+    def step_back(self, count=1):
+        """Откатывает count инструкций, возвращает, сколько удалось откатить"""
+        undone = 0
+        while undone < count and self.segments:
+            segment = self.segments[-1]
+            recorded = len(segment.cycle_log)
+            if recorded and count - undone >= recorded:
+                # Участок откатывается целиком: берем его снимок
+                self._restore_checkpoint(segment)
+                undone += recorded
+                if len(self.segments) > 1:
+                    self.segments.pop()
+                else:
+                    self.segments[-1] = Segment(segment.start, self.cpu)
+                continue
+            if not recorded:
+                if len(self.segments) == 1:
+                    break
+                self.segments.pop()
+                continue
+            self._undo_last(segment)
+            undone += 1
+
+        self.position -= undone
+        if undone:
+            # После отката процессор снова может выполняться вперед
+            self.cpu.running = True
+            self.cpu.fault = None
+            self.cpu.paused = False
+        return undone
+
+    def find_last_write(self, address):
+        """Сколько инструкций назад была последняя запись в address (None - нет в журнале)"""
+        back = 0
+        for segment in reversed(self.segments):
+            recorded = len(segment.cycle_log)
+            addresses = segment.mem_addr
+            for j in range(len(addresses) - 1, -1, -1):
+                if addresses[j] == address:
+                    index = bisect_right(segment.mem_marks, j) - 1
+                    return back + recorded - index
+            back += recorded
+        return None
+
+    def back_to_write(self, address):
+        """Откатывается до инструкции, последней записавшей в address; она будет следующей
+
+        Возвращает число откаченных инструкций или None, если записи нет в журнале.
+        """
+        steps = self.find_last_write(address)
+        if steps is None:
+            return None
+        return self.step_back(steps)
@@ -0,0 +1,140 @@
+import json
+from array import array
+
+from debug.Wrappers import wrap_attr, unwrap_attr
+
+class Profiler:
+    """Профилировщик гостевых программ: счетчики по опкодам, адресам и портам.
+
+    Счетчики - массивы array('Q'): число выполнений и тактов по опкоду и по
+    адресу инструкции, число принятых/отданных байт по порту (in/out и
+    блочные ins/outs). Профилировщик подключается хуком шага процессора и
+    обертками ControlUnit.port_in/port_out, поэтому выключенный он ничего
+    не стоит, а включенный добавляет на инструкцию пару инкрементов.
+    """
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.opcode_counts = array('Q', bytes(256 * 8))
+        self.opcode_cycles = array('Q', bytes(256 * 8))
+        self.address_counts = array('Q', bytes(0x10000 * 8))
+        self.address_cycles = array('Q', bytes(0x10000 * 8))
+        self.port_in = array('Q', bytes(256 * 8))
+        self.port_out = array('Q', bytes(256 * 8))
+        self.enabled = False
+        self._originals = {}
+        self._wrappers = {}
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.cpu.add_exec_hook(self._count)
+        self._wrap("port_in", self._count_in)
+        self._wrap("port_out", self._count_out)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.cpu.remove_exec_hook(self._count)
+        # Поверх наших оберток могут стоять чужие: снимаем только свои
+        for name, wrapper in self._wrappers.items():
+            unwrap_attr(self.cpu.control_unit, name, wrapper, self._originals)
+        self._wrappers.clear()
+        self.enabled = False
+
+    def reset(self):
+        for counters in (self.opcode_counts, self.opcode_cycles, self.address_counts,
+                         self.address_cycles, self.port_in, self.port_out):
+            counters[:] = array('Q', bytes(len(counters) * 8))
+
+    def _wrap(self, name, method):
+        wrap_attr(self.cpu.control_unit, name, method, self._originals)
+        self._wrappers[name] = method
+
+    def _count(self, ip, entry):
+        # Опкод берем прямо из памяти, минуя обертки RAM.read (точки наблюдения)
+        opcode = self.cpu.ram.memory[ip]
+        cycles = entry[3]
+        self.opcode_counts[opcode] += 1
+        self.opcode_cycles[opcode] += cycles
+        self.address_counts[ip] += 1
+        self.address_cycles[ip] += cycles
+
+    def _count_in(self, port):
+        self.port_in[port & 0xFF] += 1
+        return self._originals["port_in"](port)
+
+    def _count_out(self, port, value):
+        self.port_out[port & 0xFF] += 1
+        self._originals["port_out"](port, value)
+
+    # -- Отчеты --
+
+    def opcode_name(self, opcode):
+        entry = self.cpu.control_unit.opcodes.get(opcode)
+        return entry[0] if entry else "illegal"
+
+    def top_opcodes(self, limit=None):
+        """[(опкод, имя, выполнений, тактов)] по убыванию тактов"""
+        rows = [(opcode, self.opcode_name(opcode), count, self.opcode_cycles[opcode])
+                for opcode, count in enumerate(self.opcode_counts) if count]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:limit]
+
+    def top_addresses(self, limit=None):
+        """[(адрес, выполнений, тактов)] по убыванию тактов"""
+        rows = [(address, count, self.address_cycles[address])
+                for address, count in enumerate(self.address_counts) if count]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[:limit]
+
+    def ports(self):
+        """[(порт, in, out)] для портов, к которым было обращение"""
+        return [(port, self.port_in[port], self.port_out[port])
+                for port in range(256) if self.port_in[port] or self.port_out[port]]
+
+    @staticmethod
+    def _label_for(address, labels):
+        # Ближайшая метка не выше адреса: "loop+3"
+        best = None
+        for name, label_address in labels.items():
+            if label_address <= address and (best is None or label_address > best[1]):
+                best = (name, label_address)
+        if best is None:
+            return ""
+        return best[0] if best[1] == address else f"{best[0]}+{address - best[1]}"
+
+    def report(self, limit=20, labels=None):
+        """Текстовый отчет; labels - {метка: адрес}, например Compiler.labels"""
+        total = sum(self.opcode_cycles) or 1
+        lines = ["Опкоды:", f"{'опкод':<12}{'выполнений':>12}{'тактов':>12}{'%':>8}"]
+        for opcode, name, count, cycles in self.top_opcodes(limit):
+            lines.append(f"{name:<12}{count:>12}{cycles:>12}{100 * cycles / total:>8.2f}")
+
+        lines += ["", "Адреса:", f"{'адрес':<8}{'выполнений':>12}{'тактов':>12}{'%':>8}  инструкция"]
+        for address, count, cycles in self.top_addresses(limit):
+            name = self.opcode_name(self.cpu.ram.memory[address])
+            label = self._label_for(address, labels) if labels else ""
+            lines.append(f"{address:04X}    {count:>12}{cycles:>12}{100 * cycles / total:>8.2f}  {name} {label}".rstrip())
+
+        ports = self.ports()
+        if ports:
+            lines += ["", "Порты:", f"{'порт':<8}{'in':>10}{'out':>10}"]
+            for port, count_in, count_out in ports:
+                lines.append(f"{port:<8}{count_in:>10}{count_out:>10}")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {
+            "opcodes": [{"opcode": opcode, "name": name, "count": count, "cycles": cycles}
+                        for opcode, name, count, cycles in self.top_opcodes()],
+            "addresses": [{"address": address, "count": count, "cycles": cycles}
+                          for address, count, cycles in self.top_addresses()],
+            "ports": [{"port": port, "in": count_in, "out": count_out}
+                      for port, count_in, count_out in self.ports()]
+        }
+
+    def save_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
@@ -0,0 +1,208 @@
+import sys
+from array import array
+
+from debug.Wrappers import wrap_attr, unwrap_attr, wrap_handler, unwrap_handler
+
+# Категории трассировки (битовая маска)
+CAT_EXEC = 0x01   # каждая выполненная инструкция
+CAT_STACK = 0x02  # push/pop
+CAT_IO = 0x04     # in/out
+CAT_MEM = 0x08    # запись в память
+CAT_ALL = CAT_EXEC | CAT_STACK | CAT_IO | CAT_MEM
+
+CATEGORIES = {"exec": CAT_EXEC, "stack": CAT_STACK, "io": CAT_IO, "mem": CAT_MEM}
+
+# Уровни детализации
+LEVEL_BRIEF = 1  # адрес и значение
+LEVEL_FULL = 2   # для exec дополнительно регистры A-D, флаги и SP
+
+# Типы записей
+KIND_EXEC = 1
+KIND_PUSH = 2
+KIND_POP = 3
+KIND_IN = 4
+KIND_OUT = 5
+KIND_WRITE = 6
+
+KIND_NAMES = {KIND_EXEC: "EXEC", KIND_PUSH: "PUSH", KIND_POP: "POP",
+              KIND_IN: "IN", KIND_OUT: "OUT", KIND_WRITE: "WRITE"}
+
+class Tracer:
+    """Трассировка процессора в кольцевой буфер двоичных записей.
+
+    Запись - RECORD_SIZE беззнаковых 32-битных слов в общем array('I'):
+    (тип, такт, адрес, значение, доп1, доп2). Для exec значение - опкод,
+    доп1 - регистры A-D (по байту), доп2 - флаги и SP (только LEVEL_FULL).
+
+    Трассировка ничего не стоит, пока выключена: при включении подменяются
+    нужные методы (хук шага процессора, push/pop, обмен с портами
+    ControlUnit.port_in/port_out - по записи на байт, в том числе у ins/outs,
+    запись в RAM), а при выключении возвращаются исходные. В режиме
+    транслятора счетчик тактов обновляется в конце блока, поэтому такт
+    у записей внутри блока - такт его начала.
+    """
+    RECORD_SIZE = 6
+
+    def __init__(self, cpu, capacity=65536, dump_on_halt=False, dump_file=None):
+        self.cpu = cpu
+        self.capacity = capacity
+        self.ring = array('I', bytes(capacity * self.RECORD_SIZE * 4))
+        self.position = 0  # индекс следующей записи
+        self.count = 0     # всего записей с момента очистки
+        self.categories = 0
+        self.level = LEVEL_BRIEF
+        self.dump_on_halt = dump_on_halt
+        self.dump_file = dump_file
+        self._originals = {}
+        self._wrappers = {}  # имя -> (объект или None для обработчика, обертка)
+
+    # -- Включение и выключение --
+
+    def enable(self, categories=CAT_ALL, level=LEVEL_BRIEF):
+        self.disable()
+        self.categories = categories
+        self.level = level
+        cpu = self.cpu
+
+        if categories & CAT_EXEC:
+            cpu.add_exec_hook(self._trace_exec)
+        if categories & CAT_STACK:
+            self._wrap(cpu, "push", self._trace_push)
+            self._wrap(cpu, "pop", self._trace_pop)
+        if categories & CAT_MEM:
+            self._wrap(cpu.ram, "write", self._trace_write)
+            # Транслятор захватывает ram.write при трансляции блока
+            cpu.decode_cache.invalidate_all()
+        if categories & CAT_IO:
+            self._wrap(cpu.control_unit, "port_in", self._trace_in)
+            self._wrap(cpu.control_unit, "port_out", self._trace_out)
+        if self.dump_on_halt:
+            self._replace("hlt", self._trace_hlt)
+            self._replace("illegal", self._trace_illegal)
+
+    def disable(self):
+        cpu = self.cpu
+        cpu.remove_exec_hook(self._trace_exec)
+        # Снимаем только свои обертки: поверх могут стоять обертки других инструментов
+        for name, (target, wrapper) in self._wrappers.items():
+            if target is None:
+                unwrap_handler(cpu.control_unit, name, wrapper, self._originals)
+            else:
+                unwrap_attr(target, name, wrapper, self._originals)
+        if "write" in self._wrappers:
+            cpu.decode_cache.invalidate_all()
+        self._wrappers.clear()
+        self.categories = 0
+
+    def _wrap(self, target, name, method):
+        wrap_attr(target, name, method, self._originals)
+        self._wrappers[name] = (target, method)
+
+    def _replace(self, name, method):
+        # Транслятор блоков узнает инструкцию по __name__ обработчика
+        def wrapper(*operands):
+            return method(*operands)
+        wrapper.__name__ = name
+        wrap_handler(self.cpu.control_unit, name, wrapper, self._originals)
+        self._wrappers[name] = (None, wrapper)
+
+    # -- Запись --
+
+    def record(self, kind, address, value, extra=0, extra2=0):
+        ring = self.ring
+        base = self.position * self.RECORD_SIZE
+        ring[base] = kind
+        ring[base + 1] = self.cpu.cycles & 0xFFFFFFFF
+        ring[base + 2] = address
+        ring[base + 3] = value
+        ring[base + 4] = extra
+        ring[base + 5] = extra2
+        self.position = (self.position + 1) % self.capacity
+        self.count += 1
+
+    def clear(self):
+        self.position = 0
+        self.count = 0
+
+    def _trace_exec(self, ip, entry):
+        # Опкод берем прямо из памяти, минуя обертки RAM.read (точки наблюдения)
+        opcode = self.cpu.ram.memory[ip]
+        if self.level >= LEVEL_FULL:
+            regs = self.cpu.regs
+            self.record(KIND_EXEC, ip, opcode,
+                        regs[1] | (regs[2] << 8) | (regs[3] << 16) | (regs[4] << 24),
+                        self.cpu.flag_reg[0] | (regs[7] << 8))
+        else:
+            self.record(KIND_EXEC, ip, opcode)
+
+    def _trace_push(self, data):
+        self._originals["push"](data)
+        self.record(KIND_PUSH, self.cpu._calculate_stack_address(), data & 0xFF)
+
+    def _trace_pop(self):
+        address = self.cpu._calculate_stack_address()
+        data = self._originals["pop"]()
+        self.record(KIND_POP, address, data)
+        return data
+
+    def _trace_write(self, address, value):
+        self._originals["write"](address, value)
+        self.record(KIND_WRITE, address, value & 0xFF)
+
+    def _trace_in(self, port):
+        value = self._originals["port_in"](port)
+        self.record(KIND_IN, port, value & 0xFF)
+        return value
+
+    def _trace_out(self, port, value):
+        self.record(KIND_OUT, port, value)
+        self._originals["port_out"](port, value)
+
+    def _trace_hlt(self):
+        self._originals["hlt"]()
+        self.dump(self.dump_file)
+
+    def _trace_illegal(self, opcode):
+        self._originals["illegal"](opcode)
+        self.dump(self.dump_file)
+
+    # -- Чтение и вывод --
+
+    def records(self, last=None):
+        """Записи от старых к новым в виде кортежей (тип, такт, адрес, значение, доп1, доп2)"""
+        total = min(self.count, self.capacity)
+        if last is not None:
+            total = min(total, last)
+        size = self.RECORD_SIZE
+        result = []
+        for index in range(self.position - total, self.position):
+            base = (index % self.capacity) * size
+            result.append(tuple(self.ring[base:base + size]))
+        return result
+
+    def format_record(self, record):
+        kind, cycle, address, value, extra, extra2 = record
+        text = f"{cycle:>10} {KIND_NAMES.get(kind, '?'):<5} {address:04X} {value:02X}"
+        if kind == KIND_EXEC:
+            opcode = self.cpu.control_unit.opcodes.get(value)
+            text += f" {opcode[0] if opcode else 'illegal':<10}"
+            if extra or extra2:
+                text += (f" A={extra & 0xFF:02X} B={(extra >> 8) & 0xFF:02X}"
+                         f" C={(extra >> 16) & 0xFF:02X} D={extra >> 24:02X}"
+                         f" F={extra2 & 0xFF:02X} SP={extra2 >> 8:02X}")
+        return text.rstrip()
+
+    def dump(self, file=None, last=None):
+        """Выводит записи в текстовом виде (по умолчанию в stdout)"""
+        if file is None:
+            file = sys.stdout
+        for record in self.records(last):
+            print(self.format_record(record), file=file)
+
+    def save(self, path):
+        """Сохраняет записи в двоичный файл (array('I'), по RECORD_SIZE слов на запись)"""
+        data = array('I')
+        for record in self.records():
+            data.extend(record)
+        with open(path, "wb") as f:
+            data.tofile(f)
@@ -0,0 +1,72 @@
+import weakref
+
+class _Chain:
+    __slots__ = ("links", "own")
+
+    def __init__(self, own):
+        self.links = []  # [(обертка, originals)] снизу вверх
+        self.own = own   # был ли у объекта собственный атрибут до первой обертки
+
+# объект -> {ключ: _Chain}; ключ - имя атрибута или ("handler", имя инструкции)
+_chains = weakref.WeakKeyDictionary()
+
+def _chain(owner, key, own):
+    chains = _chains.setdefault(owner, {})
+    if key not in chains:
+        chains[key] = _Chain(own)
+    return chains[key]
+
+def _unlink(owner, key, name, wrapper, originals, current, install):
+    chain = _chains.get(owner, {}).get(key)
+    below = originals.pop(name, None)
+    if chain is None:
+        return
+    links = chain.links
+    for index, (link, _) in enumerate(links):
+        if link == wrapper:
+            break
+    else:
+        return
+    del links[index]
+    if not links:
+        del _chains[owner][key]
+    if index < len(links):
+        # Над нами есть чужие обертки: следующая теперь вызывает то, что было под нами
+        links[index][1][name] = below
+    elif current() == wrapper:
+        install(below if links or chain.own else None)
+
+def wrap_attr(target, name, wrapper, originals):
+    """Ставит wrapper на место target.name, прежнее значение кладет в originals[name]
+
+    Обертка должна вызывать originals[name] (а не запомненное значение): при
+    снятии обертки под ней originals[name] подменяется на то, что было ниже.
+    Так инструменты (трассировка, журнал, точки наблюдения) можно выключать
+    в любом порядке, не теряя чужих оберток.
+    """
+    chain = _chain(target, name, name in target.__dict__)
+    originals[name] = getattr(target, name)
+    setattr(target, name, wrapper)
+    chain.links.append((wrapper, originals))
+
+def unwrap_attr(target, name, wrapper, originals):
+    """Снимает обертку, поставленную wrap_attr, где бы в цепочке она ни была"""
+    def install(value):
+        if value is None:
+            target.__dict__.pop(name, None)
+        else:
+            setattr(target, name, value)
+    _unlink(target, name, name, wrapper, originals, lambda: getattr(target, name), install)
+
+def wrap_handler(control_unit, name, wrapper, originals):
+    """То же для обработчика инструкции (ControlUnit.replace_handler)"""
+    # Исходный обработчик всегда возвращается через replace_handler
+    chain = _chain(control_unit, ("handler", name), True)
+    originals[name] = control_unit.replace_handler(name, wrapper)
+    chain.links.append((wrapper, originals))
+
+def unwrap_handler(control_unit, name, wrapper, originals):
+    def install(value):
+        control_unit.replace_handler(name, value)
+    _unlink(control_unit, ("handler", name), name, wrapper, originals,
+            lambda: control_unit.by_name[name], install)
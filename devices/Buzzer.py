@@ -1,6 +1,7 @@
 import pygame
 import time
 import threading
+import struct
 import numpy as np
 from api.Device import Device
 
@@ -31,6 +32,7 @@ class Buzzer(Device):
         # Состояние звука
         self.is_playing = False
         self.current_pattern = None
+        self.was_playing = False  # для прерывания по окончании мелодии
         self.play_thread = None
         self.stop_flag = False
         
@@ -368,6 +370,12 @@ class Buzzer(Device):
         """Обновляет состояние устройства"""
         current_time = time.time()
         
+        # Прерывание: мелодия или паттерн доиграли (поток сбрасывает is_playing,
+        # линию поднимаем здесь, в основном потоке)
+        if self.was_playing and not self.is_playing:
+            self.raise_irq()
+        self.was_playing = self.is_playing
+        
         # Обновляем анимацию мигания
         if self.is_playing:
             if current_time - self.last_blink_time >= 0.1:
@@ -492,6 +500,25 @@ class Buzzer(Device):
         text_rect.y = status_y
         self.surface.blit(text_surface, text_rect)
     
+    STATE_HEADER = struct.Struct("<HBBII")
+    NOTE = struct.Struct("<II")
+    
+    def save_state(self):
+        parts = [self.STATE_HEADER.pack(self._command_word(), self.compose_mode, self.waiting_for_duration,
+                                        int(self.temp_frequency), len(self.melody_buffer))]
+        parts += [self.NOTE.pack(int(frequency), int(duration)) for frequency, duration in self.melody_buffer]
+        return b"".join(parts)
+    
+    def load_state(self, data):
+        command, compose_mode, waiting, self.temp_frequency, count = self.STATE_HEADER.unpack_from(data)
+        self._set_command_word(command)
+        self.compose_mode = bool(compose_mode)
+        self.waiting_for_duration = bool(waiting)
+        self.melody_buffer = [self.NOTE.unpack_from(data, self.STATE_HEADER.size + index * self.NOTE.size)
+                              for index in range(count)]
+        # Звук не переносится в снимок: после восстановления зуммер молчит
+        self.stop_sound()
+    
     def device_in(self, value):
         """РАСШИРЕННЫЙ протокол с поддержкой композиции"""
         self._last_command = value
@@ -588,5 +615,9 @@ class Buzzer(Device):
         
         return status
     
+    def poll_stable(self):
+        # Статус меняется только в update()
+        return getattr(self, '_last_command', None) != 0x2F
+    
     def get_serial_number(self):
         return self.serial_number
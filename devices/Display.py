@@ -1,5 +1,6 @@
 import pygame
 import time
+import struct
 from api.Device import Device
 
 class Display(Device):
@@ -490,6 +491,29 @@ class Display(Device):
             
             print(f"Display: режим сканирования '{mode}'")
     
+    # Режимы приема координат, в снимке хранится их индекс
+    INPUT_MODES = ("idle", "receiving_y", "receiving_state")
+    STATE_HEADER = struct.Struct("<HBBB")
+    
+    def save_state(self):
+        header = self.STATE_HEADER.pack(self._command_word(), self.INPUT_MODES.index(self.input_mode),
+                                        self.temp_x, self.temp_y)
+        pixels = bytes(value for row in self.pixel_buffer for value in row)
+        displayed = bytes(value for row in self.displayed_buffer for value in row)
+        return header + pixels + displayed
+    
+    def load_state(self, data):
+        command, mode, self.temp_x, self.temp_y = self.STATE_HEADER.unpack_from(data)
+        self._set_command_word(command)
+        self.input_mode = self.INPUT_MODES[mode]
+        offset = self.STATE_HEADER.size
+        for buffer in (self.pixel_buffer, self.displayed_buffer):
+            for y in range(self.display_height):
+                buffer[y][:] = data[offset:offset + self.display_width]
+                offset += self.display_width
+        self.scan_complete = True
+        self.need_full_redraw = True
+    
     def device_in(self, value):
         """Получает команды от процессора"""
         self._last_command = value
@@ -528,6 +552,9 @@ class Display(Device):
         else:
             return 0
     
+    def poll_stable(self):
+        return getattr(self, '_last_command', None) != 0x4f
+    
     def instant_update(self):
         """Мгновенное обновление всего экрана"""
         old_mode = self.scan_mode
@@ -1,5 +1,6 @@
 import pygame
 import time
+import struct
 from collections import deque
 from api.Device import Device
 
@@ -181,6 +182,10 @@ class Keyboard(Device):
             self.key_buffer.append(arrow_codes[key])
         elif len(key) == 1:
             self.key_buffer.append(ord(key))
+        
+        # Прерывание: в буфере есть символ
+        if self.key_buffer:
+            self.raise_irq()
     
     def release_key(self, key):
         """Отпускание клавиши"""
@@ -300,12 +305,21 @@ class Keyboard(Device):
         else:
             self.surface.blit(text_surface, text_rect)
     
+    def save_state(self):
+        return struct.pack("<H", self._command_word()) + bytes(self.key_buffer)
+    
+    def load_state(self, data):
+        self._set_command_word(struct.unpack_from("<H", data)[0])
+        self.key_buffer.clear()
+        self.key_buffer.extend(data[2:])
+    
     def device_in(self, value):
         """Получает команды от процессора"""
         self._last_command = value
         
         if value == 0x01:
             self.key_buffer.clear()
+            self.clear_irq()
             print("Keyboard: буфер очищен")
         elif value == 0x02:
             print(f"Keyboard: размер буфера {len(self.key_buffer)}")
@@ -323,6 +337,11 @@ class Keyboard(Device):
         else:
             if self.key_buffer:
                 char_code = self.key_buffer.popleft()
+                # Остались символы - снова просим прерывание
+                if self.key_buffer:
+                    self.raise_irq()
+                else:
+                    self.clear_irq()
                 if 200 <= char_code <= 203:
                     arrows = {200: 'UP', 201: 'DN', 202: 'LT', 203: 'RT'}
                     print(f"Keyboard: отправлена стрелка {arrows[char_code]} (код {char_code})")
@@ -332,6 +351,22 @@ class Keyboard(Device):
             else:
                 return 0
     
+    def read_block(self, count):
+        """Забирает из буфера до count символов одним блоком (для DMA и ins)"""
+        if getattr(self, '_last_command', None) == 0x4e:
+            return b""  # сначала in должен получить серийный номер
+        count = min(count, len(self.key_buffer))
+        data = bytes(self.key_buffer.popleft() for _ in range(count))
+        if self.key_buffer:
+            self.raise_irq()
+        else:
+            self.clear_irq()
+        return data
+    
+    def poll_stable(self):
+        # Пустой буфер пополняется только нажатиями между кадрами
+        return not self.key_buffer and getattr(self, '_last_command', None) != 0x4e
+    
     def get_buffer_size(self):
         return len(self.key_buffer)
     
@@ -44,6 +44,12 @@ class Led(Device):
         self.state = not self.state
         print(f"LED {'включен' if self.state else 'выключен'}")
     
+    def save_state(self):
+        return bytes((1 if self.state else 0,))
+    
+    def load_state(self, data):
+        self.state = bool(data[0])
+    
     def device_in(self, value):
         """Получает команду от процессора"""
         self.state = bool(value & 0x01)  # Младший бит определяет состояние
@@ -52,3 +58,6 @@ class Led(Device):
     def device_out(self):
         """Отправляет состояние процессору"""
         return 0x01 if self.state else 0x00
+    
+    def poll_stable(self):
+        return True
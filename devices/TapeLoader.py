@@ -1,7 +1,10 @@
 import pygame
 import os
+import re
 import time
 import threading
+import struct
+import json
 import numpy as np
 from tkinter import filedialog, messagebox
 import tkinter as tk
@@ -117,6 +120,9 @@ class TapeFormat:
         return metadata, program_data
 
 class TapeLoader(Device):
+    # Байты, которые device_in понимает как команды (см. device_in)
+    COMMAND_BYTES = re.compile(rb"[\x01-\x06\x7a]")
+
     def __init__(self, canvas):
         super().__init__(canvas, "TapeLoader")
         
@@ -723,6 +729,34 @@ class TapeLoader(Device):
         text_rect = text_surface.get_rect(center=rect.center)
         self.surface.blit(text_surface, text_rect)
     
+    STATE_HEADER = struct.Struct("<HBBBIHHI")
+    
+    def save_state(self):
+        mode = self.mode.encode()
+        filename = self.tape_filename.encode()
+        metadata = json.dumps(self.tape_metadata, default=str).encode()
+        header = self.STATE_HEADER.pack(self._command_word(), self.tape_loaded, self.playing, self.recording,
+                                        self.tape_position, len(mode), len(filename), len(metadata))
+        return header + mode + filename + metadata + bytes(self.tape_data)
+    
+    def load_state(self, data):
+        (command, loaded, playing, recording, self.tape_position,
+         mode_size, filename_size, metadata_size) = self.STATE_HEADER.unpack_from(data)
+        self._set_command_word(command)
+        self.tape_loaded = bool(loaded)
+        self.playing = bool(playing)
+        self.recording = bool(recording)
+        offset = self.STATE_HEADER.size
+        self.mode = data[offset:offset + mode_size].decode()
+        offset += mode_size
+        self.tape_filename = data[offset:offset + filename_size].decode()
+        offset += filename_size
+        self.tape_metadata = json.loads(data[offset:offset + metadata_size])
+        offset += metadata_size
+        self.tape_data = bytearray(data[offset:])
+        self.tape_size = len(self.tape_data)
+        self.stop_tape_sound()
+    
     def device_in(self, value):
         """ОБНОВЛЕННЫЙ протокол с звуками"""
         self._last_command = value
@@ -749,6 +783,9 @@ class TapeLoader(Device):
                 self.recording = False
                 self.play_tape_sound("play")  # НОВОЕ: Звук воспроизведения
                 print("TapeLoader: режим воспроизведения включен")
+                # Прерывание: байт готов к чтению
+                if self.tape_position < len(self.tape_data):
+                    self.raise_irq()
             else:
                 print("TapeLoader: нет кассеты для воспроизведения")
             return
@@ -769,6 +806,7 @@ class TapeLoader(Device):
             self.playing = False
             self.recording = False
             self.stop_tape_sound()  # НОВОЕ: Останавливаем звук
+            self.clear_irq()
             print("TapeLoader: остановка")
             return
             
@@ -803,6 +841,12 @@ class TapeLoader(Device):
         
         return 0
     
+    def poll_stable(self):
+        # При воспроизведении каждый in читает следующий байт
+        if self.playing and self.tape_loaded:
+            return False
+        return getattr(self, '_last_command', None) not in (0x7a, 0x06)
+    
     def _read_next_byte(self):
         """Читает следующий байт с кассеты"""
         if not self.tape_loaded or self.tape_position >= len(self.tape_data):
@@ -812,9 +856,61 @@ class TapeLoader(Device):
         
         data = self.tape_data[self.tape_position]
         self.tape_position += 1
+        # Следующий байт готов - снова просим прерывание
+        if self.tape_position < len(self.tape_data):
+            self.raise_irq()
+        else:
+            self.clear_irq()
         print(f"TapeLoader: прочитан байт 0x{data:02X} с позиции {self.tape_position-1:04X}")
         return data
     
+    def read_block(self, count):
+        """Читает до count байт с текущей позиции одним срезом (для DMA и ins)"""
+        if getattr(self, '_last_command', None) in (0x7a, 0x06):
+            return b""  # сначала in должен получить ответ на команду
+        if not (self.playing and self.tape_loaded):
+            return b""
+        start = self.tape_position
+        data = bytes(self.tape_data[start:start + count])
+        self.tape_position += len(data)
+        if self.tape_position < len(self.tape_data):
+            self.raise_irq()
+        else:
+            self.clear_irq()
+            if len(data) < count:
+                print("TapeLoader: конец кассеты")
+                self.stop_tape_sound()
+        print(f"TapeLoader: прочитано {len(data)} байт с позиции {start:04X}")
+        return data
+    
+    def write_block(self, data):
+        """Принимает блок байт (для DMA и outs) с тем же итогом, что device_in по байту
+
+        Байты команд (0x01-0x06, 0x7A) и в блоке остаются командами, данные
+        между ними в режиме записи ложатся на кассету одним срезом.
+        """
+        data = bytes(data)
+        start = 0
+        for match in self.COMMAND_BYTES.finditer(data):
+            self._write_run(data[start:match.start()])
+            self.device_in(data[match.start()])
+            start = match.end()
+        self._write_run(data[start:])
+        if data:
+            self._last_command = data[-1]
+
+    def _write_run(self, data):
+        """Записывает байты данных (без команд) на кассету с текущей позиции"""
+        if not (data and self.recording and self.tape_loaded):
+            return
+        end = self.tape_position + len(data)
+        if len(self.tape_data) < end:
+            self.tape_data.extend(bytes(end - len(self.tape_data)))
+        self.tape_data[self.tape_position:end] = data
+        print(f"TapeLoader: записано {len(data)} байт в позицию {self.tape_position:04X}")
+        self.tape_position = end
+        self.tape_size = len(self.tape_data)
+    
     def _write_next_byte(self, data):
         """Записывает следующий байт на кассету"""
         if not self.tape_loaded:
@@ -23,6 +23,11 @@ class AutocompleteManager:
             'sub': {'args': 2, 'desc': 'sub reg1, reg2 - Вычитание'},
             'inc': {'args': 1, 'desc': 'inc reg - Увеличение на 1'},
             'dec': {'args': 1, 'desc': 'dec reg - Уменьшение на 1'},
+            'adc': {'args': 2, 'desc': 'adc reg1, reg2 - Сложение с переносом'},
+            'sbb': {'args': 2, 'desc': 'sbb reg1, reg2 - Вычитание с заемом'},
+            'mul': {'args': 2, 'desc': 'mul hi, lo - Умножение, hi:lo = hi * lo'},
+            'div': {'args': 3, 'desc': 'div hi, lo, reg - Деление, hi:lo = hi:lo / reg'},
+            'mod': {'args': 3, 'desc': 'mod hi, lo, reg - Остаток, hi:lo = hi:lo % reg'},
             
             # Логика
             'xor': {'args': 2, 'desc': 'xor reg1, reg2 - Исключающее ИЛИ'},
@@ -37,20 +42,40 @@ class AutocompleteManager:
             'jmp': {'args': 1, 'desc': 'jmp address - Безусловный переход'},
             'je': {'args': 1, 'desc': 'je address - Переход если равно'},
             'jne': {'args': 1, 'desc': 'jne address - Переход если не равно'},
+            'jc': {'args': 1, 'desc': 'jc address - Переход если перенос (заем)'},
+            'jnc': {'args': 1, 'desc': 'jnc address - Переход если нет переноса'},
+            'jb': {'args': 1, 'desc': 'jb address - Переход если меньше (беззнаковое)'},
+            'jae': {'args': 1, 'desc': 'jae address - Переход если больше или равно (беззнаковое)'},
             
             # Подпрограммы
             'call': {'args': 1, 'desc': 'call address - Вызов подпрограммы'},
             'ret': {'args': 0, 'desc': 'Возврат из подпрограммы'},
+            'calle': {'args': 1, 'desc': 'calle address - Вызов если равно'},
+            'callne': {'args': 1, 'desc': 'callne address - Вызов если не равно'},
+            'callc': {'args': 1, 'desc': 'callc address - Вызов если перенос'},
+            'callnc': {'args': 1, 'desc': 'callnc address - Вызов если нет переноса'},
+            'rete': {'args': 0, 'desc': 'Возврат если равно'},
+            'retne': {'args': 0, 'desc': 'Возврат если не равно'},
+            'retc': {'args': 0, 'desc': 'Возврат если перенос'},
+            'retnc': {'args': 0, 'desc': 'Возврат если нет переноса'},
             'push': {'args': 1, 'desc': 'push reg - Положить в стек'},
             'pop': {'args': 1, 'desc': 'pop reg - Взять из стека'},
             
+            # Прерывания
+            'ei': {'args': 0, 'desc': 'Разрешить прерывания'},
+            'di': {'args': 0, 'desc': 'Запретить прерывания'},
+            'iret': {'args': 0, 'desc': 'Возврат из обработчика прерывания'},
+            
             # Память
             'ldm': {'args': 2, 'desc': 'ldm reg, [address] - Загрузка из памяти'},
             'stm': {'args': 2, 'desc': 'stm [address], reg - Сохранение в память'},
+            'movb': {'args': 3, 'desc': 'movb [dh, dl], [sh, sl], count - Копирование блока памяти'},
             
             # Устройства
             'in': {'args': 2, 'desc': 'in port, reg - Чтение с порта'},
             'out': {'args': 2, 'desc': 'out port, reg - Запись в порт'},
+            'ins': {'args': 3, 'desc': 'ins port, [h, l], count - Чтение блока с порта в память'},
+            'outs': {'args': 3, 'desc': 'outs port, [h, l], count - Запись блока памяти в порт'},
         }
         
         # Регистры
@@ -319,11 +344,24 @@ class AutocompleteManager:
             'ld': ' a, 42',
             'add': ' a, b',
             'sub': ' a, b',
+            'adc': ' a, b',
+            'sbb': ' a, b',
+            'mul': ' a, b',
+            'div': ' a, b, c',
+            'mod': ' a, b, c',
             'cmp': ' a, b',
             'jmp': ' label',
             'je': ' label',
             'jne': ' label',
+            'jc': ' label',
+            'jnc': ' label',
+            'jb': ' label',
+            'jae': ' label',
             'call': ' function',
+            'calle': ' function',
+            'callne': ' function',
+            'callc': ' function',
+            'callnc': ' function',
             'push': ' a',
             'pop': ' a',
             'inc': ' a',
@@ -47,7 +47,10 @@ class SyntaxHighlighter:
         self.instructions = [
             'nop', 'mov', 'ld', 'add', 'sub', 'xor', 'or', 'and', 'not',
             'cmp', 'jmp', 'je', 'jne', 'shl', 'shr', 'call', 'ret',
-            'in', 'out', 'ldm', 'stm', 'hlt', 'push', 'pop', 'inc', 'dec'
+            'in', 'out', 'ldm', 'stm', 'hlt', 'push', 'pop', 'inc', 'dec',
+            'ei', 'di', 'iret', 'movb', 'outs', 'ins',
+            'jc', 'jnc', 'jb', 'jae', 'calle', 'callne', 'callc', 'callnc',
+            'rete', 'retne', 'retc', 'retnc', 'adc', 'sbb', 'mul', 'div', 'mod'
         ]
         
         # Регистры
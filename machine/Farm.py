@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from machine.Machine import Machine
+from machine.HeadlessDevices import ScriptedDevice
+from machine.Headless import STATUSES
+
+def run_job(job):
+    """Выполняет одно задание в отдельной машине и возвращает итог (словарь)
+
+    Задание - словарь:
+        program     - байты программы (или state - снимок машины)
+        address     - адрес загрузки и старта (по умолчанию 0x00FF)
+        config      - настройки Machine (engine и т.д.)
+        inputs      - {порт: байты} для инструкции in
+        outputs     - порты, вывод в которые нужно собрать
+        max_cycles  - лимит тактов
+        memory      - [(адрес, длина)] участки памяти, которые вернуть
+        name        - имя задания для отчета
+    Функция верхнего уровня, чтобы ее можно было передать в другой процесс.
+    """
+    machine = Machine(job.get("config"))
+    ports = set(job.get("inputs", {})) | set(job.get("outputs", ()))
+    for port in ports:
+        machine.connect(int(port), ScriptedDevice())
+
+    if job.get("state") is not None:
+        machine.load_state(job["state"])
+    else:
+        address = job.get("address", 0x00FF)
+        machine.load(job["program"], address)
+        machine.start_address = address
+        machine.reset()
+
+    for port, data in job.get("inputs", {}).items():
+        machine.device(int(port)).feed(data)
+
+    error = None
+    try:
+        cycles = machine.run_until_halt(job.get("max_cycles", 10000000))
+    except Exception as e:
+        error = str(e)
+        cycles = machine.cycles
+
+    return {
+        "name": job.get("name"),
+        "status": "error" if error else STATUSES.get(machine.status, "timeout"),
+        "error": error,
+        "cycles": cycles,
+        "fault": machine.fault,
+        "registers": machine.registers(),
+        "memory": {start: machine.read_memory(start, length) for start, length in job.get("memory", ())},
+        "outputs": {int(port): bytes(machine.device(int(port)).outputs) for port in ports}
+    }
+
+class Farm:
+    """Пакетный запуск независимых машин на пуле процессов.
+
+    Каждое задание выполняется в собственной машине без окна (run_job),
+    процессы пула работают параллельно на всех ядрах. Задания и итоги
+    передаются между процессами как словари с байтами.
+    """
+
+    def __init__(self, workers=None, chunksize=1):
+        self.workers = workers or os.cpu_count()
+        self.chunksize = chunksize
+
+    def run(self, jobs):
+        """Выполняет задания, возвращает итоги в том же порядке"""
+        jobs = list(jobs)
+        if self.workers == 1:
+            return [run_job(job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(run_job, jobs, chunksize=self.chunksize))
+
+    def run_inputs(self, program, inputs_list, address=0x00FF, **options):
+        """Одна программа со многими наборами входных данных ({порт: байты} на запуск)"""
+        jobs = [dict(options, program=program, address=address, inputs=inputs, name=index)
+                for index, inputs in enumerate(inputs_list)]
+        return self.run(jobs)
+
+def load_jobs(path):
+    """Читает задания из JSON: program - путь к .bin, inputs - {порт: hex}"""
+    with open(path) as f:
+        specs = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for index, spec in enumerate(specs):
+        job = dict(spec)
+        job.setdefault("name", index)
+        if "program" in spec:
+            with open(os.path.join(base, spec["program"]), "rb") as f:
+                job["program"] = f.read()
+        if "state" in spec:
+            with open(os.path.join(base, spec["state"]), "rb") as f:
+                job["state"] = f.read()
+        job["inputs"] = {port: bytes.fromhex(data) for port, data in spec.get("inputs", {}).items()}
+        jobs.append(job)
+    return jobs
+
+def main(argv=None):
+    # python -m machine.Farm jobs.json [результаты.json] [процессов]
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Использование: python -m machine.Farm jobs.json [results.json] [workers]")
+        return 2
+    jobs = load_jobs(argv[0])
+    workers = int(argv[2]) if len(argv) > 2 else None
+    results = Farm(workers).run(jobs)
+    for result in results:
+        result["memory"] = {str(start): data.hex() for start, data in result["memory"].items()}
+        result["outputs"] = {str(port): data.hex() for port, data in result["outputs"].items()}
+    text = json.dumps(results, indent=4)
+    if len(argv) > 1:
+        with open(argv[1], "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0 if all(result["status"] == "halt" for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
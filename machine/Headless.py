@@ -0,0 +1,178 @@
+import sys
+import json
+import argparse
+
+from machine.Machine import Machine, DEFAULT_CONFIG
+from machine.HeadlessDevices import NullDevice, ScriptedDevice
+from debug.Tracer import Tracer, CATEGORIES, LEVEL_BRIEF, LEVEL_FULL
+from debug.Profiler import Profiler
+from debug.CallGraph import CallGraphProfiler
+from debug.Breakpoints import Breakpoints
+
+# Коды возврата
+EXIT_HALT = 0     # процессор остановился по hlt
+EXIT_FAULT = 1    # недопустимая инструкция или ошибка эмуляции
+EXIT_TIMEOUT = 2  # исчерпан лимит тактов
+EXIT_BREAK = 3    # сработала точка останова или наблюдения
+
+# Состояние машины после запуска -> итог ("running" - лимит тактов исчерпан)
+STATUSES = {"halt": "halt", "fault": "fault", "break": "break", "running": "timeout"}
+EXIT_CODES = {"halt": EXIT_HALT, "fault": EXIT_FAULT, "error": EXIT_FAULT,
+              "timeout": EXIT_TIMEOUT, "break": EXIT_BREAK}
+
+def parse_port_data(text):
+    """Разбирает "ПОРТ=ДАННЫЕ": данные - hex-байты ("0a ff 10") или @файл"""
+    port, _, data = text.partition("=")
+    if data.startswith("@"):
+        with open(data[1:], "rb") as f:
+            return int(port, 0), f.read()
+    return int(port, 0), bytes.fromhex(data)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Запуск a8008 без окна")
+    parser.add_argument("--boot", default=DEFAULT_CONFIG["boot_dir"], help="папка с boot-файлами")
+    parser.add_argument("--program", help="бинарный файл программы вместо boot-файлов")
+    parser.add_argument("--address", type=lambda v: int(v, 0), default=DEFAULT_CONFIG["boot_address"],
+                        help="адрес загрузки и старта программы")
+    parser.add_argument("--engine", default=DEFAULT_CONFIG["engine"], choices=("interpreter", "translator"))
+    parser.add_argument("--max-cycles", type=int, default=100000000, help="лимит тактов (0 - без лимита)")
+    parser.add_argument("--input", action="append", default=[], metavar="PORT=DATA",
+                        help="сценарий для in: байты, которые получит процессор с порта")
+    parser.add_argument("--null", action="append", default=[], type=lambda v: int(v, 0), metavar="PORT",
+                        help="подключить к порту устройство-заглушку")
+    parser.add_argument("--output", action="append", default=[], type=lambda v: int(v, 0), metavar="PORT",
+                        help="записывать вывод процессора в порт")
+    parser.add_argument("--load-state", help="начать со снимка машины вместо загрузки boot-файлов")
+    parser.add_argument("--save-state", help="сохранить снимок машины после остановки")
+    parser.add_argument("--exit-register", help="на hlt вернуть значение регистра (например A) как код возврата")
+    parser.add_argument("--trace", help="категории трассировки через запятую: exec,stack,io,mem")
+    parser.add_argument("--trace-full", action="store_true", help="записывать регистры в трассу exec")
+    parser.add_argument("--trace-dump", help="куда вывести трассу при остановке ('-' - в stdout)")
+    parser.add_argument("--profile", help="профилировать и записать JSON-отчет ('-' - текстовый отчет в stdout)")
+    parser.add_argument("--callgraph", help="записать свернутые стеки вызовов для flame graph ('-' - отчет в stdout)")
+    parser.add_argument("--symbols", help="JSON-файл с метками {метка: адрес} для отчетов")
+    parser.add_argument("--break", dest="breakpoints", action="append", default=[],
+                        type=lambda v: int(v, 0), metavar="ADDR", help="точка останова по адресу")
+    parser.add_argument("--watch", action="append", default=[], type=lambda v: int(v, 0), metavar="ADDR",
+                        help="остановиться после записи в адрес памяти")
+    parser.add_argument("--report", help="записать итог в JSON-файл ('-' - в stdout)")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    machine = Machine({"engine": args.engine, "boot_dir": args.boot, "boot_address": args.address})
+
+    for port in args.null:
+        machine.connect(port, NullDevice())
+    for port in args.output:
+        machine.connect(port, ScriptedDevice())
+    inputs = [parse_port_data(text) for text in args.input]
+    for port, data in inputs:
+        if not isinstance(machine.device(port), ScriptedDevice):
+            machine.connect(port, ScriptedDevice())
+
+    if args.load_state:
+        # Снимок восстанавливает и процессор, и состояние устройств
+        machine.load_state(args.load_state)
+    elif args.program:
+        with open(args.program, "rb") as f:
+            machine.load(f.read(), args.address)
+        machine.start_address = args.address
+    else:
+        machine.load_boot()
+
+    for port, data in inputs:
+        machine.device(port).feed(data)
+
+    tracer = None
+    if args.trace:
+        categories = 0
+        for name in args.trace.split(","):
+            categories |= CATEGORIES[name.strip()]
+        tracer = Tracer(machine.cpu)
+        tracer.enable(categories, LEVEL_FULL if args.trace_full else LEVEL_BRIEF)
+
+    profiler = None
+    if args.profile:
+        profiler = Profiler(machine.cpu)
+        profiler.enable()
+
+    callgraph = None
+    if args.callgraph:
+        labels = None
+        if args.symbols:
+            with open(args.symbols) as f:
+                labels = json.load(f)
+        callgraph = CallGraphProfiler(machine.cpu, labels)
+        callgraph.enable()
+
+    breakpoints = None
+    if args.breakpoints or args.watch:
+        breakpoints = Breakpoints(machine.cpu)
+        for address in args.breakpoints:
+            breakpoints.add_breakpoint(address)
+        for address in args.watch:
+            breakpoints.watch_memory(address)
+
+    if not args.load_state:
+        machine.reset()
+    error = None
+    try:
+        cycles = machine.run_until_halt(args.max_cycles or None)
+    except Exception as e:
+        error = e
+        cycles = machine.cycles
+
+    if tracer and args.trace_dump:
+        if args.trace_dump == "-":
+            tracer.dump()
+        else:
+            with open(args.trace_dump, "w") as f:
+                tracer.dump(f)
+
+    if profiler:
+        if args.profile == "-":
+            print(profiler.report())
+        else:
+            profiler.save_json(args.profile)
+
+    if callgraph:
+        if args.callgraph == "-":
+            print(callgraph.report())
+        else:
+            callgraph.save_collapsed(args.callgraph)
+
+    if args.save_state:
+        machine.save_state(args.save_state)
+
+    if error is not None:
+        status = "error"
+        print(f"Ошибка эмуляции: {error}", file=sys.stderr)
+    else:
+        status = STATUSES.get(machine.status, "timeout")
+    code = EXIT_CODES[status]
+    if status == "halt" and args.exit_register:
+        code = machine.get_register(args.exit_register) & 0xFF
+
+    if args.report:
+        report = {
+            "status": status,
+            "exit_code": code,
+            "cycles": cycles,
+            "fault": machine.fault,
+            "error": str(error) if error is not None else None,
+            "break": list(breakpoints.hit) if breakpoints and breakpoints.hit else None,
+            "registers": machine.registers(),
+            "outputs": {str(port): device.outputs.hex()
+                        for port, device in machine.device_manager.devices.items()
+                        if isinstance(device, ScriptedDevice)}
+        }
+        if args.report == "-":
+            print(json.dumps(report))
+        else:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=4)
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import struct
+from collections import deque
+
+class NullDevice:
+    """Устройство-заглушка: принимает любые данные, на in отдает 0"""
+
+    def __init__(self, device_name="Null"):
+        self.device_name = device_name
+
+    def update(self):
+        pass
+
+    def device_in(self, value):
+        pass
+
+    def device_out(self):
+        return 0
+
+    def poll_stable(self):
+        return True
+
+    def save_state(self):
+        return b""
+
+    def load_state(self, data):
+        pass
+
+class ScriptedDevice:
+    """Устройство со сценарием: отдает заранее заданные байты и запоминает вывод.
+
+    inputs - байты, которые процессор получит по инструкции in (по порядку).
+    Когда сценарий закончился, возвращается default. Все, что процессор
+    отправил через out, складывается в outputs. Пока в сценарии есть байты,
+    поднята линия прерывания устройства (если машина ее подключила).
+    """
+    irq_line = None
+    irq_controller = None
+
+    def __init__(self, inputs=(), default=0, device_name="Scripted"):
+        self.device_name = device_name
+        self.inputs = deque(value & 0xFF for value in inputs)
+        self.default = default & 0xFF
+        self.outputs = bytearray()
+
+    def feed(self, data):
+        """Добавляет байты в конец сценария"""
+        self.inputs.extend(value & 0xFF for value in data)
+        self._update_irq()
+
+    def _update_irq(self):
+        if self.irq_controller is not None:
+            if self.inputs:
+                self.irq_controller.raise_line(self.irq_line)
+            else:
+                self.irq_controller.clear_line(self.irq_line)
+
+    def update(self):
+        pass
+
+    def device_in(self, value):
+        self.outputs.append(value & 0xFF)
+
+    def device_out(self):
+        if self.inputs:
+            value = self.inputs.popleft()
+            self._update_irq()
+            return value
+        return self.default
+
+    def read_block(self, count):
+        """Отдает до count байт сценария одним блоком (для DMA и ins)"""
+        count = min(count, len(self.inputs))
+        data = bytes(self.inputs.popleft() for _ in range(count))
+        self._update_irq()
+        return data
+
+    def write_block(self, data):
+        self.outputs.extend(data)
+
+    def poll_stable(self):
+        # Сценарий пополняется только через feed() между запусками
+        return not self.inputs
+
+    def save_state(self):
+        return struct.pack("<BI", self.default, len(self.inputs)) + bytes(self.inputs) + bytes(self.outputs)
+
+    def load_state(self, data):
+        self.default, count = struct.unpack_from("<BI", data)
+        self.inputs = deque(data[5:5 + count])
+        self.outputs = bytearray(data[5 + count:])
+
+class HeadlessDeviceManager:
+    """Менеджер устройств без окна и pygame.
+
+    Повторяет интерфейс DeviceManager, который нужен процессору
+    (device_in/device_out/get_device), но не читает и не пишет
+    devices/ports.json и не рисует устройства.
+    """
+
+    def __init__(self):
+        self.devices = {}  # port -> device instance
+        self.interrupts = None  # контроллер прерываний, подключает Machine
+
+    def connect(self, port, device):
+        """Подключает готовый экземпляр устройства к порту"""
+        self.devices[port] = device
+        if self.interrupts is not None:
+            self.interrupts.attach(port, device)
+        return device
+
+    def disconnect_device(self, port):
+        self.devices.pop(port, None)
+
+    def get_device(self, port):
+        return self.devices.get(port)
+
+    def update_all(self):
+        for device in self.devices.values():
+            device.update()
+
+    def device_in(self, port, value):
+        """Отправляет данные устройству (out инструкция процессора)"""
+        device = self.devices.get(port)
+        if device:
+            device.device_in(value)
+
+    def device_out(self, port):
+        """Получает данные от устройства (in инструкция процессора)"""
+        device = self.devices.get(port)
+        if device:
+            return device.device_out()
+        return 0
@@ -0,0 +1,529 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для пакетного режима
+    np = None
+
+from cpu.Cpu import Cpu
+from cpu.RegisterFile import FLAG_Z, FLAG_C, FIRST_REGISTER, LAST_REGISTER
+from cpu.Alu import (ADD_TABLE, SUB_TABLE, XOR_TABLE, OR_TABLE, AND_TABLE,
+                     NOT_TABLE, SHL_TABLE, SHR_TABLE, INC_TABLE, DEC_TABLE,
+                     ADC_TABLE, SBB_TABLE)
+
+# Настройки скалярной машины для verify(): у Lockstep нет ни пропуска циклов
+# опроса, ни контроллера DMA, так что эталон работает без них
+REFERENCE_CONFIG = {"idle_detection": False, "dma_port": None}
+
+class Lockstep:
+    """N экземпляров a8008, выполняемых одновременно на массивах NumPy.
+
+    Состояние всех машин - матрицы: ram (N x memory_size), regs (N x 16),
+    flags, cycles, running. За один step() каждая работающая машина
+    выполняет одну инструкцию: машины группируются по текущему опкоду, и
+    операция группы применяется векторно к ее строкам. Таблица опкодов
+    (имена, длины, такты, адресные операнды) берется из ControlUnit, ALU -
+    из тех же таблиц, что и у скалярного процессора.
+
+    Обращение за пределы памяти или к несуществующему регистру, на котором
+    скалярный процессор бросил бы исключение, останавливает машину со
+    статусом "error". Ввод - заранее заданные байты на порт для каждой
+    машины, вывод собирается в журнал и разбирается через outputs().
+    Источников прерываний у машин нет: ei/di только меняют флаг
+    разрешения, iret снимает со стека флаги и адрес возврата. Блочные
+    инструкции (movb, outs, ins) выполняются по машине в цикле, но
+    каждая пересылка - одна операция над строкой памяти.
+    """
+
+    def __init__(self, count, memory_size=0x1000):
+        if np is None:
+            raise ImportError("Для Lockstep нужен NumPy")
+        self.count = count
+        self.memory_size = memory_size
+        self.ram = np.zeros((count, memory_size), dtype=np.uint8)
+        self.regs = np.zeros((count, 16), dtype=np.uint16)
+        self.flags = np.zeros(count, dtype=np.uint8)
+        self.cycles = np.zeros(count, dtype=np.int64)
+        self.running = np.zeros(count, dtype=bool)
+        self.error = np.zeros(count, dtype=bool)
+        self.fault = np.full(count, -1, dtype=np.int16)
+        self.interrupt_enabled = np.zeros(count, dtype=bool)
+
+        # Таблица опкодов и маски регистров - из скалярного процессора
+        control_unit = Cpu().control_unit
+        self.opcodes = control_unit.opcodes
+        self.address_operands = control_unit.address_operands
+        self.illegal_cycles = control_unit.illegal_cycles
+        self.block_cycles = control_unit.block_cycles
+        self.call_taken_cycles = control_unit.call_taken_cycles
+        self.ret_taken_cycles = control_unit.ret_taken_cycles
+        self.masks = np.array(control_unit.masks, dtype=np.int64)
+
+        self.tables = {name: np.frombuffer(table, dtype=np.uint16).astype(np.int64) for name, table in (
+            ("add_r", ADD_TABLE), ("sub_r", SUB_TABLE), ("xor_r", XOR_TABLE), ("or_r", OR_TABLE),
+            ("and_r", AND_TABLE), ("not_r", NOT_TABLE), ("shl_r", SHL_TABLE), ("shr_r", SHR_TABLE),
+            ("inc_r", INC_TABLE), ("dec_r", DEC_TABLE), ("adc_r", ADC_TABLE), ("sbb_r", SBB_TABLE))}
+
+        # Векторные реализации инструкций: имя -> f(индексы машин, операнды)
+        self.handlers = {
+            "nop": lambda idx, ops: None,
+            "mov_r": self._mov_r, "ld_r": self._ld_r,
+            "add_r": self._binary, "sub_r": self._binary, "xor_r": self._binary,
+            "or_r": self._binary, "and_r": self._binary,
+            "not_r": self._unary, "shl_r": self._unary, "shr_r": self._unary,
+            "inc_r": self._unary, "dec_r": self._unary,
+            "adc_r": self._carry_binary, "sbb_r": self._carry_binary,
+            "mul_r": self._mul_r, "div_r": self._divide, "mod_r": self._divide,
+            "cmp_r": self._cmp_r,
+            "jmp_addr": self._jmp_addr, "je_addr": self._jump_if, "jne_addr": self._jump_if,
+            "jc_addr": self._jump_if, "jnc_addr": self._jump_if,
+            "call_addr": self._call_addr, "ret": self._ret,
+            "calle_addr": self._call_if, "callne_addr": self._call_if,
+            "callc_addr": self._call_if, "callnc_addr": self._call_if,
+            "rete": self._ret_if, "retne": self._ret_if, "retc": self._ret_if, "retnc": self._ret_if,
+            "in_r": self._in_r, "out_r": self._out_r,
+            "ldm_r": self._ldm_r, "ldm_r_pair": self._ldm_r_pair,
+            "push_r": self._push_r, "pop_r": self._pop_r,
+            "stm_addr": self._stm_addr, "stm_pair": self._stm_pair,
+            "ei": self._ei, "di": self._di, "iret": self._iret,
+            "movb": self._movb, "outs": self._outs, "ins": self._ins,
+            "hlt": self._hlt
+        }
+
+        # Условные инструкции: имя -> (бит флага, выполняется при установленном бите)
+        self.conditions = {}
+        for suffix, flag, when_set in (("e", FLAG_Z, True), ("ne", FLAG_Z, False),
+                                       ("c", FLAG_C, True), ("nc", FLAG_C, False)):
+            for name in (f"j{suffix}_addr", f"call{suffix}_addr", f"ret{suffix}"):
+                self.conditions[name] = (flag, when_set)
+
+        self.inputs = {}   # порт -> (данные N x L, длины, позиции)
+        self.output_log = []  # [(порт, индексы машин, значения)]
+
+    # -- Загрузка --
+
+    def load(self, program, address):
+        """Копирует программу во все машины"""
+        if address + len(program) > self.memory_size:
+            raise ValueError(f"Программа не помещается в память с адреса {hex(address)}")
+        self.ram[:, address:address + len(program)] = np.frombuffer(bytes(program), dtype=np.uint8)
+
+    def set_inputs(self, port, data):
+        """data - по последовательности байтов на машину: их получит инструкция in с порта"""
+        length = max((len(item) for item in data), default=0)
+        matrix = np.zeros((self.count, max(length, 1)), dtype=np.int64)
+        lengths = np.zeros(self.count, dtype=np.int64)
+        for index, item in enumerate(data):
+            matrix[index, :len(item)] = list(item)
+            lengths[index] = len(item)
+        self.inputs[port] = (matrix, lengths, np.zeros(self.count, dtype=np.int64))
+
+    def reset(self, start):
+        """Как Machine.reset(): регистры обнуляются, IP = start, SP = 0xFF"""
+        self.regs[:] = 0
+        self.flags[:] = 0
+        self.cycles[:] = 0
+        self.regs[:, 0x05] = start & 0xFFFF
+        self.regs[:, 0x07] = 0xFF
+        self.running[:] = True
+        self.error[:] = False
+        self.fault[:] = -1
+        self.interrupt_enabled[:] = False
+        self.output_log.clear()
+
+    # -- Выполнение --
+
+    def run(self, max_cycles):
+        """Выполняет все машины до остановки или до max_cycles тактов каждая"""
+        steps = 0
+        while self.step(max_cycles):
+            steps += 1
+        return steps
+
+    def step(self, max_cycles=None):
+        """Одна инструкция в каждой работающей машине, возвращает число таких машин"""
+        active = self.running.copy()
+        if max_cycles is not None:
+            active &= self.cycles < max_cycles
+        active = np.flatnonzero(active)
+        if not active.size:
+            return 0
+
+        ip = self.regs[active, 0x05].astype(np.int64)
+        active, ip = self._checked(active, ip, ip < self.memory_size)
+        opcodes = self.ram[active, ip]
+
+        for opcode in np.unique(opcodes):
+            group = opcodes == opcode
+            idx, group_ip = active[group], ip[group]
+            spec = self.opcodes.get(int(opcode))
+            if spec is None:
+                # Недопустимый опкод: как ControlUnit.illegal
+                self.regs[idx, 0x05] = (group_ip + 1) & 0xFFFF
+                self.fault[idx] = opcode
+                self.running[idx] = False
+                self.cycles[idx] += self.illegal_cycles
+                continue
+
+            name, length, cycles = spec
+            offsets = (group_ip[:, None] + np.arange(1, length)) & 0xFFFF
+            idx, offsets, group_ip = self._checked(idx, offsets, (offsets < self.memory_size).all(axis=1), group_ip)
+            if not idx.size:
+                continue
+            ops = self.ram[idx[:, None], offsets].astype(np.int64)
+            position = self.address_operands.get(name)
+            if position is not None:
+                address = (ops[:, position] << 8) | ops[:, position + 1]
+                ops = np.column_stack((ops[:, :position], address, ops[:, position + 2:]))
+
+            self.regs[idx, 0x05] = (group_ip + length) & 0xFFFF
+            self._name = name
+            self.handlers[name](idx, ops)
+            done = idx[~self.error[idx]]
+            self.cycles[done] += cycles
+        return active.size
+
+    def _checked(self, idx, values, ok, *extra):
+        """Останавливает с ошибкой машины, где ok ложно, и отбрасывает их строки"""
+        if ok.all():
+            return (idx, values) + extra
+        failed = idx[~ok]
+        self.error[failed] = True
+        self.running[failed] = False
+        return (idx[ok], values[ok]) + tuple(item[ok] for item in extra)
+
+    @staticmethod
+    def _is_register(codes):
+        return (codes >= FIRST_REGISTER) & (codes <= LAST_REGISTER)
+
+    def _registers_ok(self, idx, ops, *columns):
+        ok = np.ones(len(idx), dtype=bool)
+        for column in columns:
+            ok &= self._is_register(ops[:, column])
+        return self._checked(idx, ops, ok)
+
+    def _reg(self, idx, codes):
+        return self.regs[idx, codes].astype(np.int64)
+
+    def _read(self, idx, address, *extra):
+        idx, address, *extra = self._checked(idx, address, address < self.memory_size, *extra)
+        return (idx, self.ram[idx, address].astype(np.int64)) + tuple(extra)
+
+    def _write(self, idx, address, values):
+        idx, address, values = self._checked(idx, address, address < self.memory_size, values)
+        self.ram[idx, address] = values & 0xFF
+
+    def _push(self, idx, values):
+        sp = (self._reg(idx, 0x07) - 1) & 0xFF
+        self.regs[idx, 0x07] = sp
+        address = (self._reg(idx, 0x09) << 8) + sp
+        idx, address, values = self._checked(idx, address, address < self.memory_size, values)
+        self.ram[idx, address] = values & 0xFF
+        return idx
+
+    def _pop(self, idx):
+        address = (self._reg(idx, 0x09) << 8) + self._reg(idx, 0x07)
+        idx, data = self._read(idx, address)
+        self.regs[idx, 0x07] = (self._reg(idx, 0x07) + 1) & 0xFF
+        return idx, data
+
+    # -- Инструкции --
+
+    def _mov_r(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1)
+        dest = ops[:, 0]
+        self.regs[idx, dest] = (self._reg(idx, ops[:, 1]) + ops[:, 2]) & self.masks[dest]
+
+    def _ld_r(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0)
+        self.regs[idx, ops[:, 0]] = ops[:, 1]
+
+    def _binary(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1)
+        a = ops[:, 0]
+        entry = self.tables[self._name][((self._reg(idx, a) & 0xFF) << 8) | (self._reg(idx, ops[:, 1]) & 0xFF)]
+        self.regs[idx, a] = entry & 0xFF
+        self.flags[idx] = entry >> 8
+
+    def _carry_binary(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1)
+        a = ops[:, 0]
+        carry = (self.flags[idx].astype(np.int64) & FLAG_C) << 15
+        entry = self.tables[self._name][carry | ((self._reg(idx, a) & 0xFF) << 8) | (self._reg(idx, ops[:, 1]) & 0xFF)]
+        self.regs[idx, a] = entry & 0xFF
+        self.flags[idx] = entry >> 8
+
+    def _mul_r(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1)
+        product = (self._reg(idx, ops[:, 0]) & 0xFF) * (self._reg(idx, ops[:, 1]) & 0xFF)
+        self.regs[idx, ops[:, 0]] = product >> 8
+        self.regs[idx, ops[:, 1]] = product & 0xFF
+        self.flags[idx] = (product == 0) | ((product > 0xFF) << 1)
+
+    def _divide(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1, 2)
+        divisor = self._reg(idx, ops[:, 2]) & 0xFF
+        # Деление на ноль: пара не меняется, только флаг C
+        zero = divisor == 0
+        self.flags[idx[zero]] = FLAG_C
+        idx, ops, divisor = idx[~zero], ops[~zero], divisor[~zero]
+        dividend = ((self._reg(idx, ops[:, 0]) & 0xFF) << 8) | (self._reg(idx, ops[:, 1]) & 0xFF)
+        result = dividend // divisor if self._name == "div_r" else dividend % divisor
+        self.regs[idx, ops[:, 0]] = result >> 8
+        self.regs[idx, ops[:, 1]] = result & 0xFF
+        self.flags[idx] = result == 0
+
+    def _unary(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0)
+        reg = ops[:, 0]
+        entry = self.tables[self._name][self._reg(idx, reg) & 0xFF]
+        self.regs[idx, reg] = entry & 0xFF
+        self.flags[idx] = entry >> 8
+
+    def _cmp_r(self, idx, ops):
+        mode = ops[:, 2]
+        idx, ops = self._checked(idx, ops, mode <= 0x03)
+        mode = ops[:, 2]
+        a_is_reg = mode <= 0x01
+        b_is_reg = (mode == 0x00) | (mode == 0x02)
+        ok = (self._is_register(ops[:, 0]) | ~a_is_reg) & (self._is_register(ops[:, 1]) | ~b_is_reg)
+        idx, ops, a_is_reg, b_is_reg = self._checked(idx, ops, ok, a_is_reg, b_is_reg)
+        value_a = np.where(a_is_reg, self._reg(idx, np.where(a_is_reg, ops[:, 0], 0)), ops[:, 0])
+        value_b = np.where(b_is_reg, self._reg(idx, np.where(b_is_reg, ops[:, 1], 0)), ops[:, 1])
+        self.flags[idx] = self.tables["sub_r"][((value_a & 0xFF) << 8) | (value_b & 0xFF)] >> 8
+
+    def _jmp_addr(self, idx, ops):
+        self.regs[idx, 0x05] = ops[:, 0]
+
+    def _taken(self, idx):
+        flag, when_set = self.conditions[self._name]
+        is_set = (self.flags[idx] & flag) != 0
+        return is_set if when_set else ~is_set
+
+    def _jump_if(self, idx, ops):
+        taken = self._taken(idx)
+        self.regs[idx[taken], 0x05] = ops[taken, 0]
+
+    def _call_if(self, idx, ops):
+        taken = self._taken(idx)
+        idx = idx[taken]
+        self._call_addr(idx, ops[taken])
+        self.cycles[idx[~self.error[idx]]] += self.call_taken_cycles
+
+    def _ret_if(self, idx, ops):
+        idx = idx[self._taken(idx)]
+        self._ret(idx, ops)
+        self.cycles[idx[~self.error[idx]]] += self.ret_taken_cycles
+
+    def _call_addr(self, idx, ops):
+        ip = self._reg(idx, 0x05)
+        order = np.arange(len(idx))
+        pushed = self._push(idx, ip & 0xFF)
+        keep = np.isin(idx, pushed)
+        idx, ip, order = idx[keep], ip[keep], order[keep]
+        pushed = self._push(idx, ip >> 8)
+        keep = np.isin(idx, pushed)
+        self.regs[idx[keep], 0x05] = ops[order[keep], 0]
+
+    def _ret(self, idx, ops):
+        idx, high = self._pop(idx)
+        keep_idx, low = self._pop(idx)
+        high = high[np.isin(idx, keep_idx)]
+        self.regs[keep_idx, 0x05] = (high << 8) | low
+
+    def _in_r(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1)
+        ports = self._reg(idx, ops[:, 0])
+        values = np.zeros(len(idx), dtype=np.int64)
+        for port in np.unique(ports):
+            source = self.inputs.get(int(port))
+            if source is None:
+                continue
+            matrix, lengths, positions = source
+            selected = ports == port
+            machines = idx[selected]
+            available = positions[machines] < lengths[machines]
+            values[selected] = np.where(available,
+                                        matrix[machines, np.minimum(positions[machines], matrix.shape[1] - 1)], 0)
+            positions[machines] += available
+        save = ops[:, 1]
+        self.regs[idx, save] = values & self.masks[save]
+
+    def _out_r(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1)
+        ports = self._reg(idx, ops[:, 0])
+        values = self._reg(idx, ops[:, 1]) & 0xFF
+        for port in np.unique(ports):
+            selected = ports == port
+            self.output_log.append((int(port), idx[selected], values[selected]))
+
+    def _ldm_r(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0)
+        idx, data, ops = self._read(idx, ops[:, 1], ops)
+        self.regs[idx, ops[:, 0]] = data
+
+    def _ldm_r_pair(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1, 2)
+        address = (self._reg(idx, ops[:, 1]) << 8) | self._reg(idx, ops[:, 2])
+        idx, data, ops = self._read(idx, address, ops)
+        self.regs[idx, ops[:, 0]] = data
+
+    def _push_r(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0)
+        self._push(idx, self._reg(idx, ops[:, 0]))
+
+    def _pop_r(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0)
+        popped, data = self._pop(idx)
+        self.regs[popped, ops[np.isin(idx, popped), 0]] = data
+
+    def _stm_addr(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 1)
+        self._write(idx, ops[:, 0], self._reg(idx, ops[:, 1]))
+
+    def _stm_pair(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1, 2)
+        address = (self._reg(idx, ops[:, 0]) << 8) | self._reg(idx, ops[:, 1])
+        self._write(idx, address, self._reg(idx, ops[:, 2]))
+
+    def _ei(self, idx, ops):
+        self.interrupt_enabled[idx] = True
+
+    def _di(self, idx, ops):
+        self.interrupt_enabled[idx] = False
+
+    def _iret(self, idx, ops):
+        idx, high = self._pop(idx)
+        low_idx, low = self._pop(idx)
+        address = (high[np.isin(idx, low_idx)] << 8) | low
+        self.regs[low_idx, 0x05] = address
+        flags_idx, flags = self._pop(low_idx)
+        self.flags[flags_idx] = flags
+        self.interrupt_enabled[flags_idx] = True
+
+    def _block(self, machine, address, count):
+        """Адреса блока машины или None (машина остановлена с ошибкой), если он вне памяти"""
+        addresses = (address + np.arange(count)) & 0xFFFF
+        if count and addresses.max() >= self.memory_size:
+            self.error[machine] = True
+            self.running[machine] = False
+            return None
+        return addresses
+
+    def _finish_block(self, machine, pairs, count_reg, count):
+        regs = self.regs[machine]
+        for high, low, address in pairs:
+            address += count
+            regs[high] = (address >> 8) & 0xFF & self.masks[high]
+            regs[low] = address & 0xFF & self.masks[low]
+        regs[count_reg] = 0
+        self.cycles[machine] += count * self.block_cycles
+
+    def _movb(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1, 2, 3, 4)
+        for machine, (dest_high, dest_low, src_high, src_low, count_reg) in zip(idx, ops.tolist()):
+            regs = self.regs[machine]
+            count = int(regs[count_reg])
+            src = (int(regs[src_high]) << 8) | int(regs[src_low])
+            dest = (int(regs[dest_high]) << 8) | int(regs[dest_low])
+            sources, targets = self._block(machine, src, count), self._block(machine, dest, count)
+            if sources is None or targets is None:
+                continue
+            memory = self.ram[machine]
+            if 0 < ((dest - src) & 0xFFFF) < count:
+                # Как ControlUnit.movb: перекрытие копируется по байту вперед
+                for source, target in zip(sources, targets):
+                    memory[target] = memory[source]
+            else:
+                memory[targets] = memory[sources]
+            self._finish_block(machine, ((src_high, src_low, src), (dest_high, dest_low, dest)), count_reg, count)
+
+    def _outs(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1, 2, 3)
+        for machine, (port_reg, high, low, count_reg) in zip(idx, ops.tolist()):
+            regs = self.regs[machine]
+            count = int(regs[count_reg])
+            address = (int(regs[high]) << 8) | int(regs[low])
+            addresses = self._block(machine, address, count)
+            if addresses is None:
+                continue
+            if count:
+                values = self.ram[machine, addresses].astype(np.int64)
+                self.output_log.append((int(regs[port_reg]), np.full(count, machine), values))
+            self._finish_block(machine, ((high, low, address),), count_reg, count)
+
+    def _ins(self, idx, ops):
+        idx, ops = self._registers_ok(idx, ops, 0, 1, 2, 3)
+        for machine, (port_reg, high, low, count_reg) in zip(idx, ops.tolist()):
+            regs = self.regs[machine]
+            count = int(regs[count_reg])
+            address = (int(regs[high]) << 8) | int(regs[low])
+            addresses = self._block(machine, address, count)
+            if addresses is None:
+                continue
+            values = np.zeros(count, dtype=np.uint8)
+            source = self.inputs.get(int(regs[port_reg]))
+            if source is not None and count:
+                matrix, lengths, positions = source
+                position = int(positions[machine])
+                available = max(0, min(count, int(lengths[machine]) - position))
+                values[:available] = matrix[machine, position:position + available]
+                positions[machine] += available
+            self.ram[machine, addresses] = values
+            self._finish_block(machine, ((high, low, address),), count_reg, count)
+
+    def _hlt(self, idx, ops):
+        self.running[idx] = False
+
+    # -- Результаты --
+
+    def status(self, index):
+        """Итог машины в терминах Farm: "halt", "fault", "error" или "timeout\""""
+        if self.error[index]:
+            return "error"
+        if self.running[index]:
+            return "timeout"
+        if self.fault[index] >= 0:
+            return "fault"
+        return "halt"
+
+    def outputs(self, index, port):
+        """Все байты, которые машина index вывела в порт"""
+        data = bytearray()
+        for logged_port, machines, values in self.output_log:
+            if logged_port == port:
+                data.extend(int(value) for value in values[machines == index])
+        return bytes(data)
+
+    def registers(self, index):
+        names = {"A": 0x01, "B": 0x02, "C": 0x03, "D": 0x04, "IP": 0x05,
+                 "SP": 0x07, "BP": 0x08, "SS": 0x09}
+        return {name: int(self.regs[index, code]) for name, code in names.items()}
+
+def verify(program, inputs_list, address=0x00FF, max_cycles=100000, ports=(1,), output_ports=(1,)):
+    """Сверяет Lockstep со скалярным интерпретатором, возвращает индексы расхождений
+
+    inputs_list - по словарю {порт: байты} на машину.
+    """
+    from machine.Farm import run_job
+
+    lockstep = Lockstep(len(inputs_list))
+    lockstep.load(program, address)
+    for port in ports:
+        lockstep.set_inputs(port, [inputs.get(port, b"") for inputs in inputs_list])
+    lockstep.reset(address)
+    lockstep.run(max_cycles)
+
+    mismatches = []
+    for index, inputs in enumerate(inputs_list):
+        result = run_job({"program": program, "address": address, "inputs": inputs,
+                          "config": dict(REFERENCE_CONFIG),
+                          "outputs": list(output_ports), "max_cycles": max_cycles,
+                          "memory": [(0, lockstep.memory_size)]})
+        same = result["status"] == lockstep.status(index)
+        if result["status"] != "error":
+            same = (same and result["cycles"] == int(lockstep.cycles[index])
+                    and result["registers"] == lockstep.registers(index)
+                    and result["memory"][0] == lockstep.ram[index].tobytes()
+                    and all(result["outputs"][port] == lockstep.outputs(index, port) for port in output_ports))
+        if not same:
+            mismatches.append(index)
+    return mismatches
@@ -0,0 +1,305 @@
+import os
+import json
+import mmap
+import zlib
+
+from cpu.Cpu import Cpu
+from cpu.InterruptController import InterruptController
+from cpu.DmaController import DmaController
+from ram.Ram import auto_discover_ram
+from ram.Ram0 import Ram0
+from ram.BankedRam import BankedRam, BankPort
+from ram.Bus import Bus
+from machine.HeadlessDevices import HeadlessDeviceManager
+from machine import Snapshot
+
+# Имена регистров -> их коды в регистровом файле (IR при step() не обновляется - его нет)
+REGISTERS = {"A": 0x01, "B": 0x02, "C": 0x03, "D": 0x04, "IP": 0x05,
+             "SP": 0x07, "BP": 0x08, "SS": 0x09}
+
+DEFAULT_CONFIG = {
+    "clock_hz": 1000000,   # целевая частота процессора, тактов в секунду
+    "unthrottled": False,  # True - процессор работает без ограничения частоты
+    "frame_rate": 60,      # частота отрисовки и опроса событий
+    "engine": "interpreter",
+    "idle_detection": True, # пропускать циклы опроса устройств (cpu/IdleDetector.py)
+    "boot_dir": "boot",    # папка с boot-файлами 0.bin, 1.bin
+    "boot_address": 0x00FF, # адрес, с которого загружаются boot-файлы
+    # Модули памяти на шине: module - класс из ram/, address - адрес подключения,
+    # остальные ключи идут в конструктор (size, banks). У банков можно задать
+    # select_port (порт выбора банка) и select_address (страница регистра MMIO)
+    "memory": [{"module": "Ram0", "address": 0x0000}],
+    "vector_base": 0x0FE0, # таблица векторов прерываний: 16 линий по 2 байта
+    "dma_port": 6          # порт контроллера DMA (None - без DMA)
+}
+
+# Манифест boot-образа в папке boot (см. load_boot_manifest)
+BOOT_MANIFEST = "boot.json"
+# Файлы образов от этого размера читаются через mmap
+MMAP_THRESHOLD = 0x10000
+
+def _number(value):
+    # Числа в JSON-конфиге можно писать строкой "0x1000"
+    return int(value, 0) if isinstance(value, str) else value
+
+def load_boot_manifest(bus, manifest_path):
+    """Загружает сегменты из манифеста boot-образа, возвращает адрес старта
+
+    Манифест (boot.json):
+        {"entry": 255, "segments": [{"file": "0.bin", "address": 255,
+                                     "offset": 0, "length": 600, "crc32": ...}]}
+    offset, length и crc32 необязательны (по умолчанию - весь файл без проверки),
+    entry по умолчанию - адрес первого сегмента. Каждый сегмент читается прямо
+    в память шины (readinto), из больших файлов - через mmap.
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    segments = manifest.get("segments", [])
+    if not segments:
+        return 0
+
+    for segment in segments:
+        address = _number(segment["address"])
+        offset = _number(segment.get("offset", 0))
+        path = os.path.join(base, segment["file"])
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            length = _number(segment.get("length", size - offset))
+            if offset + length > size:
+                raise ValueError(f"Сегмент {segment['file']}: в файле нет {length} байт со смещения {offset}")
+            view = bus.view(address, length)
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image, memoryview(image) as source:
+                    view[:] = source[offset:offset + length]
+            else:
+                f.seek(offset)
+                f.readinto(view)
+        if "crc32" in segment and zlib.crc32(view) != _number(segment["crc32"]):
+            raise ValueError(f"Сегмент {segment['file']}: неверная контрольная сумма")
+        bus.invalidate(address, length)
+
+    return _number(manifest.get("entry", segments[0]["address"]))
+
+def load_boot_files(bus, boot_dir="boot", start_address=0x00FF):
+    """Загружает boot-образ, возвращает адрес старта (0 - нет файлов)
+
+    Если в папке есть манифест boot.json, грузятся его сегменты. Иначе
+    файлы 0.bin, 1.bin, ... кладутся подряд с start_address.
+    """
+    if not os.path.exists(boot_dir):
+        return 0
+
+    manifest_path = os.path.join(boot_dir, BOOT_MANIFEST)
+    if os.path.exists(manifest_path):
+        return load_boot_manifest(bus, manifest_path)
+
+    boot_files = [f for f in os.listdir(boot_dir) if f.endswith(".bin") and f.split(".")[0].isdigit()]
+    boot_files.sort(key=lambda f: int(f.split(".")[0]))
+
+    if not boot_files:
+        return 0
+
+    current_address = start_address
+
+    for boot_file in boot_files:
+        file_path = os.path.join(boot_dir, boot_file)
+        with open(file_path, "rb") as f:
+            data = f.read()
+        bus.load(current_address, data)
+        current_address += len(data)
+
+    return start_address
+
+class Machine:
+    """Собранная машина: процессор, память и устройства без привязки к окну.
+
+    По умолчанию устройства подключаются через HeadlessDeviceManager, так что
+    машину можно запускать без дисплея и управлять ею из Python. Графический
+    main.py передает сюда свой DeviceManager.
+
+    Процессор обращается к памяти через шину bus. Модули ОЗУ подключаются по
+    списку config["memory"] (по умолчанию Ram0 с адреса 0), ram - первый из
+    них. Свободные страницы шины можно занять ПЗУ или окнами устройств
+    (bus.map_rom, bus.map_device). Контроллер DMA (dma) подключается к порту
+    config["dma_port"].
+    """
+
+    def __init__(self, config=None, device_manager=None):
+        self.config = dict(DEFAULT_CONFIG)
+        if config:
+            self.config.update(config)
+
+        self.cpu = Cpu()
+        self.cpu.set_engine(self.config["engine"])
+        self.cpu.set_idle_detection(self.config["idle_detection"])
+        self.device_manager = device_manager if device_manager is not None else HeadlessDeviceManager()
+        self.cpu.set_device_manager(self.device_manager)
+        # Линии прерываний получают устройства, подключенные и до, и после сборки машины
+        self.interrupts = InterruptController(self.cpu, _number(self.config["vector_base"]))
+        self.device_manager.interrupts = self.interrupts
+        for port, device in self.device_manager.devices.items():
+            self.interrupts.attach(port, device)
+
+        self.bus = Bus()
+        self.modules = self._build_memory(self.config["memory"])
+        self.ram = self.modules[0] if self.modules else None
+        self.cpu.set_ram(self.bus)
+        self.start_address = 0
+
+        # Контроллер DMA работает как устройство на своем порту
+        self.dma = None
+        if self.config["dma_port"] is not None:
+            dma_port = _number(self.config["dma_port"])
+            self.dma = DmaController(self.bus, self.device_manager, self.cpu)
+            self.device_manager.devices[dma_port] = self.dma
+            self.interrupts.attach(dma_port, self.dma)
+
+    def _build_memory(self, layout):
+        """Создает модули памяти по описанию из конфига и подключает их к шине"""
+        # Встроенные модули доступны всегда, найденные в ram/ - дополняют их
+        classes = {"Ram0": Ram0, "BankedRam": BankedRam}
+        classes.update(auto_discover_ram())
+        modules = []
+        for spec in layout:
+            spec = dict(spec)
+            name = spec.pop("module")
+            if name not in classes:
+                raise ValueError(f"Неизвестный модуль памяти: {name}")
+            address = _number(spec.pop("address", 0))
+            select_port = spec.pop("select_port", None)
+            select_address = spec.pop("select_address", None)
+            module = classes[name](**{key: _number(value) for key, value in spec.items()})
+            self.bus.map_ram(address, module)
+            if select_address is not None:
+                self.bus.map_device(_number(select_address), Bus.PAGE_SIZE, module)
+            if select_port is not None:
+                # Порт выбора банка работает как устройство на этом порту
+                self.device_manager.devices[_number(select_port)] = BankPort(module)
+            modules.append(module)
+        return modules
+
+    # -- Загрузка и запуск --
+
+    def load_boot(self, boot_dir=None):
+        """Загружает boot-файлы и запоминает адрес старта"""
+        if boot_dir is None:
+            boot_dir = self.config["boot_dir"]
+        self.start_address = load_boot_files(self.bus, boot_dir, self.config["boot_address"])
+        return self.start_address
+
+    def load(self, data, address):
+        """Копирует байты программы в память с адреса address"""
+        self.bus.load(address, data)
+        return address
+
+    def reset(self, start=None):
+        """Сбрасывает процессор и запускает его с адреса start"""
+        if start is None:
+            start = self.start_address
+        self.cpu.register_file.reset()
+        self.cpu.cycles = 0
+        # Запросы прерываний и пересылка DMA прошлого запуска не переживают сброс
+        if self.dma is not None:
+            self.dma.reset()
+        self.interrupts.reset()
+        self.cpu.run(start=start)
+
+    def run(self, cycles):
+        """Выполняет не меньше cycles тактов (или до остановки), возвращает их число"""
+        return self.cpu.run_for(cycles)
+
+    def step(self):
+        """Выполняет одну инструкцию (блок в режиме транслятора), возвращает такты"""
+        return self.cpu.step()
+
+    def run_until_halt(self, max_cycles=None, slice_size=10000):
+        """Выполняет процессор до остановки или до max_cycles тактов, возвращает такты"""
+        executed = 0
+        while self.cpu.running:
+            if max_cycles is not None:
+                if executed >= max_cycles:
+                    break
+                executed += self.cpu.run_for(min(slice_size, max_cycles - executed))
+            else:
+                executed += self.cpu.run_for(slice_size)
+        return executed
+
+    @property
+    def running(self):
+        return self.cpu.running
+
+    @property
+    def halted(self):
+        """Процессор остановился по hlt (а не по ошибке или точке останова)"""
+        return not self.cpu.running and self.cpu.fault is None and not self.cpu.paused
+
+    @property
+    def status(self):
+        """"running", "halt" (hlt), "fault" (недопустимая инструкция) или "break" (пауза отладчика)"""
+        cpu = self.cpu
+        if cpu.running:
+            return "running"
+        if cpu.paused:
+            return "break"
+        if cpu.fault is not None:
+            return "fault"
+        return "halt"
+
+    @property
+    def paused(self):
+        return self.cpu.paused
+
+    @property
+    def fault(self):
+        return self.cpu.fault
+
+    @property
+    def cycles(self):
+        return self.cpu.cycles
+
+    # -- Снимки --
+
+    def save_state(self, path=None):
+        """Снимок машины (процессор, память, устройства) в виде bytes; path - записать в файл"""
+        data = Snapshot.save_state(self)
+        if path is not None:
+            with open(path, "wb") as f:
+                f.write(data)
+        return data
+
+    def load_state(self, data):
+        """Восстанавливает машину из снимка (bytes или путь к файлу)"""
+        if isinstance(data, str):
+            with open(data, "rb") as f:
+                data = f.read()
+        Snapshot.load_state(self, data)
+
+    # -- Память и регистры --
+
+    def read_memory(self, address, length=1):
+        """Читает length байт с адреса address"""
+        return bytes(self.bus.read(address + offset) for offset in range(length))
+
+    def write_memory(self, address, data):
+        self.load(data, address)
+
+    def get_register(self, name):
+        return self.cpu.regs[REGISTERS[name.upper()]]
+
+    def set_register(self, name, value):
+        code = REGISTERS[name.upper()]
+        self.cpu.regs[code] = value & self.cpu.register_file.masks[code]
+
+    def registers(self):
+        """Снимок регистров в виде {имя: значение}"""
+        return {name: self.cpu.regs[code] for name, code in REGISTERS.items()}
+
+    # -- Устройства --
+
+    def connect(self, port, device):
+        """Подключает экземпляр устройства к порту (только для HeadlessDeviceManager)"""
+        return self.device_manager.connect(port, device)
+
+    def device(self, port):
+        return self.device_manager.get_device(port)
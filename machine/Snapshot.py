@@ -0,0 +1,146 @@
+import struct
+from array import array
+
+# Формат снимка машины (все числа little-endian):
+#   заголовок: магия "A8SN", версия
+#   процессор: 16 регистров (H), флаги (B), running (B), fault (H, 0xFFFF - нет), такты (Q)
+#   прерывания (с версии 3): ei/di (B), поднятые линии (H), маска линий (H)
+#   память:    размер (I) и байты всей шины (в версии 1 - только Ram0)
+#   модули памяти (с версии 2): количество (H), затем для каждого адрес (H),
+#               длина имени (B), имя класса, длина состояния (I) и module.save_state()
+#   устройства: количество (H), затем для каждого порт (H), длина имени (B), имя,
+#               длина состояния (I) и состояние из device.save_state()
+MAGIC = b"A8SN"
+VERSION = 3
+
+HEADER = struct.Struct("<4sH")
+CPU_STATE = struct.Struct("<16HBBHQ")
+INTERRUPT_STATE = struct.Struct("<BHH")
+NO_FAULT = 0xFFFF
+
+def save_state(machine):
+    """Снимок машины в виде bytes"""
+    cpu = machine.cpu
+    fault = NO_FAULT if cpu.fault is None else cpu.fault
+    parts = [
+        HEADER.pack(MAGIC, VERSION),
+        CPU_STATE.pack(*cpu.regs, cpu.flag_reg[0], cpu.running, fault, cpu.cycles),
+        INTERRUPT_STATE.pack(cpu.interrupt_enabled, machine.interrupts.pending, machine.interrupts.mask),
+        struct.pack("<I", len(machine.bus.memory)),
+        bytes(machine.bus.memory)
+    ]
+
+    modules = machine.bus.modules()
+    parts.append(struct.pack("<H", len(modules)))
+    for address, module in modules:
+        name = type(module).__name__.encode()
+        state = module.save_state()
+        parts.append(struct.pack("<HB", address, len(name)) + name + struct.pack("<I", len(state)))
+        parts.append(state)
+
+    devices = machine.device_manager.devices
+    parts.append(struct.pack("<H", len(devices)))
+    for port, device in sorted(devices.items()):
+        name = device.device_name.encode()
+        state = device.save_state()
+        parts.append(struct.pack("<HB", port, len(name)) + name + struct.pack("<I", len(state)))
+        parts.append(state)
+    return b"".join(parts)
+
+def _entries(data, offset):
+    """Разбирает список модулей или устройств: ([(адрес или порт, имя, состояние)], offset)"""
+    (count,) = struct.unpack_from("<H", data, offset)
+    offset += 2
+    entries = []
+    for _ in range(count):
+        key, name_size = struct.unpack_from("<HB", data, offset)
+        offset += 3
+        name = bytes(data[offset:offset + name_size]).decode()
+        offset += name_size
+        (state_size,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        state = bytes(data[offset:offset + state_size])
+        if len(state) != state_size:
+            raise ValueError("Снимок обрезан")
+        offset += state_size
+        entries.append((key, name, state))
+    return entries, offset
+
+def load_state(machine, data):
+    """Восстанавливает машину из снимка save_state()
+
+    Снимок сначала разбирается и сверяется с машиной целиком (модули памяти,
+    устройства), и только потом применяется: обрезанный снимок или чужой
+    набор модулей и устройств машину не меняют.
+    """
+    data = memoryview(data)
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Это не снимок машины a8008")
+    if not 1 <= version <= VERSION:
+        raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+    offset = HEADER.size
+
+    cpu = machine.cpu
+    values = CPU_STATE.unpack_from(data, offset)
+    offset += CPU_STATE.size
+    interrupts = None
+    if version >= 3:
+        interrupts = INTERRUPT_STATE.unpack_from(data, offset)
+        offset += INTERRUPT_STATE.size
+
+    (size,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    # Снимок версии 1 хранит только Ram0
+    memory = machine.bus.memory if version >= 2 else machine.ram.memory
+    if size != len(memory):
+        raise ValueError(f"Размер памяти в снимке ({size}) не совпадает с машиной ({len(memory)})")
+    contents = data[offset:offset + size]
+    if len(contents) != size:
+        raise ValueError("Снимок обрезан")
+    offset += size
+
+    modules = []
+    if version >= 2:
+        present = dict(machine.bus.modules())
+        entries, offset = _entries(data, offset)
+        for address, name, state in entries:
+            module = present.get(address)
+            if module is None or type(module).__name__ != name:
+                raise ValueError(f"В снимке по адресу {hex(address)} модуль {name}, в машине - "
+                                 f"{type(module).__name__ if module else 'нет модуля'}")
+            modules.append((module, state))
+
+    devices = []
+    entries, offset = _entries(data, offset)
+    for port, name, state in entries:
+        device = machine.device_manager.get_device(port)
+        if device is None or device.device_name != name:
+            raise ValueError(f"В снимке на порту {port} устройство {name}, в машине - "
+                             f"{device.device_name if device else 'нет устройства'}")
+        devices.append((device, state))
+
+    # Снимок подходит машине: применяем
+    cpu.regs[:] = array('H', values[:16])
+    cpu.flag_reg[0] = values[16]
+    cpu.running = bool(values[17])
+    cpu.fault = None if values[18] == NO_FAULT else values[18]
+    cpu.paused = False
+    cpu.cycles = values[19]
+    if interrupts is not None:
+        enabled, pending, mask = interrupts
+        machine.interrupts.pending = pending
+        machine.interrupts.mask = mask
+        cpu.set_interrupt_enabled(bool(enabled))
+    else:
+        cpu.set_interrupt_enabled(False)
+
+    memory[:] = contents
+    for module, state in modules:
+        module.load_state(state)
+
+    # Память заменена целиком в обход RAM.write
+    cpu.decode_cache.invalidate_all()
+
+    for device, state in devices:
+        device.load_state(state)
@@ -1,35 +1,27 @@
 import os
 import sys
+import json
 import pygame
-from cpu.Cpu import Cpu
-from ram.Ram0 import Ram0
+from cpu.Scheduler import Scheduler
+from machine.Machine import Machine, DEFAULT_CONFIG
 from api.Api import DeviceManager, auto_discover_devices
 
-def load_boot_files(ram):
-    boot_dir = "boot"
-    if not os.path.exists(boot_dir):
-        return 0
-        
-    boot_files = sorted([f for f in os.listdir(boot_dir) if f.endswith(".bin") and f.split(".")[0].isdigit()])
-    boot_files = [f for f in boot_files if int(f.split(".")[0]) <= 1]
-    
-    if not boot_files:
-        return 0
-    
-    start_address = 0x00FF
-    current_address = start_address
-    
-    for boot_file in boot_files:
-        file_path = os.path.join(boot_dir, boot_file)
-        with open(file_path, "rb") as f:
-            data = f.read()
-            for byte in data:
-                ram.write(current_address, byte)
-                current_address += 1
+def load_machine_config():
+    """Загружает настройки машины (частота CPU, частота кадров, движок)"""
+    config_path = "machine.json"
+    default_config = dict(DEFAULT_CONFIG)
     
-    return start_address
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            default_config.update(json.load(f))
+    else:
+        with open(config_path, 'w') as f:
+            json.dump(default_config, f, indent=4)
+    return default_config
 
 def main():
+    machine_config = load_machine_config()
+    
     # Инициализация pygame
     pygame.init()
     
@@ -39,19 +31,16 @@ def main():
     pygame.display.set_caption("PC Builder - Devices Canvas")
     clock = pygame.time.Clock()
     
-    # Проверка наличия чипа CPU
+    # Инициализация системы устройств
+    device_manager = DeviceManager(canvas)
+    
+    # Сборка машины: CPU, RAM и менеджер устройств
     try:
-        cpu = Cpu()
+        machine = Machine(machine_config, device_manager)
     except Exception as e:
         print(f"Ошибка инициализации CPU: {e}")
         sys.exit(1)
-    
-    # Проверка наличия хотя бы одного чипа RAM
-    ram = Ram0()
-    cpu.set_ram(ram)
-    
-    # Инициализация системы устройств
-    device_manager = DeviceManager(canvas)
+    cpu = machine.cpu
     
     # Автоматическое обнаружение устройств
     discovered_devices = auto_discover_devices()
@@ -66,17 +55,25 @@ def main():
             except Exception as e:
                 print(f"Ошибка подключения {device_name} к порту {port}: {e}")
     
-    # Подключаем device_manager к CPU
-    cpu.set_device_manager(device_manager)
-    
     # Загрузка boot файлов
-    start_address = load_boot_files(ram) if os.path.exists("boot") else 0
+    start_address = machine.load_boot()
+    
+    # Процессор выполняется квантами между кадрами, а не по одной инструкции на кадр
+    frame_rate = machine_config["frame_rate"]
+    scheduler = Scheduler(cpu, machine_config["clock_hz"], frame_rate, machine_config["unthrottled"])
     
     # Основной цикл
     cpu.run(start=start_address)
+    last_measure = pygame.time.get_ticks()
     
     while cpu.running:
-        cpu.step()
+        scheduler.run_frame()
+        
+        # Раз в секунду показываем реальную частоту процессора в заголовке окна
+        if pygame.time.get_ticks() - last_measure >= 1000:
+            last_measure = pygame.time.get_ticks()
+            achieved_mhz = scheduler.measure() / 1000000
+            pygame.display.set_caption(f"PC Builder - Devices Canvas ({achieved_mhz:.2f} MHz)")
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 cpu.running = False
@@ -101,7 +98,8 @@ def main():
         
         # Обновляем экран
         pygame.display.flip()
-        clock.tick(60)  # 60 FPS
+        if not scheduler.unthrottled:
+            clock.tick(frame_rate)
     
     pygame.quit()
     print(cpu.registers)
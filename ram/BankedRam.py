@@ -0,0 +1,119 @@
+import struct
+
+from ram.Ram import Ram
+
+PAGE_SIZE = 0x100
+ZERO_PAGE = bytes(PAGE_SIZE)
+
+class BankedRam(Ram):
+    """ОЗУ с переключением банков: окно size байт и banks банков за ним.
+
+    Процессор видит только выбранный банк - он лежит прямо в memory (при
+    подключении к шине это окно в памяти шины), так что обращения к нему
+    ничем не отличаются от обычного ОЗУ. Остальные банки хранятся
+    разреженно, страницами по 256 байт: страница заводится только когда в
+    ней появляется ненулевой байт, поэтому большой объем банков ничего не
+    стоит, пока его не трогают.
+
+    Банк выбирается методом select(), записью в регистр MMIO (mmio_write,
+    смещение 0) или через порт (BankPort).
+    """
+
+    def __init__(self, size=0x1000, banks=16):
+        super().__init__(size)
+        self.banks = banks
+        self.bank = 0
+        self.pages = {}  # (банк, страница) -> bytearray(256) невыбранных банков
+
+    def select(self, bank):
+        """Делает банк bank видимым в окне"""
+        bank %= self.banks
+        if bank == self.bank:
+            return
+        memory = self.memory
+        pages = self.pages
+        for page in range(self.size // PAGE_SIZE):
+            start = page * PAGE_SIZE
+            end = start + PAGE_SIZE
+            # Текущую страницу убираем в хранилище (нулевые не заводим), а
+            # страницу нового банка забираем оттуда: у выбранного банка в
+            # хранилище ничего нет, и обратное переключение (откат журнала)
+            # возвращает хранилище точно к прежнему виду
+            chunk = memory[start:end]
+            if chunk != ZERO_PAGE:
+                pages[(self.bank, page)] = bytearray(chunk)
+            else:
+                pages.pop((self.bank, page), None)
+            incoming = pages.pop((bank, page), None)
+            memory[start:end] = ZERO_PAGE if incoming is None else incoming
+        self.bank = bank
+        # В окне теперь другой код
+        if self.bus is not None:
+            self.bus.invalidate(self.address, self.size)
+        elif self.code_cache is not None:
+            self.code_cache.invalidate_all()
+
+    @property
+    def allocated(self):
+        """Байт, занятых хранилищем невыбранных банков"""
+        return len(self.pages) * PAGE_SIZE
+
+    # Регистр выбора банка для окна MMIO (Bus.map_device)
+    def mmio_read(self, offset):
+        return self.bank if offset == 0 else 0
+
+    def mmio_write(self, offset, value):
+        if offset == 0:
+            self.select(value)
+
+    # Снимок: выбранный банк и разреженные страницы остальных банков
+    def save_state(self):
+        parts = [struct.pack("<HI", self.bank, len(self.pages))]
+        for (bank, page), data in sorted(self.pages.items()):
+            parts.append(struct.pack("<HB", bank, page) + bytes(data))
+        return b"".join(parts)
+
+    def load_state(self, data):
+        self.bank, count = struct.unpack_from("<HI", data)
+        offset = 6
+        self.pages = {}
+        for _ in range(count):
+            bank, page = struct.unpack_from("<HB", data, offset)
+            offset += 3
+            self.pages[(bank, page)] = bytearray(data[offset:offset + PAGE_SIZE])
+            offset += PAGE_SIZE
+
+class BankPort:
+    """Порт выбора банка: out пишет номер банка, in читает текущий"""
+
+    def __init__(self, module, device_name="BankPort"):
+        self.module = module
+        self.device_name = device_name
+        # Для менеджера устройств окна: порт ничего не рисует и не ловит ввод
+        self.visible = False
+        self.accepts_keyboard_input = False
+
+    def update(self):
+        pass
+
+    def render_to_canvas(self):
+        pass
+
+    def on_click(self, mouse_pos):
+        pass
+
+    def device_in(self, value):
+        self.module.select(value)
+
+    def device_out(self):
+        return self.module.bank & 0xFF
+
+    def poll_stable(self):
+        return True
+
+    # Банк сохраняется вместе с модулем памяти (machine/Snapshot.py)
+    def save_state(self):
+        return b""
+
+    def load_state(self, data):
+        pass
@@ -0,0 +1,152 @@
+class Bus:
+    """Шина памяти: 64К адресного пространства, разбитые на страницы по 256 байт.
+
+    Все обычное ОЗУ и ПЗУ лежит в одном bytearray memory на 64К, поэтому
+    чтение и запись страницы ОЗУ - это одна проверка таблицы страниц и
+    индекс в bytearray. Страницы с особым поведением (ПЗУ, окна устройств,
+    неподключенные адреса) получают в таблицах read_map/write_map свой
+    обработчик. Подключенная микросхема ОЗУ (Ram0) продолжает видеть
+    свои байты: ее memory становится окном memoryview в память шины.
+    """
+    PAGE_SHIFT = 8
+    PAGE_SIZE = 1 << PAGE_SHIFT
+    PAGES = 0x10000 >> PAGE_SHIFT
+
+    def __init__(self):
+        self.size = 0x10000
+        self.memory = bytearray(self.size)
+        # Обработчик страницы: None - обычное ОЗУ (быстрый путь)
+        self.read_map = [self._unmapped_read] * self.PAGES
+        self.write_map = [self._unmapped_write] * self.PAGES
+        self.regions = []  # [(начало, размер, вид, объект)]
+        # Страницы (по 256 байт), из которых процессор уже декодировал код
+        self.code_pages = bytearray(self.PAGES)
+        self.code_cache = None
+
+    def attach_code_cache(self, code_cache):
+        """Подключает кэш декодирования, который сбрасывается при записи в код"""
+        self.code_cache = code_cache
+        self.code_pages = code_cache.code_pages
+
+    # -- Доступ --
+
+    def read(self, address):
+        handler = self.read_map[address >> 8]
+        if handler is None:
+            return self.memory[address]
+        return handler(address)
+
+    def write(self, address, value):
+        page = address >> 8
+        handler = self.write_map[page]
+        if handler is None:
+            self.memory[address] = value & 0xFF
+            if self.code_pages[page]:
+                self.code_cache.invalidate_page(page)
+        else:
+            handler(address, value)
+
+    def view(self, address, length):
+        """memoryview на [address, address + length) для загрузки прямо в память (ОЗУ или ПЗУ)
+
+        После записи через view нужно вызвать invalidate(address, length).
+        """
+        if address < 0 or address + length > self.size:
+            raise ValueError(f"Адрес {hex(address + length - 1)} вне диапазона памяти")
+        for page in range(address >> 8, ((address + length - 1) >> 8) + 1):
+            if self.read_map[page] is not None:
+                raise ValueError(f"Адрес {hex(max(address, page << 8))} вне ОЗУ и ПЗУ")
+        return memoryview(self.memory)[address:address + length]
+
+    def is_ram(self, address, length):
+        """True, если весь [address, address + length) - обычное ОЗУ (запись идет прямо в memory)"""
+        if address < 0 or address + length > self.size:
+            return False
+        write_map = self.write_map
+        return all(write_map[page] is None
+                   for page in range(address >> 8, ((address + max(length, 1) - 1) >> 8) + 1))
+
+    def load(self, address, data):
+        """Копирует байты в память шины одним срезом (загрузка программ, ПЗУ)"""
+        if not len(data):
+            return
+        self.view(address, len(data))[:] = data
+        self.invalidate(address, len(data))
+
+    def invalidate(self, address, size):
+        """Сбрасывает декодированный код в [address, address + size) - память изменена в обход write"""
+        if self.code_cache is not None and size > 0:
+            for page in range(address >> 8, ((address + size - 1) >> 8) + 1):
+                if self.code_pages[page]:
+                    self.code_cache.invalidate_page(page)
+
+    def _unmapped_read(self, address):
+        raise ValueError(f"Адрес {hex(address)} вне диапазона памяти")
+
+    def _unmapped_write(self, address, value):
+        raise ValueError(f"Адрес {hex(address)} вне диапазона памяти")
+
+    def _rom_write(self, address, value):
+        # Запись в ПЗУ игнорируется
+        pass
+
+    # -- Карта памяти --
+
+    def _pages(self, start, size):
+        if start & (self.PAGE_SIZE - 1) or size & (self.PAGE_SIZE - 1):
+            raise ValueError("Области шины должны быть выровнены по страницам (256 байт)")
+        if start + size > self.size:
+            raise ValueError(f"Область {hex(start)}+{hex(size)} выходит за 64К")
+        return range(start >> self.PAGE_SHIFT, (start + size) >> self.PAGE_SHIFT)
+
+    def _set_pages(self, start, size, reader, writer, kind, target):
+        for page in self._pages(start, size):
+            self.read_map[page] = reader
+            self.write_map[page] = writer
+        self.regions = [region for region in self.regions
+                        if region[0] + region[1] <= start or region[0] >= start + size]
+        if kind is not None:
+            self.regions.append((start, size, kind, target))
+            self.regions.sort(key=lambda region: region[0])
+        if self.code_cache is not None:
+            self.code_cache.invalidate_all()
+
+    def map_ram(self, start, chip):
+        """Подключает микросхему ОЗУ (ram.Ram) с адреса start"""
+        size = chip.size
+        self._set_pages(start, size, None, None, "ram", chip)
+        self.memory[start:start + size] = chip.memory
+        chip.memory = memoryview(self.memory)[start:start + size]
+        chip.bus = self
+        chip.address = start
+        return chip
+
+    def map_rom(self, start, data):
+        """Подключает ПЗУ с содержимым data; размер округляется до страниц"""
+        size = (len(data) + self.PAGE_SIZE - 1) & ~(self.PAGE_SIZE - 1)
+        self._set_pages(start, size, None, self._rom_write, "rom", None)
+        self.memory[start:start + size] = bytes(data) + bytes(size - len(data))
+
+    def map_device(self, start, size, device):
+        """Окно устройства: чтение и запись идут в device.mmio_read(offset)/mmio_write(offset, value)"""
+        def read(address):
+            return device.mmio_read(address - start) & 0xFF
+
+        def write(address, value):
+            device.mmio_write(address - start, value & 0xFF)
+
+        self._set_pages(start, size, read, write, "mmio", device)
+
+    def unmap(self, start, size):
+        self._set_pages(start, size, self._unmapped_read, self._unmapped_write, None, None)
+
+    def modules(self):
+        """[(адрес, микросхема)] подключенных модулей ОЗУ"""
+        return [(region[0], region[3]) for region in self.regions if region[2] == "ram"]
+
+    def region_at(self, address):
+        """(начало, размер, вид, объект) области, в которую попадает адрес, или None"""
+        for region in self.regions:
+            if region[0] <= address < region[0] + region[1]:
+                return region
+        return None
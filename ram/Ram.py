@@ -0,0 +1,63 @@
+import os
+
+class Ram:
+    """Микросхема ОЗУ на size байт (кратно 256 при подключении к шине)"""
+
+    def __init__(self, size=0x1000):
+        self.size = size
+        self.memory = bytearray(self.size)
+        # Страницы (по 256 байт), из которых процессор уже декодировал код
+        self.code_pages = bytearray(0x100)
+        self.code_cache = None
+        # Шина и адрес, куда подключена микросхема (см. Bus.map_ram)
+        self.bus = None
+        self.address = 0
+
+    def attach_code_cache(self, code_cache):
+        """Подключает кэш декодирования, который сбрасывается при записи в код"""
+        self.code_cache = code_cache
+        self.code_pages = code_cache.code_pages
+
+    def read(self, address):
+        if 0 <= address < self.size:
+            return self.memory[address]
+        raise ValueError(f"Адрес {hex(address)} вне диапазона памяти")
+
+    def write(self, address, value):
+        if 0 <= address < self.size:
+            self.memory[address] = value & 0xFF
+            if self.code_pages[address >> 8]:
+                self.code_cache.invalidate_page(address >> 8)
+        else:
+            raise ValueError(f"Адрес {hex(address)} вне диапазона памяти")
+
+    # Снимок состояния модуля сверх содержимого памяти (банки и т.п.)
+    def save_state(self):
+        return b""
+
+    def load_state(self, data):
+        pass
+
+def auto_discover_ram(ram_dir=None):
+    """Находит модули памяти: классы-наследники Ram в ram/<Имя>.py
+
+    Папка по умолчанию - та, где лежит этот файл, а не текущая рабочая.
+    """
+    if ram_dir is None:
+        ram_dir = os.path.dirname(os.path.abspath(__file__))
+    if not os.path.exists(ram_dir):
+        return {}
+
+    discovered = {}
+    for filename in os.listdir(ram_dir):
+        if filename.endswith('.py') and filename != '__init__.py':
+            module_name = filename[:-3]
+            try:
+                module = __import__(f"ram.{module_name}", fromlist=[module_name])
+                module_class = getattr(module, module_name)
+                if isinstance(module_class, type) and issubclass(module_class, Ram):
+                    discovered[module_name] = module_class
+            except (ImportError, AttributeError) as e:
+                print(f"Ошибка загрузки модуля памяти {module_name}: {e}")
+
+    return discovered